@@ -0,0 +1,303 @@
+"""
+Асинхронные версии горячих эндпоинтов чтения для запуска под ASGI.
+Django 3.2 не имеет асинхронного ORM, поэтому запросы выполняются
+через sync_to_async, а независимые запросы (строки страницы, счетчик,
+избранное, список покупок, подписки) запускаются одновременно
+в общем пуле из ASYNC_DB_THREADS потоков. Соединения потоков пула
+не закрываются после запроса: число соединений процесса ограничено
+размером пула, а не числом одновременных запросов.
+Формат ответов совпадает с синхронными view; все, что здесь
+не обрабатывается, передается им.
+"""
+import asyncio
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import connections
+from django.db.models import Prefetch
+from django.http import HttpResponse
+from rest_framework.exceptions import APIException
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+from recipes.ingredient_index import ingredient_index
+from recipes.models import FavoriteRecipe, Recipe, RecipeIngredient
+from recipes.models import ShoppingCart
+from users.models import Subscribe
+from .authentication import CachedTokenAuthentication
+from .filters import RecipeFilter, RecipeSearchFilter
+from .pagination import LimitPageNumberPagination, RecipeCursorPagination
+from .recipes_serializers import RecipeSerializer
+from .recipes_views import (
+    IngredientViewSet,
+    SHOPPING_LIST_FILENAME,
+    RecipeViewSet,
+    download_shopping_cart,
+    get_shopping_list
+)
+from .renderers import (
+    ShoppingListCSVRenderer,
+    ShoppingListJSONRenderer,
+    ShoppingListTextRenderer
+)
+
+SHOPPING_LIST_RENDERERS = {
+    renderer.format: renderer for renderer in (
+        ShoppingListTextRenderer,
+        ShoppingListCSVRenderer,
+        ShoppingListJSONRenderer
+    )
+}
+
+sync_recipe_list = sync_to_async(
+    RecipeViewSet.as_view({'get': 'list', 'post': 'create'})
+)
+sync_recipe_detail = sync_to_async(RecipeViewSet.as_view({
+    'get': 'retrieve',
+    'put': 'update',
+    'patch': 'partial_update',
+    'delete': 'destroy',
+}))
+sync_ingredient_list = sync_to_async(
+    IngredientViewSet.as_view({'get': 'list', 'post': 'create'})
+)
+sync_download_shopping_cart = sync_to_async(download_shopping_cart)
+
+
+DB_EXECUTOR = ThreadPoolExecutor(
+    max_workers=settings.ASYNC_DB_THREADS, thread_name_prefix='async-db'
+)
+
+
+def release_broken_connections():
+    """Соединение потока пула переиспользуется, пока оно рабочее."""
+    for connection in connections.all():
+        if connection.errors_occurred:
+            if not connection.is_usable():
+                connection.close()
+            connection.errors_occurred = False
+
+
+def in_thread(func):
+    """
+    Выполняет функцию с запросом к БД в потоке пула, чтобы несколько
+    запросов шли параллельно. Контекст (выбранная реплика) копируется.
+    """
+    def wrapper():
+        try:
+            return func()
+        finally:
+            release_broken_connections()
+    context = contextvars.copy_context()
+    return asyncio.get_running_loop().run_in_executor(
+        DB_EXECUTOR, context.run, wrapper
+    )
+
+
+def async_csrf_exempt(view):
+    """
+    Как и view DRF, асинхронные view не проверяются CsrfViewMiddleware:
+    сессии проверяет SessionAuthentication синхронного view.
+    csrf_exempt из Django 3.2 оборачивает view в синхронную функцию,
+    поэтому отметка ставится на саму корутину.
+    """
+    view.csrf_exempt = True
+    return view
+
+
+@sync_to_async
+def authenticate(request):
+    """DRF-запрос и пользователь; None при ошибке аутентификации."""
+    drf_request = Request(
+        request, authenticators=[CachedTokenAuthentication()]
+    )
+    try:
+        user = drf_request.user
+    except APIException:
+        return drf_request, None
+    return drf_request, user
+
+
+def json_requested(request):
+    """Асинхронно обрабатываются только GET-запросы JSON."""
+    return (
+        request.method == 'GET'
+        and request.GET.get('format', 'json') == 'json'
+        and 'text/html' not in request.META.get('HTTP_ACCEPT', '')
+    )
+
+
+def render(data, status=200):
+    return HttpResponse(
+        JSONRenderer().render(data),
+        status=status,
+        content_type='application/json'
+    )
+
+
+def recipes_queryset():
+    return Recipe.objects.select_related('author').prefetch_related(
+        'tags',
+        Prefetch(
+            'ingredients',
+            queryset=RecipeIngredient.objects.select_related('ingredients')
+        )
+    )
+
+
+def serialize(recipes, drf_request, action, favorited, in_cart, subscribed):
+    for recipe in recipes:
+        recipe.favorited = recipe.id in favorited
+        recipe.in_shopping_cart = recipe.id in in_cart
+    drf_request._subscribed_authors = subscribed
+    return RecipeSerializer(
+        recipes,
+        many=True,
+        context={
+            'request': drf_request,
+            'view': SimpleNamespace(action=action),
+        }
+    ).data
+
+
+def user_sets(user, recipe_ids):
+    """Независимые запросы: избранное, покупки и подписки пользователя."""
+    return (
+        in_thread(lambda: set(FavoriteRecipe.objects.filter(
+            user=user, recipe__in=recipe_ids
+        ).values_list('recipe_id', flat=True))),
+        in_thread(lambda: set(ShoppingCart.objects.filter(
+            user=user, recipe__in=recipe_ids
+        ).values_list('recipe_id', flat=True))),
+        in_thread(lambda: set(Subscribe.objects.filter(
+            user=user
+        ).values_list('author_id', flat=True))),
+    )
+
+
+def page_params(request):
+    paginator = LimitPageNumberPagination()
+    size = settings.REST_FRAMEWORK['PAGE_SIZE']
+    limit = request.GET.get(paginator.page_size_query_param)
+    if limit and limit.isdigit() and int(limit) > 0:
+        size = int(limit)
+    page = request.GET.get(paginator.page_query_param, '1')
+    if page == 'last' or not page.isdigit() or int(page) < 1:
+        return None, size
+    return int(page), size
+
+
+@async_csrf_exempt
+async def recipe_list(request):
+    """GET /api/recipes/ для авторизованных пользователей.
+    Анонимные запросы, cursor-пагинация и прочие форматы
+    обрабатываются синхронным RecipeViewSet с его кэшем;
+    поиск тоже, поскольку задает свой порядок выдачи."""
+    drf_request, user = await authenticate(request)
+    page, size = page_params(request)
+    if (user is None or user.is_anonymous or page is None
+            or not json_requested(request)
+            or RecipeSearchFilter.search_param in request.GET
+            or RecipeCursorPagination.is_requested(drf_request)):
+        return await sync_recipe_list(request)
+
+    @sync_to_async
+    def filter_queryset():
+        filterset = RecipeFilter(
+            request.GET, queryset=Recipe.objects.all(), request=drf_request
+        )
+        return filterset.qs if filterset.is_valid() else None
+
+    queryset = await filter_queryset()
+    if queryset is None:
+        return await sync_recipe_list(request)
+    offset = (page - 1) * size
+    ordering = (*Recipe._meta.ordering, '-id')
+    page_ids = queryset.order_by(*ordering).values('id')[
+        offset:offset + size
+    ]
+    count, recipes, *sets = await asyncio.gather(
+        in_thread(queryset.count),
+        in_thread(lambda: list(
+            recipes_queryset().filter(id__in=page_ids).order_by(*ordering)
+        )),
+        *user_sets(user, page_ids)
+    )
+    if not recipes and page != 1:
+        return render(
+            {'detail': str(LimitPageNumberPagination.invalid_page_message)},
+            status=404
+        )
+    url = drf_request.build_absolute_uri()
+    has_next = offset + size < count
+    if page == 1:
+        previous = None
+    elif page == 2:
+        previous = remove_query_param(url, 'page')
+    else:
+        previous = replace_query_param(url, 'page', page - 1)
+    return render({
+        'count': count,
+        'next': replace_query_param(url, 'page', page + 1) if has_next
+        else None,
+        'previous': previous,
+        'results': serialize(recipes, drf_request, 'list', *sets),
+    })
+
+
+@async_csrf_exempt
+async def recipe_detail(request, pk):
+    """GET /api/recipes/{id}/ для авторизованных пользователей."""
+    drf_request, user = await authenticate(request)
+    if user is None or user.is_anonymous or not json_requested(request):
+        return await sync_recipe_detail(request, pk=pk)
+    recipe_ids = Recipe.objects.filter(pk=pk).values('id')
+    recipes, *sets = await asyncio.gather(
+        in_thread(lambda: list(recipes_queryset().filter(pk=pk))),
+        *user_sets(user, recipe_ids)
+    )
+    if not recipes:
+        return await sync_recipe_detail(request, pk=pk)
+    return render(
+        serialize(recipes, drf_request, 'retrieve', *sets)[0]
+    )
+
+
+@async_csrf_exempt
+async def ingredient_list(request):
+    """Поиск ингредиентов по началу названия из индекса в памяти."""
+    name = request.GET.get('name')
+    if (name is None or 'HTTP_AUTHORIZATION' in request.META
+            or not json_requested(request)):
+        return await sync_ingredient_list(request)
+    limit = request.GET.get('limit')
+    return render(await sync_to_async(ingredient_index.search)(
+        name, int(limit) if limit and limit.isdigit() else None
+    ))
+
+
+@async_csrf_exempt
+async def download_shopping_cart_async(request):
+    """Список покупок: агрегирующий запрос выполняется в потоке,
+    ответ отдается целиком, не блокируя цикл событий итерацией курсора."""
+    renderer_class = SHOPPING_LIST_RENDERERS.get(
+        request.GET.get('format', ShoppingListTextRenderer.format)
+    )
+    _, user = await authenticate(request)
+    if (renderer_class is None or user is None or user.is_anonymous
+            or request.method != 'GET'):
+        return await sync_download_shopping_cart(request)
+    renderer = renderer_class()
+    rows = await in_thread(lambda: list(get_shopping_list(user)))
+    response = HttpResponse(
+        renderer.render(rows),
+        content_type=f'{renderer.media_type}; charset={renderer.charset}'
+    )
+    response['Content-Disposition'] = 'attachment; filename="{}"'.format(
+        SHOPPING_LIST_FILENAME.format(renderer.format)
+    )
+    return response
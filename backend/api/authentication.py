@@ -0,0 +1,120 @@
+import logging
+import pickle
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework.authentication import TokenAuthentication
+
+from foodgram.db_router import use_primary
+
+logger = logging.getLogger(__name__)
+
+
+class TokenCache:
+    """
+    Двухуровневый кэш токен -> (пользователь, токен).
+    В процессе хранится ограниченный LRU с TTL, за ним общий кэш Django.
+    Записи обоих уровней помечены версией своего токена, прочитанной
+    до запроса в БД: при выходе, смене пароля или деактивации версия
+    токенов пользователя растет, и записи другой версии отбрасываются.
+    Так запрос, проверивший токен до выхода, не вернет его в кэш после
+    выхода, а остальные пользователи сохраняют свои записи.
+    Начальная версия - текущее время в наносекундах: если ключ версии
+    вытеснен из кэша, новая версия не совпадет ни с одной старой записью.
+    """
+    def __init__(self, size, ttl, shared_ttl):
+        self.size = size
+        self.ttl = ttl
+        self.shared_ttl = shared_ttl
+        self._local = OrderedDict()
+        self._lock = threading.Lock()
+
+    def shared_key(self, key):
+        return f'auth_token:{key}'
+
+    def remember(self, key, version, data):
+        with self._lock:
+            self._local[key] = (version, time.monotonic() + self.ttl, data)
+            self._local.move_to_end(key)
+            while len(self._local) > self.size:
+                self._local.popitem(last=False)
+
+    def version_key(self, key):
+        return f'auth_token_version:{key}'
+
+    def version(self, key):
+        version_key = self.version_key(key)
+        version = cache.get(version_key)
+        if version is not None:
+            return version
+        cache.add(version_key, time.time_ns(), timeout=None)
+        return cache.get(version_key)
+
+    def get(self, key, version):
+        with self._lock:
+            entry = self._local.get(key)
+            if entry is not None:
+                if entry[0] == version and entry[1] > time.monotonic():
+                    self._local.move_to_end(key)
+                    return pickle.loads(entry[2])
+                del self._local[key]
+        entry = cache.get(self.shared_key(key))
+        if entry is None or entry[0] != version:
+            return None
+        self.remember(key, version, entry[1])
+        return pickle.loads(entry[1])
+
+    def set(self, key, credentials, version):
+        """version - прочитанная до проверки токена в БД."""
+        data = pickle.dumps(credentials)
+        cache.set(self.shared_key(key), (version, data), self.shared_ttl)
+        self.remember(key, version, data)
+
+    def invalidate(self, keys):
+        with self._lock:
+            for key in keys:
+                self._local.pop(key, None)
+        cache.delete_many([self.shared_key(key) for key in keys])
+        for key in keys:
+            try:
+                cache.incr(self.version_key(key))
+            except ValueError:
+                cache.set(self.version_key(key), time.time_ns(), timeout=None)
+
+
+token_cache = TokenCache(
+    settings.AUTH_TOKEN_CACHE['LOCAL_SIZE'],
+    settings.AUTH_TOKEN_CACHE['LOCAL_TTL'],
+    settings.AUTH_TOKEN_CACHE['SHARED_TTL'],
+)
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """
+    TokenAuthentication без запроса Token JOIN User на каждый вызов.
+    Если кэш недоступен, проверка идет через БД как обычно.
+    Токен читается с основной БД: только что выданного токена
+    на реплике может еще не быть.
+    """
+    def check_credentials(self, key):
+        with use_primary():
+            return super().authenticate_credentials(key)
+
+    def authenticate_credentials(self, key):
+        try:
+            version = token_cache.version(key)
+            credentials = token_cache.get(key, version)
+        except Exception:
+            logger.warning('Кэш токенов недоступен', exc_info=True)
+            return self.check_credentials(key)
+        if credentials is not None:
+            return credentials
+        credentials = self.check_credentials(key)
+        try:
+            token_cache.set(key, credentials, version)
+        except Exception:
+            logger.warning('Кэш токенов недоступен', exc_info=True)
+        return credentials
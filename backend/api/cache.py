@@ -0,0 +1,63 @@
+import hashlib
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework import status
+from rest_framework.response import Response
+
+from foodgram.db_router import use_primary
+from recipes.versions import get_version
+
+
+def build_cache_key(request, prefix, version, **kwargs):
+    """
+    Ключ из нормализованных параметров запроса: параметры и их значения
+    отсортированы, так что ?tags=a&tags=b и ?tags=b&tags=a совпадают.
+    """
+    params = sorted(
+        (key, sorted(values)) for key, values in request.query_params.lists()
+    )
+    raw = repr((
+        request.get_host(),
+        request.accepted_media_type,
+        sorted(kwargs.items()),
+        params
+    ))
+    digest = hashlib.md5(raw.encode()).hexdigest()
+    return f'{prefix}:{version}:{digest}'
+
+
+def cache_anonymous(prefix, version_key, timeout=None):
+    """
+    Кэширует ответы GET для анонимных пользователей.
+    В ключ входит версия набора данных: при изменении моделей она растет,
+    и все старые записи перестают читаться без перебора ключей.
+    """
+    def decorator(method):
+        @wraps(method)
+        def wrapper(self, request, *args, **kwargs):
+            if not request.user.is_anonymous:
+                return method(self, request, *args, **kwargs)
+            key = build_cache_key(
+                request,
+                f'{prefix}:{method.__name__}',
+                get_version(version_key),
+                **kwargs
+            )
+            data = cache.get(key)
+            if data is not None:
+                return Response(data)
+            # Ответ сохраняется под новой версией и не должен
+            # собираться из отстающей реплики
+            with use_primary():
+                response = method(self, request, *args, **kwargs)
+            if response.status_code == status.HTTP_200_OK:
+                cache.set(
+                    key,
+                    response.data,
+                    timeout or settings.API_CACHE_TIMEOUT
+                )
+            return response
+        return wrapper
+    return decorator
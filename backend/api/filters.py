@@ -1,6 +1,18 @@
+from django.core.cache import cache
+from django.db.models import Exists, OuterRef
 from django_filters import rest_framework as filters
+from rest_framework.filters import BaseFilterBackend
 
-from recipes.models import Ingredient, Recipe
+from foodgram.db_router import use_primary
+from recipes.models import (
+    FavoriteRecipe,
+    Ingredient,
+    Recipe,
+    ShoppingCart,
+    Tag
+)
+from recipes.search import search_recipes
+from recipes.versions import TAGS_VERSION, get_version
 
 
 class IngredientFilter(filters.FilterSet):
@@ -14,21 +26,59 @@ class IngredientFilter(filters.FilterSet):
         fields = ('name',)
 
 
+class TagIds:
+    """
+    Соответствие slug -> id всех тегов для фильтра по тегам.
+    Хранится в общем кэше под ключом с версией тегов и в памяти процесса,
+    поэтому проверка параметра tags не обращается к БД.
+    """
+    def __init__(self):
+        self._local = (None, {})
+
+    def get(self):
+        version = get_version(TAGS_VERSION)
+        local_version, local_ids = self._local
+        if local_version == version:
+            return local_ids
+        key = f'tag_ids:{version}'
+        ids = cache.get(key)
+        if ids is None:
+            with use_primary():
+                ids = dict(Tag.objects.values_list('slug', 'id'))
+            cache.set(key, ids, timeout=None)
+        self._local = (version, ids)
+        return ids
+
+    def choices(self):
+        return [(slug, slug) for slug in self.get()]
+
+
+tag_ids = TagIds()
+
+
 class RecipeFilter(filters.FilterSet):
     """
     Фильтры:
     - по наличию в избранном
     - по тегам
+    - по автору
     - по наличию в списке покупок.
+    Каждый фильтр сужает переданный queryset условием Exists() или
+    по индексируемому полю, без JOIN, которые размножают строки.
     """
     is_favorited = filters.BooleanFilter(
         method='get_favorite',
         label='favorite',
     )
-    tags = filters.AllValuesMultipleFilter(
-        field_name='tags__slug',
+    tags = filters.MultipleChoiceFilter(
+        choices=tag_ids.choices,
+        method='get_tags',
         label='tags',
     )
+    author = filters.NumberFilter(
+        field_name='author_id',
+        label='author',
+    )
     is_in_shopping_cart = filters.BooleanFilter(
         method='get_is_in_shopping_cart',
         label='shopping_cart',
@@ -43,16 +93,38 @@ class RecipeFilter(filters.FilterSet):
             'is_in_shopping_cart',
         )
 
+    def filter_exists(self, queryset, model, value):
+        user = self.request.user
+        if user.is_anonymous:
+            return queryset if not value else queryset.none()
+        exists = Exists(model.objects.filter(
+            user=user, recipe_id=OuterRef('pk')
+        ))
+        return queryset.filter(exists if value else ~exists)
+
     def get_favorite(self, queryset, name, value):
-        if value:
-            return queryset.filter(is_favorited__user=self.request.user)
-        return queryset.exclude(
-            is_favorited=self.request.user
-        )
+        return self.filter_exists(queryset, FavoriteRecipe, value)
 
     def get_is_in_shopping_cart(self, queryset, name, value):
-        if value:
-            return Recipe.objects.filter(
-                is_in_shopping_cart__user=self.request.user
-            )
-        return Recipe.objects.all()
+        return self.filter_exists(queryset, ShoppingCart, value)
+
+    def get_tags(self, queryset, name, value):
+        ids = tag_ids.get()
+        return queryset.filter(Exists(Recipe.tags.through.objects.filter(
+            recipe_id=OuterRef('pk'),
+            tag_id__in=[ids[slug] for slug in value if slug in ids]
+        )))
+
+
+class RecipeSearchFilter(BaseFilterBackend):
+    """
+    ?search= - полнотекстовый поиск по названию, ингредиентам и описанию.
+    Результаты упорядочены по релевантности.
+    """
+    search_param = 'search'
+
+    def filter_queryset(self, request, queryset, view):
+        query = request.query_params.get(self.search_param, '').strip()
+        if not query:
+            return queryset
+        return search_recipes(queryset, query)
@@ -0,0 +1,121 @@
+import asyncio
+import json
+import statistics
+import time
+from urllib.parse import urlencode, urlsplit
+
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework.authtoken.models import Token
+
+from recipes.models import Ingredient, Recipe, ShoppingCart
+
+
+class Command(BaseCommand):
+    help = (
+        'Параллельная нагрузка на запущенный сервер: сравнение WSGI '
+        '(gunicorn foodgram.wsgi) и ASGI (gunicorn foodgram.asgi '
+        '-k uvicorn.workers.UvicornWorker) на эндпоинтах чтения. '
+        'Выводит пропускную способность и p50/p95 по каждому сценарию.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--url', default='http://127.0.0.1:8000')
+        parser.add_argument('--concurrency', type=int, default=50)
+        parser.add_argument('--requests', type=int, default=500)
+        parser.add_argument(
+            '--token',
+            default=None,
+            help='Токен пользователя; по умолчанию берется из базы'
+        )
+        parser.add_argument('--output', default=None)
+
+    def pick_token(self):
+        user_id = ShoppingCart.objects.values_list(
+            'user_id', flat=True
+        ).first()
+        if user_id is None:
+            raise CommandError(
+                'Нет данных: сначала выполните manage.py seed_benchmark'
+            )
+        token, _ = Token.objects.get_or_create(user_id=user_id)
+        return token.key
+
+    def scenarios(self):
+        recipe_id = Recipe.objects.values_list('id', flat=True).first()
+        name = Ingredient.objects.values_list('name', flat=True).first()
+        return {
+            'recipes_list': '/api/recipes/?' + urlencode({'limit': 6}),
+            'recipe_detail': f'/api/recipes/{recipe_id}/',
+            'ingredients_search': '/api/ingredients/?' + urlencode(
+                {'name': (name or '')[:2]}
+            ),
+            'download_shopping_cart': '/api/recipes/download_shopping_cart/',
+        }
+
+    async def fetch(self, path):
+        reader, writer = await asyncio.open_connection(self.host, self.port)
+        writer.write((
+            f'GET {path} HTTP/1.1\r\n'
+            f'Host: {self.host}\r\n'
+            f'Authorization: Token {self.token}\r\n'
+            'Accept: application/json\r\n'
+            'Connection: close\r\n\r\n'
+        ).encode('UTF-8'))
+        await writer.drain()
+        response = await reader.read()
+        writer.close()
+        return int(response.split(b' ', 2)[1])
+
+    async def run_scenario(self, path, total, concurrency):
+        latencies, statuses = [], set()
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def one():
+            async with semaphore:
+                start = time.perf_counter()
+                status = await self.fetch(path)
+                latencies.append((time.perf_counter() - start) * 1000)
+                statuses.add(status)
+
+        start = time.perf_counter()
+        await asyncio.gather(*(one() for _ in range(total)))
+        elapsed = time.perf_counter() - start
+        latencies.sort()
+        return {
+            'rps': round(total / elapsed, 1),
+            'p50_ms': round(statistics.median(latencies), 2),
+            'p95_ms': round(
+                latencies[min(len(latencies) - 1,
+                              int(len(latencies) * 0.95))], 2
+            ),
+            'statuses': sorted(statuses),
+        }
+
+    def handle(self, *args, **options):
+        url = urlsplit(options['url'])
+        self.host, self.port = url.hostname, url.port or 80
+        self.token = options['token'] or self.pick_token()
+        results = {}
+        loop = asyncio.new_event_loop()
+        try:
+            for name, path in self.scenarios().items():
+                results[name] = loop.run_until_complete(self.run_scenario(
+                    path, options['requests'], options['concurrency']
+                ))
+                row = results[name]
+                self.stdout.write(
+                    f'{name:<24} {row["rps"]:>8.1f} rps  '
+                    f'p50 {row["p50_ms"]:>8.2f} мс  '
+                    f'p95 {row["p95_ms"]:>8.2f} мс  '
+                    f'статусы {row["statuses"]}'
+                )
+        finally:
+            loop.close()
+        if options['output']:
+            with open(options['output'], 'w', encoding='UTF-8') as file:
+                json.dump({
+                    'url': options['url'],
+                    'concurrency': options['concurrency'],
+                    'requests': options['requests'],
+                    'scenarios': results,
+                }, file, ensure_ascii=False, indent=2)
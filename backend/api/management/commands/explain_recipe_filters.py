@@ -0,0 +1,101 @@
+import itertools
+import re
+from types import SimpleNamespace
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.http import QueryDict
+
+from api.filters import RecipeFilter
+from recipes.models import Recipe, ShoppingCart, Tag
+from users.models import User
+
+PAGE_SIZE = 6
+# Полный проход по таблице без индекса в плане PostgreSQL и SQLite
+SEQ_SCAN = re.compile(r'Seq Scan on (\w+)|\bSCAN (\w+)(?! USING)\s*$')
+
+
+class Command(BaseCommand):
+    help = (
+        'Строит EXPLAIN для всех комбинаций фильтров RecipeFilter '
+        'и проверяет, что запросы используют индексы. '
+        'Завершается ошибкой, если в плане есть полный проход по таблице.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--verbose-plans',
+            action='store_true',
+            help='Печатать планы целиком'
+        )
+
+    def combinations(self):
+        user = User.objects.filter(
+            pk__in=ShoppingCart.objects.values('user_id')
+        ).first()
+        slugs = list(Tag.objects.values_list('slug', flat=True)[:2])
+        author_id = Recipe.objects.values_list('author_id', flat=True).first()
+        if user is None or not slugs or author_id is None:
+            raise CommandError(
+                'Нет данных: сначала выполните manage.py seed_benchmark'
+            )
+        params = {
+            'tags': slugs,
+            'author': [author_id],
+            'is_favorited': ['true'],
+            'is_in_shopping_cart': ['true'],
+        }
+        for size in range(len(params) + 1):
+            for names in itertools.combinations(params, size):
+                yield user, {name: params[name] for name in names}
+        yield user, {'is_favorited': ['false']}
+        yield user, {'is_in_shopping_cart': ['false'], 'tags': slugs}
+
+    def explain(self, queryset):
+        """
+        В PostgreSQL полный проход запрещается на время EXPLAIN:
+        если план все равно содержит Seq Scan, подходящего индекса нет.
+        """
+        with transaction.atomic():
+            if connection.vendor == 'postgresql':
+                with connection.cursor() as cursor:
+                    cursor.execute('SET LOCAL enable_seqscan = off')
+            return queryset.explain()
+
+    def handle(self, *args, **options):
+        failures = 0
+        for user, params in self.combinations():
+            data = QueryDict(mutable=True)
+            for name, values in params.items():
+                data.setlist(name, [str(value) for value in values])
+            filterset = RecipeFilter(
+                data,
+                queryset=Recipe.objects.all(),
+                request=SimpleNamespace(user=user)
+            )
+            if not filterset.is_valid():
+                raise CommandError(f'{params}: {filterset.errors}')
+            plan = self.explain(filterset.qs[:PAGE_SIZE])
+            scans = sorted({
+                next(name for name in match.groups() if name)
+                for match in map(SEQ_SCAN.search, plan.splitlines())
+                if match
+            })
+            label = ' '.join(
+                f'{name}={",".join(map(str, values))}'
+                for name, values in sorted(params.items())
+            ) or 'без фильтров'
+            if scans:
+                failures += 1
+                self.stdout.write(self.style.ERROR(
+                    f'{label}: полный проход по {", ".join(scans)}'
+                ))
+            else:
+                self.stdout.write(f'{label}: индексы используются')
+            if options['verbose_plans'] or scans:
+                self.stdout.write(plan)
+        if failures:
+            raise CommandError(f'Запросов без индексов: {failures}')
+        self.stdout.write(
+            self.style.SUCCESS('Все комбинации используют индексы.')
+        )
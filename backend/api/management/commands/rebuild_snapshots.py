@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+
+from api.snapshots import SNAPSHOTS
+from recipes.versions import get_version
+
+
+class Command(BaseCommand):
+    help = 'Пересобирает снимки справочников тегов и ингредиентов'
+
+    def handle(self, *args, **kwargs):
+        for snapshot in SNAPSHOTS:
+            data = snapshot.build(get_version(snapshot.version_key))
+            sizes = ', '.join(
+                f'{encoding}: {len(data[encoding])} б'
+                for encoding in ('identity', *snapshot.encodings)
+                if data[encoding] is not None
+            )
+            self.stdout.write(f'{snapshot.name}: {sizes}')
+        self.stdout.write(self.style.SUCCESS('Снимки пересобраны.'))
@@ -0,0 +1,205 @@
+import json
+import os
+import random
+import statistics
+import time
+import tracemalloc
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.authtoken.models import Token
+
+from recipes.models import (
+    Ingredient,
+    Recipe,
+    RecipeIngredient,
+    ShoppingCart,
+    Tag
+)
+from users.models import Subscribe, User
+
+RESULTS_DIR = os.path.join(settings.BASE_DIR, 'bench_results')
+TINY_PNG = (
+    'data:image/png;base64,iVBORw0KGgoAAAANSUhEUgAAAAEAAAABCAYAAAAfFcSJAAAA'
+    'DUlEQVR42mP8z8BQDwAEhQGAhKmMIQAAAABJRU5ErkJggg=='
+)
+
+
+class Command(BaseCommand):
+    help = (
+        'Нагрузочный прогон основных эндпоинтов: p50/p95, число SQL-запросов '
+        'и пиковая память. Результаты сохраняются в JSON.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=50)
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--output', default=None)
+        parser.add_argument(
+            '--compare',
+            default=None,
+            help='JSON предыдущего прогона для сравнения'
+        )
+
+    def pick_viewer(self):
+        """Пользователь с подписками и непустым списком покупок."""
+        user_id = ShoppingCart.objects.filter(
+            user__follower__isnull=False
+        ).values_list('user_id', flat=True).first()
+        if user_id is None:
+            raise CommandError(
+                'Нет данных: сначала выполните manage.py seed_benchmark'
+            )
+        return User.objects.get(pk=user_id)
+
+    def scenarios(self, viewer):
+        tags = list(Tag.objects.values_list('slug', flat=True))
+        author_id = Subscribe.objects.filter(
+            user=viewer
+        ).values_list('author_id', flat=True).first()
+        prefixes = list({
+            name[:2] for name in
+            Ingredient.objects.values_list('name', flat=True)[:500]
+        })
+        ingredients = list(
+            RecipeIngredient.objects.values_list('ingredients_id', flat=True)
+            .distinct()[:50]
+        )
+
+        def create_recipe(client):
+            with transaction.atomic():
+                try:
+                    return client.post(
+                        '/api/recipes/',
+                        data=json.dumps({
+                            'ingredients': [
+                                {'id': ingredient, 'amount': 10}
+                                for ingredient in self.random.sample(
+                                    ingredients, min(10, len(ingredients))
+                                )
+                            ],
+                            'tags': list(Tag.objects.values_list(
+                                'id', flat=True
+                            )[:2]),
+                            'image': TINY_PNG,
+                            'name': 'Рецепт бенчмарка',
+                            'text': 'Описание',
+                            'cooking_time': 10,
+                        }),
+                        content_type='application/json'
+                    )
+                finally:
+                    transaction.set_rollback(True)
+
+        return {
+            'recipes_list': lambda client: client.get(
+                '/api/recipes/', {'limit': 6}
+            ),
+            'recipes_list_anonymous': lambda client: Client().get(
+                '/api/recipes/', {'limit': 6}
+            ),
+            'recipes_filtered': lambda client: client.get('/api/recipes/', {
+                'tags': self.random.sample(tags, min(2, len(tags))),
+                'author': author_id,
+                'limit': 6,
+            }),
+            'recipes_favorited': lambda client: client.get(
+                '/api/recipes/', {'is_favorited': 1, 'limit': 6}
+            ),
+            'subscriptions': lambda client: client.get(
+                '/api/users/subscriptions/', {'recipes_limit': 3}
+            ),
+            'ingredients_search': lambda client: client.get(
+                '/api/ingredients/', {'name': self.random.choice(prefixes)}
+            ),
+            'download_shopping_cart': lambda client: client.get(
+                '/api/recipes/download_shopping_cart/'
+            ),
+            'recipe_create': create_recipe,
+        }
+
+    def consume(self, response):
+        if response.streaming:
+            return b''.join(response.streaming_content)
+        return response.content
+
+    def run_scenario(self, client, scenario, total):
+        latencies, queries, statuses = [], [], set()
+        for _ in range(total):
+            with CaptureQueriesContext(connection) as context:
+                start = time.perf_counter()
+                response = scenario(client)
+                self.consume(response)
+                latencies.append((time.perf_counter() - start) * 1000)
+            queries.append(len(context.captured_queries))
+            statuses.add(response.status_code)
+        tracemalloc.start()
+        self.consume(scenario(client))
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        latencies.sort()
+        return {
+            'p50_ms': round(statistics.median(latencies), 2),
+            'p95_ms': round(
+                latencies[min(len(latencies) - 1,
+                              int(len(latencies) * 0.95))], 2
+            ),
+            'mean_ms': round(statistics.mean(latencies), 2),
+            'queries': round(statistics.mean(queries), 1),
+            'peak_memory_kb': round(peak / 1024, 1),
+            'statuses': sorted(statuses),
+        }
+
+    def handle(self, *args, **options):
+        self.random = random.Random(options['seed'])
+        viewer = self.pick_viewer()
+        token, _ = Token.objects.get_or_create(user=viewer)
+        client = Client(HTTP_AUTHORIZATION=f'Token {token.key}')
+        results = {}
+        for name, scenario in self.scenarios(viewer).items():
+            results[name] = self.run_scenario(
+                client, scenario, options['requests']
+            )
+            row = results[name]
+            self.stdout.write(
+                f'{name:<26} p50 {row["p50_ms"]:>8.2f} мс  '
+                f'p95 {row["p95_ms"]:>8.2f} мс  '
+                f'SQL {row["queries"]:>5}  '
+                f'память {row["peak_memory_kb"]:>9.1f} КБ'
+            )
+        report = {
+            'created': timezone.now().isoformat(),
+            'database': connection.vendor,
+            'requests': options['requests'],
+            'dataset': {
+                'users': User.objects.count(),
+                'recipes': Recipe.objects.count(),
+            },
+            'scenarios': results,
+        }
+        output = options['output'] or os.path.join(
+            RESULTS_DIR, f'{timezone.now():%Y%m%d-%H%M%S}.json'
+        )
+        os.makedirs(os.path.dirname(output) or '.', exist_ok=True)
+        with open(output, 'w', encoding='UTF-8') as file:
+            json.dump(report, file, ensure_ascii=False, indent=2)
+        self.stdout.write(self.style.SUCCESS(f'Результаты: {output}'))
+        if options['compare']:
+            self.compare(options['compare'], results)
+
+    def compare(self, path, results):
+        with open(path, 'r', encoding='UTF-8') as file:
+            previous = json.load(file)['scenarios']
+        for name, row in results.items():
+            if name not in previous:
+                continue
+            before = previous[name]['p50_ms']
+            change = (row['p50_ms'] - before) / before * 100 if before else 0
+            self.stdout.write(
+                f'{name:<26} p50 {before:>8.2f} -> {row["p50_ms"]:>8.2f} мс '
+                f'({change:+.1f}%)'
+            )
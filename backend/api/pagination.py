@@ -1,5 +1,148 @@
-from rest_framework.pagination import PageNumberPagination
+from collections import OrderedDict
+
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import (
+    Cursor,
+    CursorPagination,
+    PageNumberPagination
+)
+from rest_framework.response import Response
 
 
 class LimitPageNumberPagination(PageNumberPagination):
     page_size_query_param = 'limit'
+
+
+class KeysetPositionMixin:
+    """
+    Позиция курсора - пара (pub_date, id) записи, а не значение одного
+    поля, как в CursorPagination: совпадающие даты не требуют OFFSET.
+    """
+    position_separator = '|'
+
+    def encode_position(self, pub_date, pk):
+        return f'{pub_date.isoformat()}{self.position_separator}{pk}'
+
+    def decode_position(self, cursor):
+        if cursor is None or cursor.position is None:
+            return None
+        pub_date, _, pk = cursor.position.rpartition(self.position_separator)
+        try:
+            position = (parse_datetime(pub_date), int(pk))
+        except ValueError:
+            raise NotFound(self.invalid_cursor_message)
+        if position[0] is None:
+            raise NotFound(self.invalid_cursor_message)
+        return position
+
+    def link(self, pub_date, pk, reverse=False):
+        return self.encode_cursor(Cursor(
+            offset=0,
+            reverse=reverse,
+            position=self.encode_position(pub_date, pk)
+        ))
+
+
+class RecipeCursorPagination(KeysetPositionMixin, CursorPagination):
+    """
+    Keyset-пагинация ленты рецептов по (-pub_date, -id): без COUNT(*)
+    и OFFSET, глубокие страницы стоят столько же, сколько первая.
+    Включается параметром ?pagination=cursor, дальше клиент
+    переходит по ссылкам next/previous с параметром cursor.
+    """
+    ordering = ('-pub_date', '-id')
+    page_size_query_param = 'limit'
+    mode_query_param = 'pagination'
+    mode = 'cursor'
+
+    @classmethod
+    def is_requested(cls, request):
+        return (
+            request.query_params.get(cls.mode_query_param) == cls.mode
+            or cls.cursor_query_param in request.query_params
+        )
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.page_size = self.get_page_size(request)
+        if not self.page_size:
+            return None
+        self.base_url = request.build_absolute_uri()
+        self.cursor = self.decode_cursor(request)
+        self.position = self.decode_position(self.cursor)
+        reverse = self.cursor is not None and self.cursor.reverse
+        if reverse:
+            queryset = queryset.order_by('pub_date', 'id')
+        else:
+            queryset = queryset.order_by(*self.ordering)
+        if self.position is not None:
+            pub_date, pk = self.position
+            lookup = 'gt' if reverse else 'lt'
+            queryset = queryset.filter(
+                Q(**{f'pub_date__{lookup}': pub_date})
+                | Q(pub_date=pub_date, **{f'id__{lookup}': pk})
+            )
+        results = list(queryset[:self.page_size + 1])
+        has_more = len(results) > self.page_size
+        self.page = results[:self.page_size]
+        if reverse:
+            self.page.reverse()
+            self.has_next = self.position is not None
+            self.has_previous = has_more
+        else:
+            self.has_next = has_more
+            self.has_previous = self.position is not None
+        return self.page
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        if not self.page:
+            return self.link(*self.position)
+        return self.link(self.page[-1].pub_date, self.page[-1].pk)
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        if not self.page:
+            return self.link(*self.position, reverse=True)
+        return self.link(self.page[0].pub_date, self.page[0].pk, reverse=True)
+
+
+class TimelinePagination(KeysetPositionMixin, CursorPagination):
+    """
+    Keyset-пагинация ленты подписок, только вперед. Страница собирается
+    из нескольких источников, поэтому вместо queryset она принимает
+    функцию выборки строк (pub_date, id).
+    """
+    page_size_query_param = 'limit'
+    max_page_size = 100
+
+    def paginate_rows(self, fetch, request):
+        """
+        fetch(position, size) возвращает до size строк (pub_date, id)
+        после позиции; лишняя строка показывает, есть ли следующая страница.
+        """
+        self.base_url = request.build_absolute_uri()
+        self.page_size = self.get_page_size(request)
+        rows = fetch(
+            self.decode_position(self.decode_cursor(request)),
+            self.page_size + 1
+        )
+        self.next_position = None
+        if len(rows) > self.page_size:
+            rows = rows[:self.page_size]
+            self.next_position = rows[-1]
+        return rows
+
+    def get_next_link(self):
+        if self.next_position is None:
+            return None
+        return self.link(*self.next_position)
+
+    def get_paginated_response(self, data):
+        return Response(OrderedDict([
+            ('next', self.get_next_link()),
+            ('results', data),
+        ]))
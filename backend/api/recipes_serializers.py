@@ -1,9 +1,15 @@
-import base64
-
-from django.core.files.base import ContentFile
+from django.db import transaction
+from django.db.models import Prefetch, Q, prefetch_related_objects
 from rest_framework import serializers
 from .users_serializers import CustomUserSerializer
 
+from recipes.images import (
+    IMAGE_VARIANTS,
+    VARIANT_FORMATS,
+    ImageValidationError,
+    decode_base64_image,
+    image_url
+)
 from recipes.models import (
     Ingredient,
     FavoriteRecipe,
@@ -16,6 +22,10 @@ from recipes.models import (
 RECIPES_NOT_FOUND = 'Рецепт не найден'
 RECIPES_IN_LIST = 'Рецепт уже добавлен в список'
 RECIPES_NOT_DELETED = 'Рецепт не находится в списке'
+INGREDIENTS_NOT_FOUND = 'Ингредиенты не найдены: {}'
+MAX_BULK_RECIPES = 100
+# Действия, в которых рецепты выводятся списком карточек
+LIST_ACTIONS = ('list', 'cook', 'similar', 'timeline')
 
 
 class TagSerializer(serializers.ModelSerializer):
@@ -37,12 +47,14 @@ class IngredientSerializer(serializers.ModelSerializer):
 
 
 class Base64ImageField(serializers.ImageField):
-    """Кастомное поле для картинки"""
+    """Кастомное поле для картинки.
+    Декодирует base64 частями во временный файл с именем по хэшу."""
     def to_internal_value(self, data):
         if isinstance(data, str) and data.startswith('data:image'):
-            format, imgstr = data.split(';base64,')
-            ext = format.split('/')[-1]
-            data = ContentFile(base64.b64decode(imgstr), name='temp.' + ext)
+            try:
+                data = decode_base64_image(data)
+            except ImageValidationError as error:
+                raise serializers.ValidationError(str(error))
 
         return super().to_internal_value(data)
 
@@ -63,7 +75,8 @@ class RecipeIngredientSerializer(serializers.ModelSerializer):
 
 class RecipeSerializer(serializers.ModelSerializer):
     """Обрабатывает запросы на чтение на эндпоинт /api/recipes/"""
-    image = Base64ImageField(required=False, allow_null=True)
+    image = serializers.SerializerMethodField()
+    image_variants = serializers.SerializerMethodField()
     tags = TagSerializer(many=True, read_only=True)
     author = CustomUserSerializer(many=False, read_only=True)
     ingredients = RecipeIngredientSerializer(
@@ -74,19 +87,43 @@ class RecipeSerializer(serializers.ModelSerializer):
     is_favorited = serializers.SerializerMethodField()
     is_in_shopping_cart = serializers.SerializerMethodField()
 
+    def get_image(self, obj):
+        """В списке отдается карточка, в рецепте — детальный вариант"""
+        variant = 'detail'
+        if getattr(self.context.get('view'), 'action', None) in LIST_ACTIONS:
+            variant = 'card'
+        return image_url(self.context.get('request'), obj, variant)
+
+    def get_image_variants(self, obj):
+        request = self.context.get('request')
+        return {
+            variant: {
+                image_format: image_url(request, obj, variant, image_format)
+                for image_format in VARIANT_FORMATS
+            }
+            for variant in IMAGE_VARIANTS
+        }
+
     def get_is_favorited(self, obj):
-        """Проверка на нахождение рецепта в избранных"""
+        """Проверка на нахождение рецепта в избранных.
+        Берет аннотацию favorited из RecipeViewSet.get_queryset,
+        без нее делает отдельный запрос."""
         request = self.context.get('request')
-        if request.user.is_anonymous or request is None:
+        if request is None or request.user.is_anonymous:
             return False
+        if hasattr(obj, 'favorited'):
+            return obj.favorited
         return FavoriteRecipe.objects.filter(user=request.user,
                                              recipe=obj).exists()
 
     def get_is_in_shopping_cart(self, obj):
-        """Если рецепт в списке покупок, вернет True"""
+        """Если рецепт в списке покупок, вернет True.
+        Берет аннотацию in_shopping_cart, если она есть."""
         request = self.context.get('request')
-        if request.user.is_anonymous or request is None:
+        if request is None or request.user.is_anonymous:
             return False
+        if hasattr(obj, 'in_shopping_cart'):
+            return obj.in_shopping_cart
         return ShoppingCart.objects.filter(
             user=request.user,
             recipe=obj
@@ -103,6 +140,7 @@ class RecipeSerializer(serializers.ModelSerializer):
             'is_in_shopping_cart',
             'name',
             'image',
+            'image_variants',
             'text',
             'cooking_time'
         )
@@ -111,10 +149,9 @@ class RecipeSerializer(serializers.ModelSerializer):
 class CreateRecipeIngredientSerializer(serializers.ModelSerializer):
     """Обрабатывает данные для 2ух моделей
     к ингредиентам добавляем поле amount. Используем для POST запросов
-    на создание рецепта."""
-    id = serializers.PrimaryKeyRelatedField(
-        source='ingredients', queryset=Ingredient.objects.all()
-    )
+    на создание рецепта. Существование ингредиентов проверяется
+    одним запросом в CreateRecipeSerializer.validate_ingredients."""
+    id = serializers.IntegerField(source='ingredients_id')
 
     class Meta:
         model = RecipeIngredient
@@ -129,36 +166,94 @@ class CreateRecipeSerializer(serializers.ModelSerializer):
 
     def to_representation(self, value):
         """POST запрос обрабатываем другим сериализатором"""
+        prefetch_related_objects(
+            [value],
+            'tags',
+            Prefetch(
+                'ingredients',
+                queryset=RecipeIngredient.objects.select_related(
+                    'ingredients'
+                )
+            )
+        )
         return RecipeSerializer(
             value,
             context={'request': self.context.get('request')}
         ).data
 
-    def add_ingredients(self, ingredients_data, recipes):
-        for ingredient in ingredients_data:
-            current_ingredient, status = (
-                RecipeIngredient.objects.get_or_create(**ingredient)
+    def validate_ingredients(self, value):
+        ids = {item['ingredients_id'] for item in value}
+        found = set(
+            Ingredient.objects.filter(id__in=ids).values_list('id', flat=True)
+        )
+        if ids - found:
+            raise serializers.ValidationError(
+                INGREDIENTS_NOT_FOUND.format(
+                    ', '.join(map(str, sorted(ids - found)))
+                )
             )
-            recipes.ingredients.add(current_ingredient)
+        return value
+
+    def get_ingredient_ids(self, ingredients_data):
+        """Возвращает id строк RecipeIngredient для пар
+        (ингредиент, количество). Недостающие пары создаются пачкой."""
+        pairs = {
+            (item['ingredients_id'], item['amount'])
+            for item in ingredients_data
+        }
+        if not pairs:
+            return set()
+        query = Q()
+        for ingredient_id, amount in pairs:
+            query |= Q(ingredients_id=ingredient_id, amount=amount)
+
+        def lookup():
+            rows = RecipeIngredient.objects.filter(query).order_by(
+                '-id'
+            ).values_list('id', 'ingredients_id', 'amount')
+            return {
+                (ingredient_id, amount): pk
+                for pk, ingredient_id, amount in rows
+            }
+
+        existing = lookup()
+        missing = pairs - existing.keys()
+        if missing:
+            RecipeIngredient.objects.bulk_create(
+                RecipeIngredient(ingredients_id=ingredient_id, amount=amount)
+                for ingredient_id, amount in missing
+            )
+            existing = lookup()
+        return set(existing.values())
+
+    def add_ingredients(self, ingredients_data, recipes):
+        """Приводит ингредиенты рецепта к ingredients_data:
+        добавляет и удаляет только изменившиеся связи."""
+        new_ids = self.get_ingredient_ids(ingredients_data)
+        current_ids = set(recipes.ingredients.values_list('id', flat=True))
+        if current_ids - new_ids:
+            recipes.ingredients.remove(*(current_ids - new_ids))
+        if new_ids - current_ids:
+            recipes.ingredients.add(*(new_ids - current_ids))
         return recipes
 
+    @transaction.atomic
     def create(self, validated_data):
         tag_data = validated_data.pop('tags')
         ingredients_data = validated_data.pop('ingredients')
         recipes = Recipe.objects.create(**validated_data)
         recipes.tags.set(tag_data)
-        self.add_ingredients(ingredients_data, recipes)
+        recipes.ingredients.add(*self.get_ingredient_ids(ingredients_data))
         return recipes
 
+    @transaction.atomic
     def update(self, instance, validated_data):
         tag_data = validated_data.pop('tags')
         ingredients_data = validated_data.pop('ingredients')
         if validated_data.get('image') is not None:
             instance.image = validated_data.pop('image')
         recipes = instance
-        recipes.tags.clear()
         recipes.tags.set(tag_data)
-        recipes.ingredients.clear()
         self.add_ingredients(ingredients_data, recipes)
         return super().update(recipes, validated_data)
 
@@ -224,3 +319,30 @@ class FavoriteRecipeSerializer(ShoppingCartSerializer):
 
     class Meta(ShoppingCartSerializer.Meta):
         model = FavoriteRecipe
+
+
+class BulkRecipesSerializer(serializers.Serializer):
+    """
+    Обрабатывает пакетные эндпоинты /api/recipes/shopping_cart/
+    и /api/recipes/favorite/: список id рецептов без повторов.
+    """
+    recipes = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        allow_empty=True,
+        max_length=MAX_BULK_RECIPES,
+    )
+
+    def validate_recipes(self, value):
+        return list(dict.fromkeys(value))
+
+
+class CookQuerySerializer(serializers.Serializer):
+    """
+    Параметры /api/recipes/cook/: имеющиеся ингредиенты
+    и допустимое число недостающих.
+    """
+    ingredients = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        min_length=1,
+    )
+    max_missing = serializers.IntegerField(min_value=0, required=False)
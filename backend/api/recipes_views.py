@@ -1,21 +1,47 @@
-from django.http import HttpResponse
+from django.db import connections, router, transaction
+from django.db.models import Exists, F, OuterRef, Prefetch
+from django.http import StreamingHttpResponse
 from django.shortcuts import get_object_or_404
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework import permissions, status, viewsets
-from rest_framework.decorators import api_view, permission_classes
+from rest_framework.decorators import (
+    action,
+    api_view,
+    permission_classes,
+    renderer_classes
+)
 from rest_framework.response import Response
-from api.pagination import LimitPageNumberPagination
+from api.cache import cache_anonymous
+from api.pagination import (
+    LimitPageNumberPagination,
+    RecipeCursorPagination,
+    TimelinePagination
+)
 from api.permissions import OwnerOrReadOnly
+from api.renderers import (
+    ShoppingListCSVRenderer,
+    ShoppingListJSONRenderer,
+    ShoppingListTextRenderer
+)
+from api.snapshots import ingredients_snapshot, tags_snapshot
 
+from recipes.cook_index import cook_index
+from recipes.ingredient_index import ingredient_index
+from recipes.signals import batch_deletes, bulk_changed
+from recipes.timeline import timeline_page
+from recipes.versions import RECIPES_VERSION
 from recipes.models import (
     FavoriteRecipe,
     Ingredient,
     Recipe,
     RecipeIngredient,
     ShoppingCart,
+    ShoppingListItem,
     Tag
 )
 from .recipes_serializers import (
+    BulkRecipesSerializer,
+    CookQuerySerializer,
     FavoriteRecipeSerializer,
     IngredientSerializer,
     CreateRecipeSerializer,
@@ -23,36 +49,59 @@ from .recipes_serializers import (
     ShoppingCartSerializer,
     TagSerializer
 )
-from .filters import IngredientFilter, RecipeFilter
+from .filters import IngredientFilter, RecipeFilter, RecipeSearchFilter
 
-HEADING_SHOPING_LIST = 'Список покупок для приготовления:\n\n'
+SHOPPING_LIST_FILENAME = 'shopping-list.{}'
+SIMILAR_RECIPES_LIMIT = 10
+BULK_ADDED = 'added'
+BULK_REMOVED = 'removed'
+BULK_ALREADY_IN_LIST = 'already_in_list'
+BULK_NOT_IN_LIST = 'not_in_list'
+BULK_NOT_FOUND = 'not_found'
+
+
+def get_shopping_list(user):
+    """
+    Готовый список покупок из материализованной таблицы,
+    которая поддерживается при изменении корзины и рецептов.
+    """
+    return ShoppingListItem.objects.filter(user=user).values_list(
+        'ingredient__name',
+        'ingredient__measurement_unit',
+        'amount'
+    ).order_by('ingredient__name', 'ingredient__measurement_unit')
 
 
 @api_view(['GET'])
 @permission_classes([permissions.IsAuthenticated, ])
+@renderer_classes([
+    ShoppingListTextRenderer,
+    ShoppingListCSVRenderer,
+    ShoppingListJSONRenderer
+])
 def download_shopping_cart(request):
-    """Формирует и отдает список покупок"""
-    ingredients = RecipeIngredient.objects.filter(
-        recipe_ingredients__is_in_shopping_cart__user=request.user
+    """
+    Формирует и отдает список покупок.
+    Формат выбирается параметром ?format=txt|csv|json.
+    """
+    renderer = request.accepted_renderer
+    rows = get_shopping_list(request.user).iterator()
+    response = StreamingHttpResponse(
+        renderer.stream(rows),
+        content_type=f'{renderer.media_type}; charset={renderer.charset}'
+    )
+    response['Content-Disposition'] = 'attachment; filename="{}"'.format(
+        SHOPPING_LIST_FILENAME.format(renderer.format)
+    )
+    return response
+
+
+def snapshot_requested(request):
+    """Полный список без фильтров в JSON можно отдать из снимка"""
+    return (
+        not request.query_params
+        and request.accepted_renderer.format == 'json'
     )
-    shopping_dict = {}
-    data = HEADING_SHOPING_LIST
-    for ingredient in ingredients:
-        amount = ingredient.amount
-        name = ingredient.ingredients.name
-        measurement_unit = ingredient.ingredients.measurement_unit
-        if name not in shopping_dict:
-            shopping_dict[name] = {
-                'amount': amount,
-                'measurement_unit': measurement_unit
-            }
-        else:
-            shopping_dict[name]['amount'] += amount
-    for ingredient in shopping_dict:
-        data += ingredient + ' - ' + str(
-            shopping_dict[ingredient]['amount']
-        ) + ' ' + shopping_dict[ingredient]['measurement_unit'] + '\n'
-    return HttpResponse(data, content_type='text/plain')
 
 
 class TagViewSet(viewsets.ModelViewSet):
@@ -60,6 +109,11 @@ class TagViewSet(viewsets.ModelViewSet):
     serializer_class = TagSerializer
     permission_classes = (permissions.IsAuthenticatedOrReadOnly,)
 
+    def list(self, request, *args, **kwargs):
+        if snapshot_requested(request):
+            return tags_snapshot.response(request)
+        return super().list(request, *args, **kwargs)
+
 
 class IngredientViewSet(viewsets.ModelViewSet):
     queryset = Ingredient.objects.all()
@@ -68,19 +122,146 @@ class IngredientViewSet(viewsets.ModelViewSet):
     filter_backends = (DjangoFilterBackend,)
     filterset_class = IngredientFilter
 
+    def list(self, request, *args, **kwargs):
+        """Поиск по началу названия отдается из индекса в памяти"""
+        if snapshot_requested(request):
+            return ingredients_snapshot.response(request)
+        name = request.query_params.get('name')
+        if name is None:
+            return super().list(request, *args, **kwargs)
+        limit = request.query_params.get('limit')
+        return Response(ingredient_index.search(
+            name, int(limit) if limit and limit.isdigit() else None
+        ))
+
 
 class RecipeViewSet(viewsets.ModelViewSet):
     pagination_class = LimitPageNumberPagination
     queryset = Recipe.objects.all()
     permission_classes = (OwnerOrReadOnly,)
-    filter_backends = [DjangoFilterBackend]
+    filter_backends = [DjangoFilterBackend, RecipeSearchFilter]
     filterset_class = RecipeFilter
 
+    @property
+    def paginator(self):
+        """Cursor-пагинация по запросу клиента, иначе page/limit"""
+        if not hasattr(self, '_paginator'):
+            if RecipeCursorPagination.is_requested(self.request):
+                self._paginator = RecipeCursorPagination()
+            else:
+                self._paginator = self.pagination_class()
+        return self._paginator
+
+    @cache_anonymous('recipes', RECIPES_VERSION)
+    def list(self, request, *args, **kwargs):
+        return super().list(request, *args, **kwargs)
+
+    @cache_anonymous('recipes', RECIPES_VERSION)
+    def retrieve(self, request, *args, **kwargs):
+        return super().retrieve(request, *args, **kwargs)
+
+    def get_queryset(self):
+        """
+        Связанные объекты подгружаются пачкой, а флаги избранного
+        и списка покупок вычисляются подзапросами Exists(),
+        чтобы страница стоила фиксированное число запросов.
+        """
+        queryset = Recipe.objects.select_related('author').prefetch_related(
+            'tags',
+            Prefetch(
+                'ingredients',
+                queryset=RecipeIngredient.objects.select_related(
+                    'ingredients'
+                )
+            )
+        )
+        user = self.request.user
+        if user.is_anonymous:
+            return queryset
+        return queryset.annotate(
+            favorited=Exists(FavoriteRecipe.objects.filter(
+                user=user, recipe=OuterRef('pk')
+            )),
+            in_shopping_cart=Exists(ShoppingCart.objects.filter(
+                user=user, recipe=OuterRef('pk')
+            ))
+        )
+
     def get_serializer_class(self):
         if self.request.method == 'GET':
             return RecipeSerializer
         return CreateRecipeSerializer
 
+    def get_ranked_page(self, ranking):
+        """
+        Страница рецептов в порядке ranking - списка кортежей
+        (id, совпало, не хватает) - с полями matched и missing.
+        """
+        paginator = LimitPageNumberPagination()
+        page = paginator.paginate_queryset(ranking, self.request, view=self)
+        recipes = self.get_queryset().in_bulk([row[0] for row in page])
+        page = [row for row in page if row[0] in recipes]
+        data = RecipeSerializer(
+            [recipes[row[0]] for row in page],
+            many=True,
+            context=self.get_serializer_context()
+        ).data
+        for item, (_, matched, missing) in zip(data, page):
+            item['matched'] = matched
+            item['missing'] = missing
+        return paginator.get_paginated_response(data)
+
+    @action(detail=False, permission_classes=(permissions.AllowAny,))
+    def cook(self, request):
+        """
+        Что приготовить: ?ingredients=1&ingredients=2[&max_missing=K].
+        Рецепты отсортированы по числу недостающих ингредиентов.
+        """
+        params = CookQuerySerializer(data=request.query_params)
+        params.is_valid(raise_exception=True)
+        return self.get_ranked_page(cook_index.rank(
+            params.validated_data['ingredients'],
+            params.validated_data.get('max_missing')
+        ))
+
+    @action(detail=False, permission_classes=(permissions.IsAuthenticated,))
+    def timeline(self, request):
+        """
+        Лента новых рецептов авторов из подписок пользователя,
+        keyset-пагинация по ссылке next.
+        """
+        paginator = TimelinePagination()
+        rows = paginator.paginate_rows(
+            lambda position, size: timeline_page(
+                request.user.pk, position, size
+            ),
+            request
+        )
+        recipes = self.get_queryset().in_bulk([pk for _, pk in rows])
+        data = self.get_serializer(
+            [recipes[pk] for _, pk in rows if pk in recipes], many=True
+        ).data
+        return paginator.get_paginated_response(data)
+
+    @action(detail=True, permission_classes=(permissions.AllowAny,))
+    @cache_anonymous('recipes', RECIPES_VERSION)
+    def similar(self, request, pk=None):
+        """
+        Похожие рецепты из таблицы, заполняемой командой
+        build_similar_recipes: один запрос по индексу (recipe, rank).
+        """
+        recipes = list(self.get_queryset().filter(
+            similar_to__recipe_id=pk
+        ).annotate(
+            similarity=F('similar_to__score')
+        ).order_by('similar_to__rank')[:SIMILAR_RECIPES_LIMIT])
+        if not recipes:
+            get_object_or_404(Recipe, pk=pk)
+        data = self.get_serializer(recipes, many=True).data
+        for item, recipe in zip(data, recipes):
+            item['similarity'] = round(recipe.similarity, 4)
+        return Response(data)
+
     def perform_create(self, serializer):
         serializer.save(author=self.request.user)
 
@@ -92,6 +273,11 @@ class ShoppingCartViewSet(viewsets.ModelViewSet):
     queryset = main_model.objects.all()
     permission_classes = (permissions.IsAuthenticated, OwnerOrReadOnly)
 
+    @transaction.atomic
+    def create(self, request, *args, **kwargs):
+        """Запись и счетчики рецепта (сигналы) - в одной транзакции."""
+        return super().create(request, *args, **kwargs)
+
     def perform_create(self, serializer):
         recipe = get_object_or_404(Recipe, pk=self.kwargs.get('recipes_id'))
         if not serializer.is_valid():
@@ -101,6 +287,7 @@ class ShoppingCartViewSet(viewsets.ModelViewSet):
             )
         return serializer.save(user=self.request.user, recipe=recipe)
 
+    @transaction.atomic
     def destroy(self, request, recipes_id):
         serializer = self.get_serializer(data=request.data)
         if not serializer.is_valid():
@@ -120,3 +307,131 @@ class FavoriteViewSet(ShoppingCartViewSet):
     serializer_class = FavoriteRecipeSerializer
     main_model = FavoriteRecipe
     permission_classes = (permissions.IsAuthenticated, OwnerOrReadOnly)
+
+
+class BulkShoppingCartViewSet(viewsets.ViewSet):
+    """
+    Пакетная работа со списком покупок: /api/recipes/shopping_cart/
+    POST - добавить рецепты, DELETE - удалить, PUT - заменить список
+    (PUT с пустым списком очищает его). Тело: {"recipes": [id, ...]}.
+    Для каждого id возвращается результат операции.
+    """
+    main_model = ShoppingCart
+    permission_classes = (permissions.IsAuthenticated,)
+
+    def get_recipe_ids(self, request):
+        serializer = BulkRecipesSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        return serializer.validated_data['recipes']
+
+    def get_queryset(self):
+        return self.main_model.objects.filter(user=self.request.user)
+
+    def insert(self, recipe_ids):
+        """
+        INSERT ... ON CONFLICT DO NOTHING RETURNING: возвращает id рецептов
+        только реально вставленных строк. Параллельная вставка той же пары
+        ждет коммита первой и не попадает в результат (PostgreSQL,
+        SQLite 3.35+). bulk_create(ignore_conflicts=True) в Django 3.2
+        вставленные строки не возвращает.
+        """
+        if not recipe_ids:
+            return set()
+        model = self.main_model
+        connection = connections[router.db_for_write(model)]
+        quote = connection.ops.quote_name
+        user_column = quote(model._meta.get_field('user').column)
+        recipe_column = quote(model._meta.get_field('recipe').column)
+        sql = (
+            f'INSERT INTO {quote(model._meta.db_table)} '
+            f'({user_column}, {recipe_column}) VALUES '
+            + ', '.join(['(%s, %s)'] * len(recipe_ids))
+            + f' ON CONFLICT DO NOTHING RETURNING {recipe_column}'
+        )
+        params = [
+            value for recipe_id in sorted(recipe_ids)
+            for value in (self.request.user.pk, recipe_id)
+        ]
+        with connection.cursor() as cursor:
+            cursor.execute(sql, params)
+            return {recipe_id for recipe_id, in cursor.fetchall()}
+
+    def add(self, recipe_ids):
+        """
+        Вставка одним запросом; дубли отсекает unique_together.
+        Счетчики меняются только для строк, которые вставил этот запрос.
+        """
+        found = set(Recipe.objects.filter(
+            id__in=recipe_ids
+        ).values_list('id', flat=True))
+        added = self.insert(found)
+        bulk_changed(self.main_model, self.request.user.pk, added, 1)
+        return found, added
+
+    def remove(self, queryset):
+        """
+        Удаление одним запросом. Строки сначала блокируются (delete()
+        сам select_for_update не применяет), поэтому параллельный запрос
+        не удалит их повторно. Счетчики и список покупок меняются после
+        удаления разом для рецептов, чьи строки удалены.
+        """
+        locked = list(
+            queryset.select_for_update().values_list('pk', flat=True)
+        )
+        with batch_deletes(self.main_model, self.request.user.pk) as removed:
+            self.main_model.objects.filter(pk__in=locked).delete()
+        return set(removed)
+
+    def added_status(self, recipe_id, found, added):
+        if recipe_id in added:
+            return BULK_ADDED
+        if recipe_id in found:
+            return BULK_ALREADY_IN_LIST
+        return BULK_NOT_FOUND
+
+    def results(self, statuses):
+        return Response({'recipes': [
+            {'id': recipe_id, 'status': status}
+            for recipe_id, status in statuses
+        ]})
+
+    @transaction.atomic
+    def create(self, request):
+        recipe_ids = self.get_recipe_ids(request)
+        found, added = self.add(recipe_ids)
+        return self.results(
+            (recipe_id, self.added_status(recipe_id, found, added))
+            for recipe_id in recipe_ids
+        )
+
+    @transaction.atomic
+    def destroy(self, request):
+        recipe_ids = self.get_recipe_ids(request)
+        removed = self.remove(
+            self.get_queryset().filter(recipe__in=recipe_ids)
+        )
+        return self.results(
+            (recipe_id, BULK_REMOVED if recipe_id in removed
+             else BULK_NOT_IN_LIST)
+            for recipe_id in recipe_ids
+        )
+
+    @transaction.atomic
+    def update(self, request):
+        recipe_ids = self.get_recipe_ids(request)
+        removed = self.remove(
+            self.get_queryset().exclude(recipe__in=recipe_ids)
+        )
+        found, added = self.add(recipe_ids)
+        return self.results(
+            [(recipe_id, BULK_REMOVED) for recipe_id in sorted(removed)]
+            + [
+                (recipe_id, self.added_status(recipe_id, found, added))
+                for recipe_id in recipe_ids
+            ]
+        )
+
+
+class BulkFavoriteViewSet(BulkShoppingCartViewSet):
+    """Пакетная работа с избранным: /api/recipes/favorite/"""
+    main_model = FavoriteRecipe
@@ -0,0 +1,70 @@
+import csv
+import json
+from abc import ABCMeta, abstractmethod
+
+from rest_framework.renderers import BaseRenderer
+
+HEADING_SHOPING_LIST = 'Список покупок для приготовления:\n\n'
+SHOPPING_LIST_HEADER = ('name', 'measurement_unit', 'amount')
+
+
+class Echo:
+    """Псевдо-буфер для csv.writer: возвращает строку вместо записи."""
+    def write(self, value):
+        return value
+
+
+class ShoppingListRenderer(BaseRenderer, metaclass=ABCMeta):
+    """
+    Базовый рендерер списка покупок.
+    Принимает кортежи (name, measurement_unit, amount).
+    Строки отдаются генератором stream(), чтобы ответ можно было
+    передавать через StreamingHttpResponse, не собирая его в памяти.
+    """
+    charset = 'utf-8'
+
+    @abstractmethod
+    def stream(self, rows):
+        """Генератор строк ответа."""
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if isinstance(data, dict):
+            # Ответы с ошибками (401, 405) отдаются как есть
+            return json.dumps(data, ensure_ascii=False).encode(self.charset)
+        return ''.join(self.stream(data)).encode(self.charset)
+
+
+class ShoppingListTextRenderer(ShoppingListRenderer):
+    media_type = 'text/plain'
+    format = 'txt'
+
+    def stream(self, rows):
+        yield HEADING_SHOPING_LIST
+        for name, measurement_unit, amount in rows:
+            yield f'{name} - {amount} {measurement_unit}\n'
+
+
+class ShoppingListCSVRenderer(ShoppingListRenderer):
+    media_type = 'text/csv'
+    format = 'csv'
+
+    def stream(self, rows):
+        writer = csv.writer(Echo())
+        yield writer.writerow(SHOPPING_LIST_HEADER)
+        for row in rows:
+            yield writer.writerow(row)
+
+
+class ShoppingListJSONRenderer(ShoppingListRenderer):
+    media_type = 'application/json'
+    format = 'json'
+
+    def stream(self, rows):
+        separator = '['
+        for row in rows:
+            yield separator + json.dumps(
+                dict(zip(SHOPPING_LIST_HEADER, row)),
+                ensure_ascii=False
+            )
+            separator = ','
+        yield '[]' if separator == '[' else ']'
@@ -0,0 +1,40 @@
+import logging
+
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from rest_framework.authtoken.models import Token
+
+from .authentication import token_cache
+
+logger = logging.getLogger(__name__)
+
+User = get_user_model()
+
+
+def invalidate_tokens(keys):
+    def invalidate():
+        try:
+            token_cache.invalidate(keys)
+        except Exception:
+            logger.warning('Кэш токенов недоступен', exc_info=True)
+    transaction.on_commit(invalidate)
+
+
+@receiver(post_delete, sender=Token)
+def token_deleted(instance, **kwargs):
+    """Выход через djoser удаляет токен."""
+    invalidate_tokens([instance.key])
+
+
+@receiver(post_save, sender=User)
+def user_changed(instance, update_fields=None, **kwargs):
+    """Смена пароля, деактивация и другие изменения пользователя."""
+    if update_fields is not None and set(update_fields) == {'last_login'}:
+        return
+    keys = list(Token.objects.filter(user=instance).values_list(
+        'key', flat=True
+    ))
+    if keys:
+        invalidate_tokens(keys)
@@ -0,0 +1,112 @@
+import gzip
+import hashlib
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse, HttpResponseNotModified
+from django.utils.cache import patch_vary_headers
+from rest_framework.renderers import JSONRenderer
+
+from foodgram.db_router import use_primary
+from recipes.models import Ingredient, Tag
+from recipes.versions import INGREDIENTS_VERSION, TAGS_VERSION, get_version
+from .recipes_serializers import IngredientSerializer, TagSerializer
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+
+class Snapshot:
+    """
+    Заранее отрендеренный JSON полного списка справочника
+    с готовыми сжатыми копиями и strong ETag.
+    Снимок хранится в общем кэше под ключом с версией данных,
+    а последняя версия дополнительно запоминается в памяти процесса.
+    Ответ 304 на If-None-Match не обращается к БД.
+    """
+    encodings = ('br', 'gzip')
+
+    def __init__(self, name, version_key, queryset, serializer_class):
+        self.name = name
+        self.version_key = version_key
+        self.queryset = queryset
+        self.serializer_class = serializer_class
+        self._local = None
+
+    def cache_key(self, version):
+        return f'snapshot:{self.name}:{version}'
+
+    def build(self, version):
+        with use_primary():
+            data = self.serializer_class(self.queryset.all(), many=True).data
+        body = JSONRenderer().render(data)
+        digest = hashlib.sha256(body).hexdigest()[:32]
+        snapshot = {
+            'version': version,
+            'etag': digest,
+            'identity': body,
+            'gzip': gzip.compress(body, compresslevel=9),
+            'br': brotli.compress(body) if brotli else None,
+        }
+        cache.set(self.cache_key(version), snapshot, timeout=None)
+        self._local = snapshot
+        return snapshot
+
+    def get(self):
+        version = get_version(self.version_key)
+        if self._local is not None and self._local['version'] == version:
+            return self._local
+        snapshot = cache.get(self.cache_key(version))
+        if snapshot is None:
+            return self.build(version)
+        self._local = snapshot
+        return snapshot
+
+    def choose_encoding(self, request, snapshot):
+        accepted = {
+            item.split(';')[0].strip()
+            for item in request.META.get('HTTP_ACCEPT_ENCODING', '').split(',')
+        }
+        for encoding in self.encodings:
+            if encoding in accepted and snapshot[encoding] is not None:
+                return encoding
+        return 'identity'
+
+    def response(self, request):
+        snapshot = self.get()
+        encoding = self.choose_encoding(request, snapshot)
+        if encoding == 'identity':
+            etag = f'"{snapshot["etag"]}"'
+        else:
+            etag = f'"{snapshot["etag"]}-{encoding}"'
+        if_none_match = {
+            tag.strip()
+            for tag in request.META.get('HTTP_IF_NONE_MATCH', '').split(',')
+        }
+        if etag in if_none_match or '*' in if_none_match:
+            response = HttpResponseNotModified()
+        else:
+            response = HttpResponse(
+                snapshot[encoding],
+                content_type='application/json'
+            )
+            if encoding != 'identity':
+                response['Content-Encoding'] = encoding
+        response['ETag'] = etag
+        response['Cache-Control'] = (
+            f'public, max-age={settings.SNAPSHOT_MAX_AGE}, must-revalidate'
+        )
+        patch_vary_headers(response, ('Accept-Encoding',))
+        return response
+
+
+tags_snapshot = Snapshot(
+    'tags', TAGS_VERSION, Tag.objects.all(), TagSerializer
+)
+ingredients_snapshot = Snapshot(
+    'ingredients', INGREDIENTS_VERSION, Ingredient.objects.all(),
+    IngredientSerializer
+)
+SNAPSHOTS = (tags_snapshot, ingredients_snapshot)
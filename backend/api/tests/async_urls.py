@@ -0,0 +1,8 @@
+"""URLconf с асинхронными view независимо от FOODGRAM_ASYNC_API."""
+from django.urls import include, path
+
+from api.urls import async_urlpatterns, urlpatterns as api_urlpatterns
+
+urlpatterns = [
+    path('api/', include(list(async_urlpatterns) + api_urlpatterns)),
+]
@@ -0,0 +1,64 @@
+from django.core.cache import cache
+from django.test import TestCase
+from model_bakery import baker
+
+from recipes.models import Recipe
+from recipes.versions import RECIPES_VERSION, bump_version
+from users.models import User
+from .utils import api_client, make_recipes
+
+
+class AnonymousCacheTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = baker.make(User)
+        cls.recipe = make_recipes(baker.make(User), 1)[0]
+
+    def setUp(self):
+        cache.clear()
+
+    def names(self, client, url='/api/recipes/'):
+        response = client.get(url)
+        self.assertEqual(response.status_code, 200)
+        if 'results' in response.data:
+            return [recipe['name'] for recipe in response.data['results']]
+        return response.data['name']
+
+    def rename(self, name):
+        Recipe.objects.filter(pk=self.recipe.pk).update(name=name)
+
+    def test_hit_without_queries(self):
+        client = api_client()
+        for url in ('/api/recipes/', f'/api/recipes/{self.recipe.pk}/'):
+            with self.subTest(url=url):
+                self.names(client, url)
+                with self.assertNumQueries(0):
+                    self.names(client, url)
+
+    def test_version_bump_invalidates(self):
+        client = api_client()
+        old = self.names(client)
+        self.rename('Новое имя')
+        self.assertEqual(self.names(client), old)
+        bump_version(RECIPES_VERSION)
+        self.assertEqual(self.names(client), ['Новое имя'])
+
+    def test_model_change_bumps_version(self):
+        client = api_client()
+        self.names(client)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.recipe.name = 'Новое имя'
+            self.recipe.save()
+        self.assertEqual(self.names(client), ['Новое имя'])
+
+    def test_authenticated_bypass(self):
+        client = api_client(self.user)
+        self.names(api_client())
+        self.rename('Новое имя')
+        # Авторизованный не читает анонимный кэш
+        self.assertEqual(self.names(client), ['Новое имя'])
+
+    def test_authenticated_does_not_fill(self):
+        self.names(api_client(self.user))
+        self.rename('Новое имя')
+        self.assertEqual(self.names(api_client()), ['Новое имя'])
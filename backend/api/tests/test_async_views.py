@@ -0,0 +1,100 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.db.backends.signals import connection_created
+from django.test import Client, TransactionTestCase, override_settings
+from model_bakery import baker
+from rest_framework.authtoken.models import Token
+
+from recipes.models import FavoriteRecipe, Ingredient, ShoppingCart
+from users.models import Subscribe, User
+from .utils import TINY_PNG, make_recipes
+
+ASYNC_URLS = 'api.tests.async_urls'
+
+
+class AsyncViewsTests(TransactionTestCase):
+    """
+    TransactionTestCase: асинхронные view читают в потоках пула
+    со своими соединениями, незакоммиченных данных они бы не увидели.
+    """
+    def setUp(self):
+        cache.clear()
+        self.user = baker.make(User)
+        author = baker.make(User)
+        self.recipes = make_recipes(author, 3)
+        Subscribe.objects.create(user=self.user, author=author)
+        FavoriteRecipe.objects.create(user=self.user, recipe=self.recipes[0])
+        ShoppingCart.objects.create(user=self.user, recipe=self.recipes[1])
+        token = Token.objects.create(user=self.user)
+        self.auth = {'HTTP_AUTHORIZATION': f'Token {token.key}'}
+
+    def get_both(self, url, **params):
+        """Ответы синхронного и асинхронного view на один запрос."""
+        sync = self.client.get(url, params, **self.auth)
+        with override_settings(ROOT_URLCONF=ASYNC_URLS):
+            response = self.client.get(url, params, **self.auth)
+        self.assertEqual(response.status_code, sync.status_code)
+        return sync, response
+
+    def test_reads_match_sync_views(self):
+        recipe = self.recipes[0]
+        for url, params in (
+            ('/api/recipes/', {}),
+            ('/api/recipes/', {'limit': 2, 'page': 2}),
+            ('/api/recipes/', {'is_favorited': 1}),
+            (f'/api/recipes/{recipe.pk}/', {}),
+            ('/api/ingredients/', {'name': recipe.ingredients.first(
+            ).ingredients.name[:2]}),
+        ):
+            with self.subTest(url=url, params=params):
+                sync, response = self.get_both(url, **params)
+                self.assertEqual(response.json(), sync.json())
+
+    def test_download_matches_sync_view(self):
+        sync, response = self.get_both(
+            '/api/recipes/download_shopping_cart/', format='json'
+        )
+        self.assertEqual(response.content, b''.join(sync.streaming_content))
+
+    @override_settings(ROOT_URLCONF=ASYNC_URLS)
+    def test_connections_are_reused(self):
+        created = []
+
+        def count(**kwargs):
+            created.append(kwargs['connection'])
+
+        connection_created.connect(count)
+        self.addCleanup(connection_created.disconnect, count)
+        for _ in range(10):
+            response = self.client.get('/api/recipes/', **self.auth)
+            self.assertEqual(response.status_code, 200)
+        # Не больше одного соединения на поток пула за все запросы
+        self.assertLessEqual(len(created), settings.ASYNC_DB_THREADS)
+
+    @override_settings(ROOT_URLCONF=ASYNC_URLS)
+    def test_writes_are_not_rejected_by_csrf(self):
+        client = Client(enforce_csrf_checks=True)
+        recipe = self.recipes[2]
+        own = make_recipes(self.user, 1)[0]
+        cases = (
+            ('post', '/api/recipes/', {}, 400),
+            ('patch', '/api/recipes/0/', {}, 404),
+            ('delete', f'/api/recipes/{own.pk}/', None, 204),
+            ('post', '/api/ingredients/', {}, 400),
+            ('post', '/api/recipes/', {
+                'ingredients': [{
+                    'id': Ingredient.objects.first().pk, 'amount': 1
+                }],
+                'tags': [recipe.tags.first().pk],
+                'image': TINY_PNG,
+                'name': 'Рецепт',
+                'text': 'Описание',
+                'cooking_time': 5,
+            }, 201),
+        )
+        for method, url, data, expected in cases:
+            with self.subTest(method=method, url=url):
+                response = getattr(client, method)(
+                    url, data, content_type='application/json', **self.auth
+                )
+                self.assertEqual(response.status_code, expected)
@@ -0,0 +1,63 @@
+from django.core.cache import cache as django_cache
+from django.test import TestCase
+from model_bakery import baker
+from rest_framework.authtoken.models import Token
+
+from api.authentication import TokenCache, token_cache
+from users.models import User
+
+
+class TokenCacheTests(TestCase):
+    def setUp(self):
+        self.token = Token.objects.create(user=baker.make(User))
+        self.key = self.token.key
+        self.addCleanup(token_cache.invalidate, [self.key])
+
+    def other_process(self):
+        """Тот же общий кэш, но пустой локальный LRU."""
+        return TokenCache(size=10, ttl=60, shared_ttl=60)
+
+    def test_hit(self):
+        version = token_cache.version(self.key)
+        token_cache.set(self.key, (self.token.user, self.token), version)
+        cache = self.other_process()
+        user, token = cache.get(self.key, cache.version(self.key))
+        self.assertEqual((user.pk, token.key), (self.token.user.pk, self.key))
+
+    def test_logout_during_lookup_is_not_cached(self):
+        # Токен прочитан из БД до выхода, а записан в кэш после него
+        version = token_cache.version(self.key)
+        credentials = (self.token.user, self.token)
+        token_cache.invalidate([self.key])
+        token_cache.set(self.key, credentials, version)
+        for cache in (token_cache, self.other_process()):
+            self.assertIsNone(cache.get(self.key, cache.version(self.key)))
+
+    def test_logout_keeps_other_tokens(self):
+        other = Token.objects.create(user=baker.make(User))
+        self.addCleanup(token_cache.invalidate, [other.key])
+        token_cache.set(
+            other.key, (other.user, other), token_cache.version(other.key)
+        )
+        token_cache.invalidate([self.key])
+        for cache in (token_cache, self.other_process()):
+            self.assertIsNotNone(
+                cache.get(other.key, cache.version(other.key))
+            )
+
+    def test_lost_version_rejects_entries(self):
+        token_cache.set(
+            self.key, (self.token.user, self.token),
+            token_cache.version(self.key)
+        )
+        django_cache.delete(token_cache.version_key(self.key))
+        for cache in (token_cache, self.other_process()):
+            self.assertIsNone(cache.get(self.key, cache.version(self.key)))
+
+    def test_logout_rejects_token(self):
+        headers = {'HTTP_AUTHORIZATION': f'Token {self.key}'}
+        url = '/api/users/me/'
+        self.assertEqual(self.client.get(url, **headers).status_code, 200)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.token.delete()
+        self.assertEqual(self.client.get(url, **headers).status_code, 401)
@@ -0,0 +1,124 @@
+from unittest import mock
+
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from model_bakery import baker
+
+from recipes.models import (
+    FavoriteRecipe,
+    Recipe,
+    ShoppingCart,
+    ShoppingListItem
+)
+from recipes.shopping_list import source_amounts
+from users.models import User
+from api.recipes_views import BulkShoppingCartViewSet
+from .utils import api_client, make_recipes
+
+CART_URL = '/api/recipes/shopping_cart/'
+FAVORITE_URL = '/api/recipes/favorite/'
+
+
+class BulkCartTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = baker.make(User)
+        cls.recipes = make_recipes(baker.make(User), 6)
+        cls.ids = [recipe.pk for recipe in cls.recipes]
+
+    def setUp(self):
+        self.client = api_client(self.user)
+
+    def statuses(self, response):
+        self.assertEqual(response.status_code, 200, response.data)
+        return {
+            item['id']: item['status'] for item in response.data['recipes']
+        }
+
+    def counters(self, field):
+        return dict(Recipe.objects.filter(
+            pk__in=self.ids
+        ).values_list('pk', field))
+
+    def assert_consistent(self):
+        for model, field in (
+            (ShoppingCart, 'in_carts_count'),
+            (FavoriteRecipe, 'favorites_count'),
+        ):
+            present = set(model.objects.values_list('recipe_id', flat=True))
+            self.assertEqual(self.counters(field), {
+                pk: int(pk in present) for pk in self.ids
+            })
+        self.assertEqual(
+            dict(
+                ((user_id, ingredient_id), amount)
+                for user_id, ingredient_id, amount
+                in ShoppingListItem.objects.values_list(
+                    'user_id', 'ingredient_id', 'amount'
+                )
+            ),
+            source_amounts()
+        )
+
+    def test_add_counts_only_inserted_rows(self):
+        ShoppingCart.objects.create(user=self.user, recipe=self.recipes[0])
+        missing = max(self.ids) + 1
+        statuses = self.statuses(self.client.post(
+            CART_URL, {'recipes': self.ids[:3] + [missing]}, format='json'
+        ))
+        self.assertEqual(statuses, {
+            self.ids[0]: 'already_in_list',
+            self.ids[1]: 'added',
+            self.ids[2]: 'added',
+            missing: 'not_found',
+        })
+        self.assert_consistent()
+
+    def test_concurrent_insert_is_not_counted_twice(self):
+        insert = BulkShoppingCartViewSet.insert
+
+        def racing_insert(view, recipe_ids):
+            # Параллельный запрос успел добавить тот же рецепт
+            ShoppingCart.objects.create(user=self.user, recipe=self.recipes[0])
+            return insert(view, recipe_ids)
+
+        with mock.patch.object(
+            BulkShoppingCartViewSet, 'insert', racing_insert
+        ):
+            statuses = self.statuses(self.client.post(
+                CART_URL, {'recipes': self.ids[:2]}, format='json'
+            ))
+        self.assertEqual(statuses, {
+            self.ids[0]: 'already_in_list', self.ids[1]: 'added'
+        })
+        self.assert_consistent()
+
+    def test_remove_and_replace(self):
+        for url in (CART_URL, FAVORITE_URL):
+            with self.subTest(url=url):
+                self.client.post(url, {'recipes': self.ids[:4]}, format='json')
+                statuses = self.statuses(self.client.delete(
+                    url, {'recipes': self.ids[3:5]}, format='json'
+                ))
+                self.assertEqual(statuses, {
+                    self.ids[3]: 'removed', self.ids[4]: 'not_in_list'
+                })
+                self.assert_consistent()
+                self.statuses(self.client.put(
+                    url, {'recipes': self.ids[2:]}, format='json'
+                ))
+                self.assert_consistent()
+
+    def test_remove_cost_does_not_depend_on_size(self):
+        counts = []
+        for size in (1, 5):
+            self.client.post(CART_URL, {'recipes': self.ids}, format='json')
+            with CaptureQueriesContext(connection) as queries:
+                self.client.delete(
+                    CART_URL, {'recipes': self.ids[:size]}, format='json'
+                )
+            counts.append(len(queries))
+            self.client.put(CART_URL, {'recipes': []}, format='json')
+        self.assertEqual(counts[0], counts[1])
+        self.assert_consistent()
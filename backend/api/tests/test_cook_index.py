@@ -0,0 +1,48 @@
+import numpy as np
+from django.test import TestCase
+from model_bakery import baker
+
+from recipes.cook_index import RecipeCoverageIndex
+from recipes.models import Ingredient, RecipeIngredient
+from users.models import User
+from .utils import make_recipes
+
+
+class RecipeCoverageIndexTests(TestCase):
+    def assert_same(self, index, expected):
+        postings, *arrays = index._index
+        expected_postings, *expected_arrays = expected._index
+        self.assertEqual(postings.keys(), expected_postings.keys())
+        for ingredient_id, posting in postings.items():
+            np.testing.assert_array_equal(
+                posting, expected_postings[ingredient_id]
+            )
+        for array, expected_array in zip(arrays, expected_arrays):
+            np.testing.assert_array_equal(array, expected_array)
+
+    def test_apply_matches_full_build(self):
+        recipes = make_recipes(baker.make(User), 5)
+        index = RecipeCoverageIndex()
+        index._build()
+        first, second, third, deleted = recipes[:4]
+        deleted_id = deleted.pk
+        first.ingredients.remove(*first.ingredients.all()[:2])
+        second.ingredients.add(baker.make(
+            RecipeIngredient, ingredients=baker.make(Ingredient), amount=1
+        ))
+        third.ingredients.clear()
+        deleted.delete()
+        index._apply({first.pk, second.pk, third.pk, deleted_id})
+        expected = RecipeCoverageIndex()
+        expected._build()
+        self.assert_same(index, expected)
+        ingredient_ids = list(second.ingredients.values_list(
+            'ingredients_id', flat=True
+        ))
+        self.assertEqual(
+            index.rank(ingredient_ids[:2]), expected.rank(ingredient_ids[:2])
+        )
+        self.assertIn(
+            (second.pk, 2, len(ingredient_ids) - 2),
+            index.rank(ingredient_ids[:2])
+        )
@@ -0,0 +1,87 @@
+from unittest import mock
+
+from django.db import DatabaseError
+from django.test import TestCase
+from model_bakery import baker
+
+from recipes.models import FavoriteRecipe, Recipe, ShoppingCart
+from users.models import Subscribe, User
+from .utils import api_client, make_recipes
+
+
+class CounterAtomicityTests(TestCase):
+    """Если счетчик не обновился, запись тоже не должна остаться."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = baker.make(User)
+        cls.author = baker.make(User)
+        cls.recipe = make_recipes(cls.author, 1)[0]
+
+    def request(self, method, url):
+        client = api_client(self.user)
+        with mock.patch(
+            'recipes.signals.change_counter', side_effect=DatabaseError
+        ):
+            with self.assertRaises(DatabaseError):
+                getattr(client, method)(url)
+
+    def test_create_is_rolled_back(self):
+        cases = (
+            (f'/api/recipes/{self.recipe.pk}/favorite/', FavoriteRecipe),
+            (f'/api/recipes/{self.recipe.pk}/shopping_cart/', ShoppingCart),
+            (f'/api/users/{self.author.pk}/subscribe/', Subscribe),
+        )
+        for url, model in cases:
+            with self.subTest(url=url):
+                self.request('post', url)
+                self.assertFalse(
+                    model.objects.filter(user=self.user).exists()
+                )
+
+    def test_destroy_is_rolled_back(self):
+        FavoriteRecipe.objects.create(user=self.user, recipe=self.recipe)
+        ShoppingCart.objects.create(user=self.user, recipe=self.recipe)
+        Subscribe.objects.create(user=self.user, author=self.author)
+        cases = (
+            (f'/api/recipes/{self.recipe.pk}/favorite/', FavoriteRecipe),
+            (f'/api/recipes/{self.recipe.pk}/shopping_cart/', ShoppingCart),
+            (f'/api/users/{self.author.pk}/subscribe/', Subscribe),
+        )
+        for url, model in cases:
+            with self.subTest(url=url):
+                self.request('delete', url)
+                self.assertTrue(
+                    model.objects.filter(user=self.user).exists()
+                )
+        recipe = Recipe.objects.get(pk=self.recipe.pk)
+        self.assertEqual(recipe.favorites_count, 1)
+        self.assertEqual(recipe.in_carts_count, 1)
+        self.assertEqual(
+            User.objects.get(pk=self.author.pk).followers_count, 1
+        )
+
+
+class CounterFieldsTests(TestCase):
+    """Сохранение устаревшего объекта не затирает счетчики."""
+
+    def test_stale_save_keeps_counters(self):
+        author = baker.make(User)
+        recipe = make_recipes(author, 1)[0]
+        stale_recipe = Recipe.objects.get(pk=recipe.pk)
+        stale_author = User.objects.get(pk=author.pk)
+        FavoriteRecipe.objects.create(user=baker.make(User), recipe=recipe)
+        Subscribe.objects.create(user=baker.make(User), author=author)
+        stale_recipe.name = 'Новое имя'
+        stale_recipe.save()
+        stale_author.first_name = 'Имя'
+        stale_author.save()
+        recipe.refresh_from_db()
+        author.refresh_from_db()
+        self.assertEqual((recipe.name, recipe.favorites_count), (
+            'Новое имя', 1
+        ))
+        self.assertEqual((author.first_name, author.followers_count), (
+            'Имя', 1
+        ))
+        self.assertEqual(author.recipes_count, 1)
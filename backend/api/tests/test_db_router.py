@@ -0,0 +1,84 @@
+from contextlib import ExitStack
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connections
+from django.test import TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from model_bakery import baker
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from users.models import User
+from .utils import make_recipes
+
+REPLICAS = {'ALIASES': ['replica'], 'STICKY_SECONDS': 60}
+RECIPES_TABLE = 'recipes_recipe'
+
+
+@override_settings(READ_REPLICAS=REPLICAS)
+class ReplicaRoutingTests(TransactionTestCase):
+    """
+    TransactionTestCase: зеркало - отдельное соединение, и данные
+    из незакоммиченной транзакции TestCase на нем не видны.
+    """
+    databases = {'default', 'replica'}
+
+    def setUp(self):
+        cache.clear()
+        self.user = baker.make(User)
+        self.recipe = make_recipes(baker.make(User), 1)[0]
+
+    def client_for(self, user):
+        client = APIClient()
+        token = Token.objects.create(user=user)
+        # Закрепление за основной БД идет по заголовку Authorization
+        client.credentials(HTTP_AUTHORIZATION=f'Token {token.key}')
+        return client
+
+    def recipe_reads(self, action):
+        """Число запросов к таблице рецептов на каждой БД."""
+        with ExitStack() as stack:
+            captured = {
+                alias: stack.enter_context(
+                    CaptureQueriesContext(connections[alias])
+                )
+                for alias in ('default', 'replica')
+            }
+            action()
+        return {
+            alias: sum(
+                RECIPES_TABLE in query['sql']
+                for query in context.captured_queries
+            )
+            for alias, context in captured.items()
+        }
+
+    def test_read_goes_to_replica(self):
+        client = self.client_for(self.user)
+        reads = self.recipe_reads(lambda: client.get('/api/recipes/'))
+        self.assertEqual(reads['default'], 0)
+        self.assertGreater(reads['replica'], 0)
+
+    def test_read_after_write_goes_to_primary(self):
+        client = self.client_for(self.user)
+        response = client.post(f'/api/recipes/{self.recipe.pk}/favorite/')
+        self.assertEqual(response.status_code, 201)
+        reads = self.recipe_reads(lambda: client.get('/api/recipes/'))
+        self.assertGreater(reads['default'], 0)
+        self.assertEqual(reads['replica'], 0)
+        other = self.client_for(baker.make(User))
+        reads = self.recipe_reads(lambda: other.get('/api/recipes/'))
+        self.assertEqual(reads['default'], 0)
+
+    def test_admin_and_commands_stay_on_primary(self):
+        admin = baker.make(User, is_staff=True, is_superuser=True)
+        self.client.force_login(admin)
+        reads = self.recipe_reads(
+            lambda: self.client.get('/admin/recipes/recipe/')
+        )
+        self.assertGreater(reads['default'], 0)
+        self.assertEqual(reads['replica'], 0)
+        reads = self.recipe_reads(lambda: call_command('recount', verbosity=0))
+        self.assertGreater(reads['default'], 0)
+        self.assertEqual(reads['replica'], 0)
@@ -0,0 +1,177 @@
+from io import StringIO
+from types import SimpleNamespace
+
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import cache
+from django.core.management import call_command
+from django.http import QueryDict
+from django.test import TestCase
+from model_bakery import baker
+
+from api.filters import RecipeFilter, tag_ids
+from recipes.models import FavoriteRecipe, Recipe, ShoppingCart, Tag
+from users.models import User
+from .utils import api_client
+
+
+def filter_recipes(user, **params):
+    data = QueryDict(mutable=True)
+    for name, values in params.items():
+        data.setlist(name, [str(value) for value in values])
+    filterset = RecipeFilter(
+        data,
+        queryset=Recipe.objects.all(),
+        request=SimpleNamespace(user=user)
+    )
+    assert filterset.is_valid(), filterset.errors
+    return filterset.qs
+
+
+class RecipeFilterTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = baker.make(User)
+        cls.authors = baker.make(User, _quantity=2)
+        cls.tags = baker.make(Tag, _quantity=3)
+        cls.recipes = [
+            baker.make(Recipe, author=author, image=None, cooking_time=1)
+            for author in cls.authors
+            for _ in range(3)
+        ]
+        # Рецепт 0 с двумя тегами проверяет, что строки не размножаются
+        cls.recipes[0].tags.add(cls.tags[0], cls.tags[1])
+        cls.recipes[1].tags.add(cls.tags[1])
+        cls.recipes[3].tags.add(cls.tags[0])
+        cls.recipes[4].tags.add(cls.tags[2])
+        for recipe in cls.recipes[:2] + cls.recipes[3:4]:
+            FavoriteRecipe.objects.create(user=cls.user, recipe=recipe)
+        for recipe in cls.recipes[1:2] + cls.recipes[3:5]:
+            ShoppingCart.objects.create(user=cls.user, recipe=recipe)
+
+    def setUp(self):
+        cache.clear()
+        tag_ids._local = (None, {})
+
+    def ids(self, *indexes):
+        return {self.recipes[index].pk for index in indexes}
+
+    def filtered(self, user=None, **params):
+        return set(
+            filter_recipes(user or self.user, **params)
+            .values_list('pk', flat=True)
+        )
+
+    def slugs(self, *indexes):
+        return [self.tags[index].slug for index in indexes]
+
+    def test_filters_use_exists_without_join_or_distinct(self):
+        queryset = filter_recipes(
+            self.user,
+            tags=self.slugs(0, 1),
+            author=[self.authors[0].pk],
+            is_favorited=['true'],
+            is_in_shopping_cart=['false'],
+        )
+        sql = str(queryset.query).upper()
+        self.assertEqual(sql.count('EXISTS'), 3)
+        self.assertNotIn('DISTINCT', sql)
+        self.assertNotIn('JOIN', sql)
+
+    def test_explain_has_no_full_scans(self):
+        out = StringIO()
+        call_command('explain_recipe_filters', stdout=out)
+        self.assertIn('индексы используются', out.getvalue())
+
+    def test_tags_match_any_without_duplicates(self):
+        queryset = filter_recipes(self.user, tags=self.slugs(0, 1))
+        self.assertEqual(queryset.count(), 3)
+        self.assertEqual(set(queryset.values_list('pk', flat=True)),
+                         self.ids(0, 1, 3))
+        self.assertEqual(self.filtered(tags=self.slugs(2)), self.ids(4))
+
+    def test_flags(self):
+        cases = (
+            ({'is_favorited': ['true']}, self.ids(0, 1, 3)),
+            ({'is_favorited': ['false']}, self.ids(2, 4, 5)),
+            ({'is_in_shopping_cart': ['true']}, self.ids(1, 3, 4)),
+            ({'is_in_shopping_cart': ['false']}, self.ids(0, 2, 5)),
+            (
+                {'is_favorited': ['true'], 'is_in_shopping_cart': ['true']},
+                self.ids(1, 3)
+            ),
+            (
+                {'is_favorited': ['false'], 'is_in_shopping_cart': ['false']},
+                self.ids(2, 5)
+            ),
+        )
+        for params, expected in cases:
+            with self.subTest(**params):
+                self.assertEqual(self.filtered(**params), expected)
+
+    def test_flags_compose_with_author_and_tags(self):
+        cases = (
+            (
+                {'author': [self.authors[1].pk], 'is_favorited': ['true']},
+                self.ids(3)
+            ),
+            (
+                {
+                    'author': [self.authors[1].pk],
+                    'is_in_shopping_cart': ['true'],
+                    'tags': self.slugs(2),
+                },
+                self.ids(4)
+            ),
+            (
+                {'tags': self.slugs(0, 1), 'is_in_shopping_cart': ['false']},
+                self.ids(0)
+            ),
+            (
+                {
+                    'tags': self.slugs(0, 1, 2),
+                    'author': [self.authors[0].pk],
+                    'is_favorited': ['false'],
+                },
+                set()
+            ),
+        )
+        for params, expected in cases:
+            with self.subTest(**params):
+                self.assertEqual(self.filtered(**params), expected)
+
+    def test_anonymous(self):
+        anonymous = AnonymousUser()
+        everything = self.ids(*range(len(self.recipes)))
+        for name in ('is_favorited', 'is_in_shopping_cart'):
+            with self.subTest(name=name):
+                self.assertEqual(
+                    self.filtered(anonymous, **{name: ['true']}), set()
+                )
+                self.assertEqual(
+                    self.filtered(anonymous, **{name: ['false']}), everything
+                )
+                self.assertEqual(
+                    self.filtered(
+                        anonymous, tags=self.slugs(0), **{name: ['false']}
+                    ),
+                    self.ids(0, 3)
+                )
+
+    def test_unknown_tag_is_rejected(self):
+        response = api_client(self.user).get(
+            '/api/recipes/', {'tags': 'missing'}
+        )
+        self.assertEqual(response.status_code, 400)
+
+    def test_api_composes_filters(self):
+        response = api_client(self.user).get('/api/recipes/', {
+            'tags': self.slugs(0, 1),
+            'is_favorited': 1,
+            'is_in_shopping_cart': 0,
+            'limit': 10,
+        })
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            {recipe['id'] for recipe in response.data['results']},
+            self.ids(0)
+        )
@@ -0,0 +1,26 @@
+import base64
+import io
+import textwrap
+
+from django.test import SimpleTestCase
+from PIL import Image
+
+from recipes.images import DECODE_CHUNK, decode_base64_image
+
+
+class DecodeBase64ImageTests(SimpleTestCase):
+    def make_png(self):
+        buffer = io.BytesIO()
+        Image.effect_noise((512, 512), 64).save(buffer, 'PNG')
+        return buffer.getvalue()
+
+    def test_line_wrapped_payload(self):
+        content = self.make_png()
+        encoded = base64.b64encode(content).decode()
+        self.assertGreater(len(encoded), 2 * DECODE_CHUNK)
+        wrapped = '\r\n'.join(textwrap.wrap(encoded, 76))
+        file = decode_base64_image(f'data:image/png;base64,{wrapped}')
+        try:
+            self.assertEqual(file.read(), content)
+        finally:
+            file.close()
@@ -0,0 +1,47 @@
+from django.test import TestCase
+
+from recipes.ingredient_index import IngredientPrefixIndex
+from recipes.models import Ingredient
+
+NAMES = (
+    'apple', 'Apricot', 'APPLE juice', 'avocado', 'Banana', 'banana chips',
+    'bacon', 'абрикос', 'авокадо', 'ананас', 'баклажан',
+)
+PREFIXES = ('', 'a', 'A', 'ap', 'APP', 'b', 'ba', 'а', 'аб', 'x')
+
+
+class IngredientPrefixIndexTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        Ingredient.objects.bulk_create(
+            Ingredient(name=name, measurement_unit='г') for name in NAMES
+        )
+
+    def queryset(self, prefix):
+        """Путь через БД, который заменяет индекс (IngredientFilter)."""
+        return list(Ingredient.objects.filter(
+            name__istartswith=prefix
+        ).values('id', 'name', 'measurement_unit'))
+
+    def test_matches_queryset_with_ordering(self):
+        index = IngredientPrefixIndex()
+        for prefix in PREFIXES:
+            with self.subTest(prefix=prefix):
+                self.assertEqual(index.search(prefix), self.queryset(prefix))
+
+    def test_limit(self):
+        index = IngredientPrefixIndex()
+        for prefix in ('a', 'b'):
+            with self.subTest(prefix=prefix):
+                self.assertEqual(
+                    index.search(prefix, 2), self.queryset(prefix)[:2]
+                )
+
+    def test_api(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            Ingredient.objects.create(name='apricot jam', measurement_unit='г')
+        response = self.client.get('/api/ingredients/', {'name': 'apr'})
+        self.assertEqual(
+            [row['name'] for row in response.json()],
+            [row['name'] for row in self.queryset('apr')]
+        )
@@ -0,0 +1,54 @@
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from model_bakery import baker
+
+from recipes.models import Recipe
+from users.models import User
+from .utils import api_client, make_recipes
+
+
+class RecipeCursorPaginationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = baker.make(User)
+        make_recipes(cls.user, 7, ingredients=1)
+        # Одинаковые даты, как после пакетной вставки
+        Recipe.objects.update(pub_date=timezone.now())
+        cls.expected = list(
+            Recipe.objects.order_by('-pub_date', '-id').values_list(
+                'id', flat=True
+            )
+        )
+
+    def walk(self, url, params=None, link='next'):
+        client = api_client(self.user)
+        ids, statements = [], []
+        while url:
+            with CaptureQueriesContext(connection) as queries:
+                response = client.get(url, params)
+            self.assertEqual(response.status_code, 200)
+            statements += [query['sql'] for query in queries]
+            ids.append([recipe['id'] for recipe in response.data['results']])
+            url, params = response.data[link], None
+        return ids, statements
+
+    def test_pages_follow_pub_date_and_id_without_offset(self):
+        pages, statements = self.walk(
+            '/api/recipes/', {'pagination': 'cursor', 'limit': 3}
+        )
+        self.assertEqual(sum(pages, []), self.expected)
+        self.assertEqual([len(page) for page in pages], [3, 3, 1])
+        self.assertFalse(any(
+            'OFFSET' in sql or 'COUNT(' in sql for sql in statements
+        ))
+
+    def test_previous_links_walk_back(self):
+        client = api_client(self.user)
+        url, params = '/api/recipes/', {'pagination': 'cursor', 'limit': 3}
+        while url:
+            response = client.get(url, params)
+            last, url, params = response, response.data['next'], None
+        pages, _ = self.walk(last.data['previous'], link='previous')
+        self.assertEqual(sum(reversed(pages), []), self.expected[:6])
@@ -0,0 +1,101 @@
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from model_bakery import baker
+
+from recipes.models import FavoriteRecipe, Ingredient, ShoppingCart, Tag
+from users.models import Subscribe, User
+from .utils import TINY_PNG, api_client, make_recipes
+
+
+class RecipeListQueryBudgetTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = baker.make(User)
+        authors = baker.make(User, _quantity=3)
+        recipes = []
+        for author in authors:
+            recipes += make_recipes(author, 4)
+        Subscribe.objects.create(user=cls.user, author=authors[0])
+        FavoriteRecipe.objects.create(user=cls.user, recipe=recipes[0])
+        ShoppingCart.objects.create(user=cls.user, recipe=recipes[1])
+
+    def test_page_cost_does_not_depend_on_page_size(self):
+        client = api_client(self.user)
+        for limit in (2, 12):
+            with self.subTest(limit=limit):
+                with self.assertNumQueries(5):
+                    response = client.get('/api/recipes/', {'limit': limit})
+                self.assertEqual(len(response.data['results']), limit)
+
+
+class SubscriptionsQueryBudgetTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = baker.make(User)
+        for author in baker.make(User, _quantity=6):
+            make_recipes(author, 3, ingredients=1)
+            Subscribe.objects.create(user=cls.user, author=author)
+
+    def test_page_cost_does_not_depend_on_page_size(self):
+        client = api_client(self.user)
+        for limit in (1, 6):
+            with self.subTest(limit=limit):
+                with self.assertNumQueries(4):
+                    response = client.get(
+                        '/api/users/subscriptions/', {'limit': limit}
+                    )
+                self.assertEqual(len(response.data['results']), limit)
+
+    def test_page_cost_does_not_depend_on_recipes_limit(self):
+        client = api_client(self.user)
+        for recipes_limit in (1, 3):
+            with self.subTest(recipes_limit=recipes_limit):
+                with self.assertNumQueries(4):
+                    response = client.get(
+                        '/api/users/subscriptions/',
+                        {'limit': 6, 'recipes_limit': recipes_limit}
+                    )
+                for author in response.data['results']:
+                    self.assertEqual(len(author['recipes']), recipes_limit)
+                    self.assertEqual(author['recipes_count'], 3)
+
+
+class RecipeWriteQueryBudgetTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = baker.make(User)
+        cls.tags = baker.make(Tag, _quantity=2)
+        cls.ingredients = baker.make(Ingredient, _quantity=20)
+
+    def payload(self, count, amount=1):
+        return {
+            'ingredients': [
+                {'id': ingredient.id, 'amount': amount}
+                for ingredient in self.ingredients[:count]
+            ],
+            'tags': [tag.id for tag in self.tags],
+            'image': TINY_PNG,
+            'name': 'Рецепт',
+            'text': 'Описание',
+            'cooking_time': 5,
+        }
+
+    def test_cost_does_not_depend_on_ingredient_count(self):
+        client = api_client(self.user)
+        counts = {}
+        for size in (2, 20):
+            with CaptureQueriesContext(connection) as created:
+                response = client.post(
+                    '/api/recipes/', self.payload(size), format='json'
+                )
+            self.assertEqual(response.status_code, 201, response.data)
+            with CaptureQueriesContext(connection) as updated:
+                response = client.patch(
+                    f'/api/recipes/{response.data["id"]}/',
+                    self.payload(size, amount=2),
+                    format='json'
+                )
+            self.assertEqual(response.status_code, 200, response.data)
+            counts[size] = (len(created), len(updated))
+        self.assertEqual(counts[2], counts[20])
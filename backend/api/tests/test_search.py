@@ -0,0 +1,78 @@
+from unittest import skipUnless
+
+from django.db import connection
+from django.test import TestCase
+from model_bakery import baker
+
+from recipes.models import Ingredient, Recipe, RecipeIngredient
+from recipes.search import search_recipes
+from recipes.tasks import index_ingredient_recipes_task
+from tasks.models import Task
+from tasks.queue import REGISTRY
+from users.models import User
+
+
+def found(query):
+    return list(
+        search_recipes(Recipe.objects.all(), query)
+        .values_list('name', flat=True)
+    )
+
+
+class RecipeSearchTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        author = baker.make(User)
+        cls.beet = baker.make(Ingredient, name='Свёкла')
+        cls.borscht = baker.make(
+            Recipe, author=author, image=None, cooking_time=1,
+            name='Борщ', text='Суп на говяжьем бульоне'
+        )
+        cls.borscht.ingredients.add(baker.make(
+            RecipeIngredient, ingredients=cls.beet, amount=1
+        ))
+        cls.salad = baker.make(
+            Recipe, author=author, image=None, cooking_time=1,
+            name='Винегрет', text='Салат из вареных овощей и борща'
+        )
+
+    def test_prefix(self):
+        self.assertEqual(found('Бор'), ['Борщ', 'Винегрет'])
+        self.assertEqual(found('винег'), ['Винегрет'])
+
+    def test_all_words_must_match(self):
+        self.assertEqual(found('суп бульон'), ['Борщ'])
+        self.assertEqual(found('суп салат'), [])
+
+    def test_yo_matches_ye(self):
+        self.assertEqual(found('свекла'), ['Борщ'])
+        self.assertEqual(found('Свёк'), ['Борщ'])
+
+    @skipUnless(connection.vendor == 'postgresql', 'Опечатки ищет pg_trgm')
+    def test_typo(self):
+        self.assertEqual(found('Барщ')[:1], ['Борщ'])
+
+    def test_recipe_rename(self):
+        self.borscht.name = 'Щи'
+        self.borscht.save()
+        self.assertEqual(found('Бор'), ['Винегрет'])
+        self.assertEqual(found('щи'), ['Щи'])
+
+    def test_update_without_search_fields(self):
+        self.borscht.cooking_time = 5
+        self.borscht.save(update_fields=['cooking_time'])
+        self.assertEqual(found('Борщ')[:1], ['Борщ'])
+
+    def test_ingredient_rename_is_deferred_to_task(self):
+        self.beet.name = 'Бурак'
+        with self.captureOnCommitCallbacks(execute=True):
+            self.beet.save()
+        self.assertEqual(found('бурак'), [])
+        task = Task.objects.get(name=index_ingredient_recipes_task.task_name)
+        REGISTRY[task.name](*task.args, **task.kwargs)
+        self.assertEqual(found('бурак'), ['Борщ'])
+        self.assertEqual(found('свекла'), [])
+
+    def test_recipe_delete(self):
+        self.salad.delete()
+        self.assertEqual(found('Бор'), ['Борщ'])
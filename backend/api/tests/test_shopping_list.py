@@ -0,0 +1,78 @@
+import json
+from unittest import mock
+
+from django.db import DatabaseError
+from django.test import TestCase
+from model_bakery import baker
+
+from recipes.models import ShoppingCart, ShoppingListItem
+from users.models import User
+from .utils import api_client, make_recipes
+
+URL = '/api/recipes/download_shopping_cart/'
+
+
+class DownloadShoppingCartTests(TestCase):
+    def fill_cart(self, user, size):
+        for recipe in make_recipes(baker.make(User), size):
+            ShoppingCart.objects.create(user=user, recipe=recipe)
+
+    def download(self, user, **params):
+        response = api_client(user).get(URL, params)
+        self.assertEqual(response.status_code, 200)
+        return b''.join(response.streaming_content).decode()
+
+    def test_query_count_does_not_depend_on_cart_size(self):
+        for size in (1, 20):
+            with self.subTest(size=size):
+                user = baker.make(User)
+                self.fill_cart(user, size)
+                with self.assertNumQueries(1):
+                    content = self.download(user, format='json')
+                self.assertEqual(len(json.loads(content)), size * 3)
+
+    def test_formats(self):
+        user = baker.make(User)
+        self.fill_cart(user, 2)
+        self.assertTrue(self.download(user).startswith('Список покупок'))
+        self.assertTrue(
+            self.download(user, format='csv').startswith(
+                'name,measurement_unit,amount'
+            )
+        )
+        self.assertEqual(json.loads(self.download(user, format='json'))[0][
+            'amount'
+        ], 2)
+
+    def test_anonymous_is_unauthorized(self):
+        response = api_client().get(URL)
+        self.assertEqual(response.status_code, 401)
+        self.assertIn('detail', json.loads(response.content))
+
+
+class ShoppingListAtomicityTests(TestCase):
+    """Без обновления списка покупок рецепт не остается в корзине."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = baker.make(User)
+        cls.recipe = make_recipes(baker.make(User), 1)[0]
+
+    def assert_rolled_back(self, add):
+        with mock.patch(
+            'recipes.signals.change_cart', side_effect=DatabaseError
+        ):
+            with self.assertRaises(DatabaseError):
+                add()
+        self.assertFalse(ShoppingCart.objects.exists())
+        self.assertFalse(ShoppingListItem.objects.exists())
+
+    def test_api_add(self):
+        self.assert_rolled_back(lambda: api_client(self.user).post(
+            f'/api/recipes/{self.recipe.pk}/shopping_cart/'
+        ))
+
+    def test_model_add(self):
+        self.assert_rolled_back(lambda: ShoppingCart.objects.create(
+            user=self.user, recipe=self.recipe
+        ))
@@ -0,0 +1,170 @@
+from io import StringIO
+from unittest import mock
+
+import numpy as np
+from django.core.management import call_command
+from django.test import TestCase
+from model_bakery import baker
+
+from recipes import similarity
+from recipes.models import (
+    Ingredient,
+    Recipe,
+    RecipeIngredient,
+    SimilarRecipe,
+    Tag
+)
+from users.models import User
+
+TOP_K = 3
+
+
+def build(*args):
+    call_command(
+        'build_similar_recipes', *args, top_k=TOP_K, stdout=StringIO()
+    )
+
+
+def stored():
+    return {
+        (recipe_id, rank): (similar_id, score)
+        for recipe_id, rank, similar_id, score
+        in SimilarRecipe.objects.values_list(
+            'recipe_id', 'rank', 'similar_id', 'score'
+        )
+    }
+
+
+class SimilarRecipesTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        author = baker.make(User)
+        ingredients = baker.make(Ingredient, _quantity=8)
+        tags = baker.make(Tag, _quantity=3)
+        rng = np.random.RandomState(7)
+        cls.recipes = []
+        for index in range(20):
+            recipe = baker.make(
+                Recipe, author=author, image=None, cooking_time=1
+            )
+            chosen = rng.choice(len(ingredients), 3, replace=False)
+            recipe.ingredients.add(*[
+                baker.make(
+                    RecipeIngredient, ingredients=ingredients[i], amount=1
+                )
+                for i in chosen
+            ])
+            recipe.tags.add(tags[index % len(tags)])
+            cls.recipes.append(recipe)
+
+    def expected(self):
+        """Top-k перебором по плотной матрице близости."""
+        recipe_ids, matrix, keys = similarity.build_matrix()
+        scores = (matrix @ matrix.T).toarray()
+        candidates = (keys @ keys.T).toarray() > 0
+        result = {}
+        for position, recipe_id in enumerate(recipe_ids.tolist()):
+            columns = [
+                column for column in np.flatnonzero(candidates[position])
+                if column != position
+            ]
+            columns.sort(key=lambda column: (
+                -scores[position, column], -column
+            ))
+            for rank, column in enumerate(columns[:TOP_K], start=1):
+                result[recipe_id, rank] = (
+                    int(recipe_ids[column]), scores[position, column]
+                )
+        return result
+
+    def assert_same_neighbors(self, actual, expected):
+        self.assertEqual(actual.keys(), expected.keys())
+        for key, (similar_id, score) in expected.items():
+            self.assertEqual(actual[key][0], similar_id, key)
+            self.assertAlmostEqual(actual[key][1], score, places=6)
+
+    def test_top_k_matches_brute_force(self):
+        build('--full')
+        self.assert_same_neighbors(stored(), self.expected())
+
+    def test_small_batches(self):
+        build('--full', '--batch-size', '3')
+        self.assert_same_neighbors(stored(), self.expected())
+
+    def test_candidates_share_key_ingredients(self):
+        first, second = self.recipes[:2]
+        rare = baker.make(Ingredient)
+        for recipe in (first, second):
+            recipe.ingredients.add(
+                baker.make(RecipeIngredient, ingredients=rare, amount=1)
+            )
+        with mock.patch.multiple(
+            similarity, KEY_MIN_RECIPES=0, KEY_MAX_SHARE=0.1
+        ):
+            recipe_ids, matrix, keys = similarity.build_matrix()
+        frequency = np.asarray((matrix > 0).sum(axis=0)).ravel()
+        key_columns = np.flatnonzero(np.asarray(keys.sum(axis=0)).ravel())
+        self.assertTrue((frequency[key_columns] <= 2).all())
+        position, other = np.searchsorted(recipe_ids, [first.pk, second.pk])
+        scores = similarity.similarities(matrix, keys, [position])
+        candidates = (keys[position] @ keys.T).toarray().ravel() > 0
+        self.assertEqual(
+            set(scores.indices.tolist()),
+            set(np.flatnonzero(candidates).tolist())
+        )
+        self.assertIn(other, scores.indices)
+        # Близость кандидатов учитывает все столбцы, в том числе теги
+        self.assertAlmostEqual(
+            scores[0, other], (matrix[position] @ matrix[other].T)[0, 0]
+        )
+        self.assertLess(scores.nnz, (matrix[position] @ matrix.T).nnz)
+
+    def test_incremental_rebuild_matches_full(self):
+        build('--full')
+        first, second = self.recipes[0], self.recipes[1]
+        # Обмен ингредиентами и тегами не меняет веса IDF, поэтому
+        # инкрементальный пересчет должен совпасть с полным
+        first_ingredient = first.ingredients.exclude(
+            ingredients__in=second.ingredients.values('ingredients')
+        ).first()
+        second_ingredient = second.ingredients.exclude(
+            ingredients__in=first.ingredients.values('ingredients')
+        ).first()
+        first.ingredients.remove(first_ingredient)
+        first.ingredients.add(second_ingredient)
+        second.ingredients.remove(second_ingredient)
+        second.ingredients.add(first_ingredient)
+        first_tags = list(first.tags.all())
+        second_tags = list(second.tags.all())
+        first.tags.set(second_tags)
+        second.tags.set(first_tags)
+        first.save()
+        second.save()
+        build()
+        incremental = stored()
+        self.assertNotEqual(
+            Recipe.objects.filter(
+                similar_updated__lt=first.updated
+            ).count(),
+            0,
+            'Пересчет должен быть частичным'
+        )
+        build('--full')
+        self.assert_same_neighbors(incremental, stored())
+
+    def test_deleted_neighbor_is_replaced(self):
+        build('--full')
+        deleted = SimilarRecipe.objects.filter(rank=1).first().similar_id
+        referrers = set(SimilarRecipe.objects.filter(
+            similar_id=deleted
+        ).values_list('recipe_id', flat=True))
+        Recipe.objects.filter(pk=deleted).delete()
+        build()
+        self.assertFalse(
+            SimilarRecipe.objects.filter(similar_id=deleted).exists()
+        )
+        for recipe_id in referrers:
+            ranks = list(SimilarRecipe.objects.filter(
+                recipe_id=recipe_id
+            ).values_list('rank', flat=True))
+            self.assertEqual(ranks, list(range(1, len(ranks) + 1)))
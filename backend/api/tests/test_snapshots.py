@@ -0,0 +1,62 @@
+import gzip
+import json
+
+from django.core.cache import cache
+from django.test import TestCase
+from model_bakery import baker
+
+from api.snapshots import SNAPSHOTS
+from recipes.models import Tag
+from recipes.versions import TAGS_VERSION, bump_version
+
+URL = '/api/tags/'
+
+
+class SnapshotTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        baker.make(Tag, _quantity=3)
+
+    def setUp(self):
+        cache.clear()
+        for snapshot in SNAPSHOTS:
+            snapshot._local = None
+
+    def test_identity(self):
+        response = self.client.get(URL)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn('Content-Encoding', response)
+        self.assertEqual(len(json.loads(response.content)), 3)
+        self.assertIn('Accept-Encoding', response['Vary'])
+
+    def test_gzip(self):
+        identity = self.client.get(URL)
+        response = self.client.get(URL, HTTP_ACCEPT_ENCODING='gzip, deflate')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(gzip.decompress(response.content), identity.content)
+        self.assertNotEqual(response['ETag'], identity['ETag'])
+
+    def test_not_modified(self):
+        for encoding in ('', 'gzip'):
+            with self.subTest(encoding=encoding):
+                etag = self.client.get(
+                    URL, HTTP_ACCEPT_ENCODING=encoding
+                )['ETag']
+                with self.assertNumQueries(0):
+                    response = self.client.get(
+                        URL,
+                        HTTP_ACCEPT_ENCODING=encoding,
+                        HTTP_IF_NONE_MATCH=etag
+                    )
+                self.assertEqual(response.status_code, 304)
+                self.assertEqual(response['ETag'], etag)
+                self.assertEqual(response.content, b'')
+
+    def test_version_bump_changes_etag(self):
+        etag = self.client.get(URL)['ETag']
+        baker.make(Tag)
+        bump_version(TAGS_VERSION)
+        response = self.client.get(URL, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertEqual(len(json.loads(response.content)), 4)
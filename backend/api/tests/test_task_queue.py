@@ -0,0 +1,150 @@
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
+
+from django.core.management import call_command
+from django.test import TransactionTestCase
+from django.utils import timezone
+
+from tasks.models import Task
+from tasks.queue import (
+    REGISTRY,
+    backoff,
+    claim,
+    enqueue,
+    execute,
+    heartbeat,
+    purge_done,
+    requeue_stale
+)
+
+CALLS = []
+
+
+def record(*args, **kwargs):
+    CALLS.append((args, kwargs))
+
+
+def fail():
+    raise ValueError('ошибка задачи')
+
+
+class TaskQueueTests(TransactionTestCase):
+    """
+    TransactionTestCase: execute() закрывает соединение с БД,
+    что внутри транзакции TestCase сломало бы тест.
+    """
+    def setUp(self):
+        CALLS.clear()
+        patcher = mock.patch.dict(REGISTRY, {'record': record, 'fail': fail})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def age(self, task, **fields):
+        """Сдвигает отметки времени задачи на час назад."""
+        hour_ago = timezone.now() - timedelta(hours=1)
+        Task.objects.filter(pk=task.pk).update(
+            **{field: hour_ago for field in fields}
+        )
+
+    def test_claim(self):
+        first, second = enqueue('record'), enqueue('record')
+        enqueue('record', run_at=timezone.now() + timedelta(hours=1))
+        self.assertEqual(claim('w1', 1), [first.pk])
+        self.assertEqual(claim('w2', 5), [second.pk])
+        self.assertEqual(claim('w3', 5), [])
+        first.refresh_from_db()
+        self.assertEqual(
+            (first.status, first.locked_by, first.attempts),
+            (Task.RUNNING, 'w1', 1)
+        )
+        self.assertIsNotNone(first.heartbeat_at)
+
+    def test_execute(self):
+        task = enqueue('record', 1, key='value')
+        claim('w', 1)
+        self.assertTrue(execute(task.pk))
+        self.assertEqual(CALLS, [((1,), {'key': 'value'})])
+        task.refresh_from_db()
+        self.assertEqual(task.status, Task.DONE)
+
+    def test_retry_with_backoff(self):
+        task = enqueue('fail', max_attempts=2)
+        claim('w', 1)
+        started = timezone.now()
+        self.assertFalse(execute(task.pk))
+        task.refresh_from_db()
+        self.assertEqual(task.status, Task.QUEUED)
+        self.assertIn('ошибка задачи', task.last_error)
+        self.assertGreaterEqual(task.run_at, started + backoff(1))
+        self.assertEqual(claim('w', 1), [])
+        Task.objects.filter(pk=task.pk).update(run_at=timezone.now())
+        claim('w', 1)
+        self.assertFalse(execute(task.pk))
+        task.refresh_from_db()
+        self.assertEqual((task.status, task.attempts), (Task.FAILED, 2))
+
+    def test_backoff_is_capped(self):
+        self.assertLess(backoff(1), backoff(2))
+        self.assertEqual(backoff(100), backoff(101))
+
+    def test_heartbeat_keeps_long_task(self):
+        task = enqueue('record')
+        claim('w', 1)
+        self.age(task, locked_at=True, heartbeat_at=True)
+        self.assertEqual(heartbeat('w'), 1)
+        self.assertEqual(requeue_stale(600), (0, 0))
+        task.refresh_from_db()
+        self.assertEqual(task.status, Task.RUNNING)
+
+    def test_requeue_stale(self):
+        task = enqueue('record')
+        claim('dead', 1)
+        self.age(task, heartbeat_at=True)
+        self.assertEqual(requeue_stale(600), (1, 0))
+        task.refresh_from_db()
+        self.assertEqual((task.status, task.locked_by), (Task.QUEUED, ''))
+        self.assertEqual(claim('w', 1), [task.pk])
+
+    def test_stale_requeue_counts_attempts(self):
+        task = enqueue('record', max_attempts=2)
+        for expected in ((1, 0), (0, 1)):
+            claim('dead', 1)
+            self.age(task, heartbeat_at=True)
+            self.assertEqual(requeue_stale(600), expected)
+        task.refresh_from_db()
+        self.assertEqual((task.status, task.attempts), (Task.FAILED, 2))
+
+    def test_purge_done(self):
+        old, fresh, failed = (enqueue('record') for _ in range(3))
+        Task.objects.filter(pk__in=[old.pk, fresh.pk]).update(
+            status=Task.DONE, locked_at=timezone.now()
+        )
+        Task.objects.filter(pk=failed.pk).update(status=Task.FAILED)
+        Task.objects.filter(pk__in=[old.pk, failed.pk]).update(
+            locked_at=timezone.now() - timedelta(days=8)
+        )
+        self.assertEqual(purge_done(7), 1)
+        self.assertEqual(
+            set(Task.objects.values_list('pk', flat=True)),
+            {fresh.pk, failed.pk}
+        )
+
+    def test_run_worker_once(self):
+        for number in range(5):
+            enqueue('record', number)
+        enqueue('fail', max_attempts=1)
+        # Один поток: SQLite в памяти не допускает параллельной записи
+        call_command(
+            'run_worker', once=True, concurrency=1, stdout=StringIO()
+        )
+        self.assertEqual(
+            sorted(args for args, _ in CALLS),
+            [(number,) for number in range(5)]
+        )
+        self.assertEqual(
+            Task.objects.filter(status=Task.DONE).count(), 5
+        )
+        self.assertEqual(
+            Task.objects.filter(status=Task.FAILED).count(), 1
+        )
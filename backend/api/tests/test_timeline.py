@@ -0,0 +1,124 @@
+from datetime import timedelta
+
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from model_bakery import baker
+
+from recipes.models import Recipe, TimelineEntry
+from tasks.models import Task
+from tasks.queue import REGISTRY
+from users.models import Subscribe, User
+from .utils import api_client, make_recipes
+
+URL = '/api/recipes/timeline/'
+
+
+def run_tasks():
+    """Выполняет задачи очереди, как run_worker, в текущей транзакции."""
+    while True:
+        tasks = list(Task.objects.filter(status=Task.QUEUED).order_by('id'))
+        if not tasks:
+            return
+        for task in tasks:
+            REGISTRY[task.name](*task.args, **task.kwargs)
+            task.delete()
+
+
+@override_settings(TIMELINE={'FANOUT_LIMIT': 2, 'BACKFILL': 50})
+class TimelineTests(TestCase):
+    """
+    Порог 2: у small один подписчик (user), его рецепты копируются
+    в ленту; у big два подписчика, его рецепты подмешиваются при чтении.
+    """
+    def setUp(self):
+        self.user, other = baker.make(User, _quantity=2)
+        self.small, self.big = baker.make(User, _quantity=2)
+        with self.captureOnCommitCallbacks(execute=True):
+            Subscribe.objects.create(user=self.user, author=self.small)
+            Subscribe.objects.create(user=self.user, author=self.big)
+            Subscribe.objects.create(user=other, author=self.big)
+            recipes = []
+            for small, big in zip(make_recipes(self.small, 5, ingredients=1),
+                                  make_recipes(self.big, 5, ingredients=1)):
+                recipes += [small, big]
+        # Рецепты авторов чередуются по дате публикации
+        now = timezone.now()
+        for index, recipe in enumerate(recipes):
+            Recipe.objects.filter(pk=recipe.pk).update(
+                pub_date=now - timedelta(minutes=index)
+            )
+        self.expected = [recipe.pk for recipe in recipes]
+        run_tasks()
+
+    def pages(self, limit):
+        client = api_client(self.user)
+        pages, url = [], f'{URL}?limit={limit}'
+        while url:
+            response = client.get(url)
+            self.assertEqual(response.status_code, 200)
+            pages.append([recipe['id'] for recipe in response.data['results']])
+            url = response.data['next']
+        return pages
+
+    def test_only_small_authors_are_fanned_out(self):
+        self.assertEqual(
+            set(TimelineEntry.objects.values_list('author_id', flat=True)),
+            {self.small.pk}
+        )
+        self.assertEqual(
+            TimelineEntry.objects.filter(user=self.user).count(), 5
+        )
+
+    def test_pages_merge_both_sources(self):
+        for limit in (1, 3, 4, 10):
+            with self.subTest(limit=limit):
+                pages = self.pages(limit)
+                self.assertTrue(all(len(page) <= limit for page in pages))
+                self.assertEqual(sum(pages, []), self.expected)
+
+    def test_page_cost_does_not_depend_on_page_size(self):
+        client = api_client(self.user)
+        for limit in (2, 8):
+            with self.subTest(limit=limit):
+                with self.assertNumQueries(8):
+                    response = client.get(URL, {'limit': limit})
+                self.assertEqual(len(response.data['results']), limit)
+
+    def test_unsubscribe_removes_entries(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            Subscribe.objects.filter(
+                user=self.user, author=self.small
+            ).get().delete()
+        run_tasks()
+        self.assertFalse(
+            TimelineEntry.objects.filter(user=self.user).exists()
+        )
+        small = set(self.small.recipe_author.values_list('pk', flat=True))
+        self.assertEqual(
+            sum(self.pages(3), []),
+            [pk for pk in self.expected if pk not in small]
+        )
+
+    def test_unsubscribe_from_large_author(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            Subscribe.objects.filter(
+                user=self.user, author=self.big
+            ).get().delete()
+        run_tasks()
+        # big опустился ниже порога: его рецепты скопированы оставшемуся
+        # подписчику, а в ленте user остался только small
+        self.assertEqual(
+            TimelineEntry.objects.filter(author=self.big).count(), 5
+        )
+        self.assertFalse(TimelineEntry.objects.filter(
+            user=self.user, author=self.big
+        ).exists())
+        self.assertEqual(
+            sum(self.pages(4), []),
+            list(self.small.recipe_author.order_by(
+                '-pub_date', '-id'
+            ).values_list('pk', flat=True))
+        )
+
+    def test_anonymous(self):
+        self.assertEqual(api_client().get(URL).status_code, 401)
@@ -0,0 +1,33 @@
+from model_bakery import baker
+from rest_framework.test import APIClient
+
+from recipes.models import Ingredient, Recipe, RecipeIngredient, Tag
+
+TINY_PNG = (
+    'data:image/png;base64,iVBORw0KGgoAAAANSUhEUgAAAAEAAAABCAYAAAAfFcSJAAAA'
+    'DUlEQVR42mP8z8BQDwAEhQGAhKmMIQAAAABJRU5ErkJggg=='
+)
+
+
+def make_recipes(author, count, ingredients=3):
+    """Рецепты автора с ingredients ингредиентами и одним тегом каждый."""
+    tag = baker.make(Tag)
+    recipes = []
+    for _ in range(count):
+        recipe = baker.make(Recipe, author=author, image=None, cooking_time=1)
+        recipe.tags.add(tag)
+        recipe.ingredients.add(*[
+            baker.make(
+                RecipeIngredient, ingredients=baker.make(Ingredient), amount=2
+            )
+            for _ in range(ingredients)
+        ])
+        recipes.append(recipe)
+    return recipes
+
+
+def api_client(user=None):
+    client = APIClient()
+    if user is not None:
+        client.force_authenticate(user)
+    return client
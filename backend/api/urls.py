@@ -1,8 +1,12 @@
+from django.conf import settings
 from django.urls import include, path
 from rest_framework.routers import DefaultRouter
 
+from . import async_views
 from .users_views import CustomUserViewSet, SubscribeViewSet
 from .recipes_views import (
+    BulkFavoriteViewSet,
+    BulkShoppingCartViewSet,
     download_shopping_cart,
     FavoriteViewSet,
     IngredientViewSet,
@@ -17,8 +21,33 @@ router.register('ingredients', IngredientViewSet, basename='ingredients')
 router.register('recipes', RecipeViewSet, basename='recipes')
 router.register(r'users', CustomUserViewSet, basename='users')
 
-urlpatterns = [
+# Асинхронные view под ASGI (settings.ASYNC_API); записи и все,
+# что они не обрабатывают, передаются синхронным view DRF
+async_urlpatterns = [
+    path(
+        'recipes/download_shopping_cart/',
+        async_views.download_shopping_cart_async
+    ),
+    path('recipes/', async_views.recipe_list),
+    path('recipes/<int:pk>/', async_views.recipe_detail),
+    path('ingredients/', async_views.ingredient_list),
+]
+
+urlpatterns = list(async_urlpatterns) if settings.ASYNC_API else []
+
+BULK_ACTIONS = {
+    'post': 'create',
+    'put': 'update',
+    'delete': 'destroy',
+}
+
+urlpatterns += [
     path('recipes/download_shopping_cart/', download_shopping_cart),
+    path(
+        'recipes/shopping_cart/',
+        BulkShoppingCartViewSet.as_view(BULK_ACTIONS)
+    ),
+    path('recipes/favorite/', BulkFavoriteViewSet.as_view(BULK_ACTIONS)),
     path('', include(router.urls)),
     path('', include('djoser.urls')),
     path('auth/', include('djoser.urls.authtoken')),
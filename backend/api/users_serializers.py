@@ -1,4 +1,5 @@
 from djoser.serializers import UserCreateSerializer, UserSerializer
+from recipes.images import image_url
 from recipes.models import Recipe
 from rest_framework import serializers
 from users.models import User, Subscribe
@@ -13,6 +14,21 @@ SUBSCRIBE_CANNOT_DELETE = (
 )
 
 
+def get_subscribed_authors(request):
+    """
+    Возвращает множество id авторов, на которых подписан пользователь.
+    Вычисляется одним запросом и запоминается на объекте запроса,
+    чтобы все сериализаторы с вложенными пользователями его переиспользовали.
+    """
+    if not hasattr(request, '_subscribed_authors'):
+        request._subscribed_authors = set(
+            Subscribe.objects.filter(
+                user=request.user
+            ).values_list('author_id', flat=True)
+        )
+    return request._subscribed_authors
+
+
 class CustomUserCreateSerializer(UserCreateSerializer):
     class Meta:
         model = User
@@ -32,9 +48,9 @@ class CustomUserSerializer(UserSerializer):
     def get_is_subscribed(self, obj):
         """Метод определяет подписан ли текущий пользователь на автора"""
         request = self.context.get('request')
-        if request.user.is_anonymous or request is None:
+        if request is None or request.user.is_anonymous:
             return False
-        return Subscribe.objects.filter(user=request.user, author=obj).exists()
+        return obj.id in get_subscribed_authors(request)
 
     class Meta:
         model = User
@@ -65,6 +81,11 @@ class UserMeSerializer(serializers.ModelSerializer):
 
 class RecipeShortSerializer(serializers.ModelSerializer):
     """Вспомогательный сериализатор для SubscribeSerializer"""
+    image = serializers.SerializerMethodField()
+
+    def get_image(self, obj):
+        return image_url(self.context.get('request'), obj, 'card')
+
     class Meta:
         model = Recipe
         fields = ('id', 'name', 'image', 'cooking_time')
@@ -117,9 +138,11 @@ class SubscribeCreateSerializer(serializers.ModelSerializer):
 
 class SubscribeSerializer(CustomUserSerializer):
     recipes = serializers.SerializerMethodField()
-    recipes_count = serializers.SerializerMethodField()
+    recipes_count = serializers.ReadOnlyField()
 
     def get_recipes(self, obj):
+        """Рецепты автора; в subscriptions уже подгружены prefetch-ем
+        с учетом recipes_limit, срез тогда берется из кэша."""
         request = self.context.get('request')
         limit_recipes = request.query_params.get('recipes_limit')
         if limit_recipes:
@@ -129,9 +152,6 @@ class SubscribeSerializer(CustomUserSerializer):
         context = {'request': request}
         return RecipeShortSerializer(recipes, many=True, context=context).data
 
-    def get_recipes_count(self, obj):
-        return obj.recipe_author.all().count()
-
     class Meta:
         model = User
         fields = (
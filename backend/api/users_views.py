@@ -1,15 +1,47 @@
+from django.db import transaction
+from django.db.models import (
+    F,
+    Prefetch,
+    Window,
+    prefetch_related_objects
+)
+from django.db.models.expressions import RawSQL
+from django.db.models.functions import RowNumber
 from django.shortcuts import get_object_or_404
 from djoser.views import UserViewSet
 from rest_framework import permissions, status, viewsets
 from rest_framework.decorators import action
 from rest_framework.response import Response
 
+from recipes.models import Recipe
 from users.models import Subscribe, User
 from .pagination import LimitPageNumberPagination
 from .permissions import OwnerOrReadOnly
 from .users_serializers import SubscribeCreateSerializer, SubscribeSerializer
 
 
+def get_latest_recipes(author_ids, limit):
+    """
+    Первые limit рецептов каждого автора одним запросом:
+    ROW_NUMBER() OVER (PARTITION BY author_id ORDER BY pub_date DESC).
+    """
+    ranked = Recipe.objects.filter(
+        author_id__in=author_ids
+    ).annotate(
+        recipe_rank=Window(
+            expression=RowNumber(),
+            partition_by=[F('author_id')],
+            order_by=[F('pub_date').desc(), F('id').desc()]
+        )
+    ).values('id', 'recipe_rank')
+    sql, params = ranked.query.sql_with_params()
+    return Recipe.objects.filter(id__in=RawSQL(
+        f'SELECT ranked.id FROM ({sql}) ranked '
+        'WHERE ranked.recipe_rank <= %s',
+        (*params, limit)
+    ))
+
+
 class CustomUserViewSet(UserViewSet):
     pagination_class = LimitPageNumberPagination
     queryset = User.objects.all()
@@ -24,6 +56,16 @@ class CustomUserViewSet(UserViewSet):
     def subscriptions(self, request):
         users = User.objects.filter(following__user=request.user)
         pages = self.paginate_queryset(users)
+        limit_recipes = request.query_params.get('recipes_limit')
+        if limit_recipes:
+            recipes = get_latest_recipes(
+                [user.id for user in pages], int(limit_recipes)
+            )
+        else:
+            recipes = Recipe.objects.all()
+        prefetch_related_objects(
+            pages, Prefetch('recipe_author', queryset=recipes)
+        )
         serializer = SubscribeSerializer(
             pages,
             many=True,
@@ -44,6 +86,11 @@ class SubscribeViewSet(viewsets.ModelViewSet):
             return SubscribeSerializer
         return SubscribeCreateSerializer
 
+    @transaction.atomic
+    def create(self, request, *args, **kwargs):
+        """Подписка и счетчик подписчиков - в одной транзакции."""
+        return super().create(request, *args, **kwargs)
+
     def perform_create(self, serializer):
         author = get_object_or_404(User, pk=self.kwargs.get('users_id'))
         if not serializer.is_valid():
@@ -54,6 +101,7 @@ class SubscribeViewSet(viewsets.ModelViewSet):
 
         return serializer.save(user=self.request.user, author=author)
 
+    @transaction.atomic
     def destroy(self, request, users_id):
         serializer = self.get_serializer(data=request.data)
         if not serializer.is_valid():
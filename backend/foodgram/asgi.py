@@ -4,4 +4,5 @@ from django.core.asgi import get_asgi_application
 
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'foodgram.settings')
+os.environ.setdefault('FOODGRAM_ASYNC_API', '1')
 application = get_asgi_application()
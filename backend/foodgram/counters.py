@@ -0,0 +1,16 @@
+class CounterFieldsMixin:
+    """
+    Модель с денормализованными счетчиками counter_fields.
+    Счетчики меняются только F()-выражениями, поэтому обычное сохранение
+    существующего объекта их не перезаписывает.
+    """
+    counter_fields = ()
+
+    def save(self, *args, **kwargs):
+        if not self._state.adding and kwargs.get('update_fields') is None:
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key
+                and field.name not in self.counter_fields
+            ]
+        super().save(*args, **kwargs)
@@ -0,0 +1,56 @@
+"""
+Маршрутизация запросов к репликам. По умолчанию все запросы, включая
+админку, команды и фоновые задачи, идут в основную БД. Чтение с реплики
+включает ReplicaRoutingMiddleware для безопасных запросов к api/:
+выбранная реплика хранится в contextvar, поэтому выбор виден
+и в потоках sync_to_async асинхронных view.
+"""
+import random
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
+
+read_alias = ContextVar('read_alias', default=None)
+
+
+def replica_aliases():
+    return settings.READ_REPLICAS['ALIASES']
+
+
+@contextmanager
+def use_database(alias):
+    token = read_alias.set(alias)
+    try:
+        yield
+    finally:
+        read_alias.reset(token)
+
+
+def use_replica():
+    return use_database(random.choice(replica_aliases()))
+
+
+def use_primary():
+    """
+    Чтение с основной БД внутри запроса на реплику: для данных,
+    которые кэшируются под новой версией и не должны отставать.
+    """
+    return use_database(None)
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        return read_alias.get() or DEFAULT_DB_ALIAS
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        """Реплики содержат те же данные, что и основная БД."""
+        return True
+
+    def allow_migrate(self, db, app_label, **hints):
+        """Схема реплик приходит с репликацией."""
+        return db not in replica_aliases()
@@ -0,0 +1,151 @@
+import hashlib
+import json
+import logging
+import os
+import sys
+import time
+from collections import Counter
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+
+from .db_router import replica_aliases, use_replica
+
+logger = logging.getLogger('foodgram.profiling')
+
+API_DIR = os.path.join(settings.BASE_DIR, 'api') + os.sep
+API_PREFIX = '/api/'
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+
+def api_origin():
+    """Ближайший к запросу кадр стека из кода api/."""
+    frame = sys._getframe(2)
+    while frame is not None:
+        filename = frame.f_code.co_filename
+        if filename.startswith(API_DIR):
+            return (
+                f'{os.path.relpath(filename, settings.BASE_DIR)}:'
+                f'{frame.f_lineno} in {frame.f_code.co_name}'
+            )
+        frame = frame.f_back
+    return None
+
+
+class QueryRecorder:
+    """execute_wrapper: считает запросы, их время и место вызова в api/."""
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+        self.statements = Counter()
+        self.origins = {}
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.duration += time.perf_counter() - start
+            self.count += 1
+            self.statements[sql] += 1
+            if sql not in self.origins:
+                self.origins[sql] = api_origin()
+
+
+class RequestProfilingMiddleware:
+    """
+    Для каждого запроса считает число SQL-запросов, время SQL и Python,
+    самый частый повторяющийся запрос. Отдает их в заголовке
+    Server-Timing и пишет структурированную строку в лог.
+    Медленные запросы пишутся с SQL и местом вызова в api/.
+    Выключенный (REQUEST_PROFILING['ENABLED'] = False) middleware
+    исключается из цепочки целиком.
+    """
+    def __init__(self, get_response):
+        config = settings.REQUEST_PROFILING
+        if not config['ENABLED']:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.slow_ms = config['SLOW_REQUEST_MS']
+        self.slow_queries = config['SLOW_QUERY_COUNT']
+
+    def __call__(self, request):
+        recorder = QueryRecorder()
+        start = time.perf_counter()
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(recorder))
+            response = self.get_response(request)
+        total_ms = (time.perf_counter() - start) * 1000
+        sql_ms = recorder.duration * 1000
+        duplicate, repeats = (
+            recorder.statements.most_common(1) or [(None, 0)]
+        )[0]
+        response['Server-Timing'] = (
+            f'sql;dur={sql_ms:.1f};desc="{recorder.count} queries", '
+            f'app;dur={total_ms - sql_ms:.1f}, '
+            f'total;dur={total_ms:.1f}'
+        )
+        record = {
+            'method': request.method,
+            'path': request.path,
+            'status': response.status_code,
+            'queries': recorder.count,
+            'sql_ms': round(sql_ms, 1),
+            'python_ms': round(total_ms - sql_ms, 1),
+            'total_ms': round(total_ms, 1),
+            'top_duplicate': duplicate if repeats > 1 else None,
+            'top_duplicate_count': repeats,
+        }
+        logger.info(json.dumps(record, ensure_ascii=False))
+        if total_ms >= self.slow_ms or recorder.count >= self.slow_queries:
+            record['statements'] = [
+                {
+                    'sql': sql,
+                    'count': count,
+                    'origin': recorder.origins.get(sql),
+                }
+                for sql, count in recorder.statements.most_common()
+            ]
+            logger.warning(json.dumps(record, ensure_ascii=False))
+        return response
+
+
+class ReplicaRoutingMiddleware:
+    """
+    Безопасные запросы к api/ читают с реплики. После небезопасного
+    запроса клиент на READ_REPLICAS['STICKY_SECONDS'] закрепляется
+    за основной БД, чтобы сразу видеть свои изменения, несмотря на
+    отставание реплик. Клиент определяется по заголовку Authorization.
+    Без реплик middleware исключается из цепочки.
+    """
+    def __init__(self, get_response):
+        if not replica_aliases():
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.sticky_seconds = settings.READ_REPLICAS['STICKY_SECONDS']
+
+    def sticky_key(self, request):
+        credentials = request.META.get('HTTP_AUTHORIZATION')
+        if not credentials:
+            return None
+        digest = hashlib.md5(credentials.encode()).hexdigest()
+        return f'db_sticky:{digest}'
+
+    def __call__(self, request):
+        if not request.path.startswith(API_PREFIX):
+            return self.get_response(request)
+        key = self.sticky_key(request)
+        if request.method not in SAFE_METHODS:
+            try:
+                return self.get_response(request)
+            finally:
+                if key is not None:
+                    cache.set(key, True, self.sticky_seconds)
+        if key is not None and cache.get(key):
+            return self.get_response(request)
+        with use_replica():
+            return self.get_response(request)
@@ -1,4 +1,5 @@
 import os
+import sys
 
 from dotenv import load_dotenv
 
@@ -10,6 +11,8 @@ SECRET_KEY = os.getenv('MY_SECRET_KEY', default='default')
 
 DEBUG = False
 
+TESTING = sys.argv[1:2] == ['test']
+
 ALLOWED_HOSTS = ['*']
 
 AUTH_USER_MODEL = 'users.User'
@@ -24,6 +27,7 @@ INSTALLED_APPS = [
     'users.apps.UsersConfig',
     'recipes.apps.RecipesConfig',
     'api.apps.ApiConfig',
+    'tasks.apps.TasksConfig',
     'djoser',
     'rest_framework',
     'rest_framework.authtoken',
@@ -31,6 +35,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'foodgram.middleware.RequestProfilingMiddleware',
+    'foodgram.middleware.ReplicaRoutingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -60,6 +66,17 @@ TEMPLATES = [
 
 WSGI_APPLICATION = 'foodgram.wsgi.application'
 
+# Реплики только для чтения: DB_REPLICA_HOSTS=host1,host2, остальные
+# параметры подключения как у основной БД. Безопасные запросы к api/
+# читают с реплик, пользователь после записи STICKY_SECONDS читает
+# с основной БД.
+READ_REPLICAS = {
+    'ALIASES': [],
+    'STICKY_SECONDS': int(os.getenv('DB_STICKY_SECONDS', default=10)),
+}
+
+DATABASE_ROUTERS = ['foodgram.db_router.ReplicaRouter']
+
 if DEBUG:
     DATABASES = {
         'default': {
@@ -79,6 +96,94 @@ else:
             'PORT': os.getenv('DB_PORT', default='5432')
         }
     }
+    replica_hosts = os.getenv('DB_REPLICA_HOSTS', default='').split(',')
+    for number, host in enumerate(filter(None, replica_hosts), start=1):
+        alias = f'replica_{number}'
+        DATABASES[alias] = {
+            **DATABASES['default'],
+            'HOST': host.strip(),
+            'TEST': {'MIRROR': 'default'},
+        }
+        READ_REPLICAS['ALIASES'].append(alias)
+
+# Реплика-зеркало основной БД для тестов маршрутизации: в READ_REPLICAS
+# она включается только в самих тестах через override_settings.
+if TESTING:
+    DATABASES['replica'] = {
+        **DATABASES['default'],
+        'TEST': {'MIRROR': 'default'},
+    }
+
+# Версии данных, снимки списков, кэш токенов и закрепление за основной БД
+# должны быть общими для всех процессов (gunicorn, run_worker, команды),
+# поэтому вне DEBUG и тестов по умолчанию используется memcached.
+if DEBUG or TESTING:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'foodgram',
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': os.getenv(
+                'CACHE_BACKEND',
+                default='django.core.cache.backends.memcached.PyMemcacheCache'
+            ),
+            'LOCATION': os.getenv('CACHE_LOCATION', default='cache:11211'),
+        }
+    }
+
+# Асинхронные view горячих эндпоинтов чтения; включается в foodgram.asgi
+ASYNC_API = os.getenv('FOODGRAM_ASYNC_API') == '1'
+# Потоков (и соединений с каждой БД) для параллельных запросов
+# асинхронных view в одном процессе
+ASYNC_DB_THREADS = int(os.getenv('ASYNC_DB_THREADS', default=8))
+
+# Конфигурация полнотекстового поиска PostgreSQL
+SEARCH_CONFIG = os.getenv('SEARCH_CONFIG', default='russian')
+
+API_CACHE_TIMEOUT = int(os.getenv('API_CACHE_TIMEOUT', default=60 * 15))
+
+SNAPSHOT_MAX_AGE = int(os.getenv('SNAPSHOT_MAX_AGE', default=60))
+
+AUTH_TOKEN_CACHE = {
+    'LOCAL_SIZE': int(os.getenv('AUTH_TOKEN_CACHE_SIZE', default=10000)),
+    'LOCAL_TTL': int(os.getenv('AUTH_TOKEN_CACHE_TTL', default=60)),
+    'SHARED_TTL': int(os.getenv('AUTH_TOKEN_SHARED_TTL', default=60 * 5)),
+}
+
+# Лента подписок: рецепты авторов, у которых подписчиков не меньше
+# FANOUT_LIMIT, не копируются в ленты, а подмешиваются при чтении;
+# BACKFILL - сколько последних рецептов автора попадает в ленту при подписке
+TIMELINE = {
+    'FANOUT_LIMIT': int(os.getenv('TIMELINE_FANOUT_LIMIT', default=10000)),
+    'BACKFILL': int(os.getenv('TIMELINE_BACKFILL', default=50)),
+}
+
+REQUEST_PROFILING = {
+    'ENABLED': os.getenv('REQUEST_PROFILING', default='') == '1',
+    'SLOW_REQUEST_MS': int(os.getenv('SLOW_REQUEST_MS', default=500)),
+    'SLOW_QUERY_COUNT': int(os.getenv('SLOW_QUERY_COUNT', default=30)),
+}
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {
+            'class': 'logging.StreamHandler',
+        },
+    },
+    'loggers': {
+        'foodgram.profiling': {
+            'handlers': ['console'],
+            'level': 'INFO',
+            'propagate': False,
+        },
+    },
+}
 
 AUTH_PASSWORD_VALIDATORS = [
     {
@@ -118,7 +223,7 @@ MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework.authentication.TokenAuthentication',
+        'api.authentication.CachedTokenAuthentication',
     ],
     'PAGE_SIZE': 6,
 }
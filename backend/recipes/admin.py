@@ -18,9 +18,13 @@ class RecipeAdmin(admin.ModelAdmin):
         'show_favorite_count'
     )
 
+    @admin.display(
+        description='Добавлений в избранное',
+        ordering='favorites_count'
+    )
     def show_favorite_count(self, obj):
         """Счетчик добавления в избранное"""
-        return obj.is_favorited.count()
+        return obj.favorites_count
 
 
 @admin.register(Tag)
@@ -0,0 +1,189 @@
+import threading
+
+import numpy as np
+from django.core.cache import cache
+from django.db import transaction
+from foodgram.db_router import use_primary
+
+from .models import Recipe
+from .versions import COOK_INDEX_VERSION, bump_version, get_version
+
+# Сколько изменений помнит журнал; при большем отставании индекс
+# процесса перестраивается целиком
+MAX_JOURNAL = 1000
+JOURNAL_TIMEOUT = 60 * 60
+EMPTY = np.empty(0, dtype=np.int64)
+
+
+def journal_key(version):
+    return f'cook_index_change:{version}'
+
+
+def record_change(recipe_id):
+    """
+    Записывает в журнал общего кэша изменение состава рецепта.
+    recipe_id=None требует полной перестройки индекса.
+    """
+    def record():
+        cache.set(
+            journal_key(bump_version(COOK_INDEX_VERSION)),
+            recipe_id or 0,
+            JOURNAL_TIMEOUT
+        )
+    transaction.on_commit(record)
+
+
+def recipe_ingredients(recipe_ids=None):
+    """Пары (рецепт, ингредиент) из промежуточной таблицы, без повторов."""
+    queryset = Recipe.ingredients.through.objects.all()
+    if recipe_ids is not None:
+        queryset = queryset.filter(recipe_id__in=recipe_ids)
+    rows = np.array(
+        list(queryset.values_list(
+            'recipe_id', 'recipeingredient__ingredients_id'
+        )),
+        dtype=np.int64
+    ).reshape(-1, 2)
+    return np.unique(rows, axis=0)
+
+
+class RecipeCoverageIndex:
+    """
+    Инвертированный индекс ингредиент -> отсортированный массив id
+    рецептов для поиска «что приготовить из того, что есть».
+    Оценка векторизована: списки рецептов имеющихся ингредиентов
+    склеиваются, np.unique считает совпадения для каждого рецепта,
+    а число недостающих берется из размеров рецептов.
+    Стоимость запроса зависит от длины списков, а не от числа рецептов.
+    Состав рецептов хранится в CSR-массивах: ингредиенты рецепта
+    recipe_ids[i] - indices[indptr[i]:indptr[i + 1]].
+    Изменения рецептов приходят через журнал в общем кэше и применяются
+    к индексу процесса точечно.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._version = None
+        self._index = ({}, EMPTY, np.zeros(1, dtype=np.int64), EMPTY)
+
+    def _compress(self, rows):
+        """Отсортированные пары (рецепт, ингредиент) -> CSR-массивы."""
+        recipe_ids, sizes = np.unique(rows[:, 0], return_counts=True)
+        indptr = np.concatenate(([0], np.cumsum(sizes))).astype(np.int64)
+        return recipe_ids, indptr, rows[:, 1]
+
+    def _build(self):
+        rows = recipe_ingredients()
+        postings = {}
+        if len(rows):
+            by_ingredient = rows[np.lexsort((rows[:, 0], rows[:, 1]))]
+            ingredients, starts = np.unique(
+                by_ingredient[:, 1], return_index=True
+            )
+            for ingredient_id, recipe_ids in zip(
+                ingredients.tolist(),
+                np.split(by_ingredient[:, 0], starts[1:])
+            ):
+                postings[ingredient_id] = recipe_ids
+        self._index = (postings, *self._compress(rows))
+
+    def _composition(self, recipe_id):
+        """Ингредиенты рецепта в индексе (срез CSR)."""
+        _, recipe_ids, indptr, indices = self._index
+        position = np.searchsorted(recipe_ids, recipe_id)
+        if position == len(recipe_ids) or recipe_ids[position] != recipe_id:
+            return EMPTY
+        return indices[indptr[position]:indptr[position + 1]]
+
+    def _apply(self, recipe_ids):
+        """
+        Точечно переносит в индекс текущий состав рецептов.
+        Изменения собираются в копии и подменяют индекс одним
+        присваиванием, поэтому читатели не видят промежуточного состояния.
+        """
+        postings, recipe_ids_array, indptr, indices = self._index
+        postings = dict(postings)
+        changed = np.array(sorted(recipe_ids), dtype=np.int64)
+        rows = recipe_ingredients(changed.tolist())
+        for recipe_id in changed.tolist():
+            old = self._composition(recipe_id)
+            ingredients = rows[rows[:, 0] == recipe_id, 1]
+            for ingredient_id in np.setdiff1d(old, ingredients).tolist():
+                posting = postings[ingredient_id]
+                posting = np.delete(
+                    posting, np.searchsorted(posting, recipe_id)
+                )
+                if len(posting):
+                    postings[ingredient_id] = posting
+                else:
+                    del postings[ingredient_id]
+            for ingredient_id in np.setdiff1d(ingredients, old).tolist():
+                posting = postings.get(ingredient_id, EMPTY)
+                postings[ingredient_id] = np.insert(
+                    posting, np.searchsorted(posting, recipe_id), recipe_id
+                )
+        kept = np.column_stack((
+            np.repeat(recipe_ids_array, np.diff(indptr)), indices
+        ))
+        kept = kept[~np.isin(kept[:, 0], changed)]
+        rows = np.concatenate((kept, rows))
+        rows = rows[np.lexsort((rows[:, 1], rows[:, 0]))]
+        self._index = (postings, *self._compress(rows))
+
+    def _changes(self, version):
+        """Рецепты, измененные после версии индекса; None - перестроить."""
+        if (self._version is None or version < self._version
+                or version - self._version > MAX_JOURNAL):
+            return None
+        keys = [
+            journal_key(number)
+            for number in range(self._version + 1, version + 1)
+        ]
+        changes = cache.get_many(keys)
+        if len(changes) != len(keys) or 0 in changes.values():
+            return None
+        return set(changes.values())
+
+    def _refresh(self):
+        version = get_version(COOK_INDEX_VERSION)
+        if version == self._version:
+            return
+        with self._lock:
+            if version == self._version:
+                return
+            changes = self._changes(version)
+            with use_primary():
+                if changes is None:
+                    self._build()
+                else:
+                    self._apply(changes)
+            self._version = version
+
+    def rank(self, ingredient_ids, max_missing=None):
+        """
+        Рецепты, в которых есть хотя бы один из ингредиентов, в виде
+        (id, совпало, не хватает): сначала с наименьшим числом недостающих,
+        затем с наибольшей долей имеющихся, затем новые.
+        """
+        self._refresh()
+        postings, recipe_ids, indptr, _ = self._index
+        lists = [
+            postings[ingredient_id] for ingredient_id in set(ingredient_ids)
+            if ingredient_id in postings
+        ]
+        if not lists:
+            return []
+        found, matched = np.unique(np.concatenate(lists), return_counts=True)
+        positions = np.searchsorted(recipe_ids, found)
+        missing = indptr[positions + 1] - indptr[positions] - matched
+        if max_missing is not None:
+            keep = missing <= max_missing
+            found, matched, missing = found[keep], matched[keep], missing[keep]
+        order = np.lexsort((-found, -matched / (matched + missing), missing))
+        return list(zip(
+            found[order].tolist(),
+            matched[order].tolist(),
+            missing[order].tolist()
+        ))
+
+
+cook_index = RecipeCoverageIndex()
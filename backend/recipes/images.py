@@ -0,0 +1,131 @@
+import base64
+import binascii
+import hashlib
+import io
+import os
+
+from django.core.files.base import ContentFile
+from django.core.files.uploadedfile import TemporaryUploadedFile
+from PIL import Image, ImageOps
+
+from .storage import recipe_image_storage
+from .versions import RECIPES_VERSION, bump_version
+
+MAX_IMAGE_SIZE = 10 * 1024 * 1024
+MAX_IMAGE_PIXELS = 40_000_000
+DECODE_CHUNK = 4 * 16 * 1024
+IMAGE_VARIANTS = {
+    'card': (480, 480),
+    'detail': (1200, 1200),
+}
+VARIANT_FORMATS = {
+    'jpeg': ('JPEG', 'jpg'),
+    'webp': ('WEBP', 'webp'),
+}
+VARIANTS_DIR = 'static/recipe/variants/'
+
+IMAGE_TOO_LARGE = 'Размер изображения превышает {} МБ'
+IMAGE_TOO_MANY_PIXELS = 'Изображение больше {} мегапикселей'
+IMAGE_INVALID = 'Некорректное изображение'
+
+
+class ImageValidationError(ValueError):
+    pass
+
+
+def decode_base64_image(data):
+    """
+    Декодирует data:image/...;base64 частями во временный файл.
+    Размер проверяется до декодирования, число пикселей — по заголовку
+    изображения, до распаковки самих пикселей.
+    Пробелы и переносы строк (base64 по 76 символов) удаляются заранее:
+    иначе части по DECODE_CHUNK символов сдвигаются относительно
+    четверок base64 и декодируются неверно.
+    Имя файла — sha256 содержимого.
+    """
+    try:
+        header, encoded = data.split(';base64,', 1)
+    except ValueError:
+        raise ImageValidationError(IMAGE_INVALID)
+    ext = header.split('/')[-1].lower().replace('jpeg', 'jpg')
+    encoded = ''.join(encoded.split())
+    if len(encoded) * 3 // 4 > MAX_IMAGE_SIZE:
+        raise ImageValidationError(
+            IMAGE_TOO_LARGE.format(MAX_IMAGE_SIZE // (1024 * 1024))
+        )
+    digest = hashlib.sha256()
+    file = TemporaryUploadedFile('temp', f'image/{ext}', 0, None)
+    try:
+        for start in range(0, len(encoded), DECODE_CHUNK):
+            chunk = base64.b64decode(encoded[start:start + DECODE_CHUNK])
+            digest.update(chunk)
+            file.write(chunk)
+        file.size = file.tell()
+        file.seek(0)
+        with Image.open(file.temporary_file_path()) as image:
+            width, height = image.size
+    except (binascii.Error, OSError, Image.DecompressionBombError):
+        file.close()
+        raise ImageValidationError(IMAGE_INVALID)
+    if width * height > MAX_IMAGE_PIXELS:
+        file.close()
+        raise ImageValidationError(
+            IMAGE_TOO_MANY_PIXELS.format(MAX_IMAGE_PIXELS // 1_000_000)
+        )
+    file.name = f'{digest.hexdigest()}.{ext}'
+    return file
+
+
+def variant_name(source, variant, extension):
+    stem = os.path.splitext(os.path.basename(source))[0]
+    return f'{VARIANTS_DIR}{stem}_{variant}.{extension}'
+
+
+def build_variants(source):
+    """Уменьшенные копии изображения в JPEG и WebP для всех размеров."""
+    variants = {'source': source}
+    with recipe_image_storage.open(source) as file:
+        with Image.open(file) as original:
+            original = ImageOps.exif_transpose(original).convert('RGB')
+            for variant, size in IMAGE_VARIANTS.items():
+                image = original.copy()
+                image.thumbnail(size)
+                variants[variant] = {}
+                for key, (image_format, extension) in VARIANT_FORMATS.items():
+                    name = variant_name(source, variant, extension)
+                    if not recipe_image_storage.exists(name):
+                        buffer = io.BytesIO()
+                        image.save(
+                            buffer, image_format, quality=80, optimize=True
+                        )
+                        recipe_image_storage.save(
+                            name, ContentFile(buffer.getvalue())
+                        )
+                    variants[variant][key] = name
+    return variants
+
+
+def process_recipe_image(recipe_id):
+    """Строит варианты изображения рецепта и сохраняет их пути."""
+    from .models import Recipe
+
+    recipe = Recipe.objects.filter(pk=recipe_id).only('image').first()
+    if recipe is None or not recipe.image:
+        return
+    variants = build_variants(recipe.image.name)
+    Recipe.objects.filter(
+        pk=recipe_id, image=recipe.image.name
+    ).update(image_variants=variants)
+    bump_version(RECIPES_VERSION)
+
+
+def image_url(request, recipe, variant, image_format='jpeg'):
+    """URL варианта изображения, пока его нет — URL оригинала."""
+    if not recipe.image:
+        return None
+    name = recipe.image_variants.get(variant, {}).get(image_format)
+    if recipe.image_variants.get('source') != recipe.image.name or not name:
+        url = recipe.image.url
+    else:
+        url = recipe_image_storage.url(name)
+    return request.build_absolute_uri(url) if request else url
@@ -0,0 +1,58 @@
+import threading
+from bisect import bisect_left
+
+from foodgram.db_router import use_primary
+
+from .models import Ingredient
+from .versions import INGREDIENTS_VERSION, get_version
+
+# Больше любого символа имени: граница диапазона ключей с префиксом
+LAST_CHAR = chr(0x10FFFF)
+
+
+class IngredientPrefixIndex:
+    """
+    Ингредиенты в памяти процесса: строки в порядке выдачи БД (по name)
+    и отсортированный по casefold-имени массив ключей с позициями строк.
+    Поиск по префиксу: бинарный поиск диапазона ключей, затем совпадения
+    возвращаются в порядке БД, как при istartswith с ordering по name,
+    т.е. O(log n + k log k). Индекс перестраивается лениво,
+    когда меняется версия ингредиентов в кэше.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._version = None
+        self._index = ([], [], [])
+
+    def _build(self):
+        rows = list(Ingredient.objects.order_by('name', 'id').values(
+            'id', 'name', 'measurement_unit'
+        ))
+        keys = [row['name'].casefold() for row in rows]
+        positions = sorted(range(len(rows)), key=keys.__getitem__)
+        self._index = (
+            [keys[position] for position in positions], positions, rows
+        )
+
+    def _refresh(self):
+        version = get_version(INGREDIENTS_VERSION)
+        if version == self._version:
+            return
+        with self._lock:
+            if version != self._version:
+                with use_primary():
+                    self._build()
+                self._version = version
+
+    def search(self, prefix, limit=None):
+        """Ингредиенты, имя которых начинается с prefix без учета регистра."""
+        self._refresh()
+        keys, positions, rows = self._index
+        prefix = prefix.casefold()
+        start = bisect_left(keys, prefix)
+        end = bisect_left(keys, prefix + LAST_CHAR, lo=start)
+        found = sorted(positions[start:end])
+        return [rows[position] for position in found[:limit]]
+
+
+ingredient_index = IngredientPrefixIndex()
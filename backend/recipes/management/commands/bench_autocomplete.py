@@ -0,0 +1,50 @@
+import time
+
+from django.core.management.base import BaseCommand
+from recipes.ingredient_index import ingredient_index
+from recipes.models import Ingredient
+
+
+class Command(BaseCommand):
+    help = 'Сравнение поиска ингредиентов: индекс в памяти против ORM'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repeat', type=int, default=20)
+        parser.add_argument('--limit', type=int, default=None)
+
+    def measure(self, search, prefixes, repeat):
+        start = time.perf_counter()
+        for _ in range(repeat):
+            for prefix in prefixes:
+                search(prefix)
+        return (time.perf_counter() - start) / (repeat * len(prefixes))
+
+    def handle(self, *args, **options):
+        repeat, limit = options['repeat'], options['limit']
+        names = Ingredient.objects.values_list('name', flat=True)
+        prefixes = sorted({
+            name[:length] for name in names for length in (1, 2, 3)
+        })
+        if not prefixes:
+            self.stdout.write(self.style.WARNING('Нет ингредиентов в БД.'))
+            return
+
+        def orm_search(prefix):
+            queryset = Ingredient.objects.filter(
+                name__istartswith=prefix
+            ).values('id', 'name', 'measurement_unit')
+            return list(queryset[:limit] if limit else queryset)
+
+        ingredient_index.search('')
+        orm = self.measure(orm_search, prefixes, repeat)
+        index = self.measure(
+            lambda prefix: ingredient_index.search(prefix, limit),
+            prefixes,
+            repeat
+        )
+        self.stdout.write(
+            f'Префиксов: {len(prefixes)}, повторов: {repeat}\n'
+            f'ORM:    {orm * 1000:.3f} мс на запрос\n'
+            f'Индекс: {index * 1000:.3f} мс на запрос\n'
+            f'Ускорение: x{orm / index:.1f}'
+        )
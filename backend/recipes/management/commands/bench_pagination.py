@@ -0,0 +1,104 @@
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from api.pagination import LimitPageNumberPagination, RecipeCursorPagination
+from recipes.models import Recipe
+
+User = get_user_model()
+
+BENCH_AUTHOR = 'bench_pagination'
+BASE_URL = 'http://bench/api/recipes/'
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнение пагинации page/limit и cursor ленты рецептов '
+        'на сгенерированном наборе данных. Недостающие рецепты создаются '
+        'в транзакции, которая откатывается после замеров.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--recipes', type=int, default=1_000_000)
+        parser.add_argument('--limit', type=int, default=6)
+        parser.add_argument('--batch-size', type=int, default=10_000)
+        parser.add_argument('--repeat', type=int, default=5)
+
+    def generate(self, total, batch_size):
+        missing = total - Recipe.objects.count()
+        if missing <= 0:
+            return
+        author, _ = User.objects.get_or_create(
+            username=BENCH_AUTHOR,
+            defaults={'email': f'{BENCH_AUTHOR}@example.com'}
+        )
+        self.stdout.write(f'Создаем {missing} рецептов...')
+        while missing > 0:
+            size = min(batch_size, missing)
+            Recipe.objects.bulk_create(
+                Recipe(
+                    author=author,
+                    name=f'Рецепт {number}',
+                    text='Описание',
+                    cooking_time=number % 120 + 1
+                ) for number in range(size)
+            )
+            missing -= size
+
+    def measure(self, func, repeat):
+        start = time.perf_counter()
+        for _ in range(repeat):
+            func()
+        return (time.perf_counter() - start) / repeat * 1000
+
+    def request(self, url, params=None):
+        return Request(APIRequestFactory().get(url, params))
+
+    def offset_page(self, queryset, depth, limit):
+        request = self.request(BASE_URL, {'page': depth, 'limit': limit})
+        return lambda: LimitPageNumberPagination().paginate_queryset(
+            queryset, request
+        )
+
+    def cursor_page(self, queryset, depth, limit):
+        """Страница depth по ссылке next предыдущей страницы."""
+        paginator = RecipeCursorPagination()
+        paginator.base_url = f'{BASE_URL}?limit={limit}'
+        url = paginator.base_url
+        if depth > 1:
+            boundary = queryset.values_list('pub_date', 'id')[
+                (depth - 1) * limit - 1
+            ]
+            url = paginator.link(*boundary)
+        request = self.request(url)
+        return lambda: RecipeCursorPagination().paginate_queryset(
+            queryset, request
+        )
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            self.generate(options['recipes'], options['batch_size'])
+            self.report(options['limit'], options['repeat'])
+            transaction.set_rollback(True)
+
+    def report(self, limit, repeat):
+        queryset = Recipe.objects.order_by('-pub_date', '-id')
+        pages = queryset.count() // limit
+        depths = sorted({
+            depth for depth in (1, 10, 100, 1000, 10_000, pages)
+            if 0 < depth <= pages
+        })
+        self.stdout.write(f'{"страница":>10} {"offset, мс":>12} '
+                          f'{"cursor, мс":>12}')
+        for depth in depths:
+            offset = self.measure(
+                self.offset_page(queryset, depth, limit), repeat
+            )
+            cursor = self.measure(
+                self.cursor_page(queryset, depth, limit), repeat
+            )
+            self.stdout.write(f'{depth:>10} {offset:>12.2f} {cursor:>12.2f}')
@@ -0,0 +1,136 @@
+import time
+
+import numpy as np
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count, F, Max, Min, Q
+from django.utils import timezone
+from recipes.models import Recipe, SimilarRecipe
+from recipes.similarity import (
+    TAG_WEIGHT,
+    TOP_K,
+    build_matrix,
+    similarities,
+    top_neighbors
+)
+from recipes.versions import RECIPES_VERSION, bump_version
+
+
+class Command(BaseCommand):
+    help = (
+        'Рассчитывает похожие рецепты (косинусная близость TF-IDF векторов '
+        'ингредиентов и тегов) и сохраняет top-k соседей каждого рецепта. '
+        'По умолчанию пересчитываются только рецепты, измененные после '
+        'прошлого запуска, и те, чьи списки соседей они затрагивают.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--full',
+            action='store_true',
+            help=(
+                'Пересчитать соседей всех рецептов, в том числе с учетом '
+                'изменившихся весов IDF'
+            )
+        )
+        parser.add_argument('--top-k', type=int, default=TOP_K)
+        parser.add_argument('--tag-weight', type=float, default=TAG_WEIGHT)
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=256,
+            help='Число строк матрицы близости, считаемых за раз'
+        )
+
+    def batches(self, positions, size):
+        for start in range(0, len(positions), size):
+            yield positions[start:start + size]
+
+    def locate(self, recipe_ids, ids):
+        """Позиции ids в отсортированном recipe_ids и маска найденных."""
+        ids = np.asarray(ids, dtype=np.int64)
+        positions = np.searchsorted(recipe_ids, ids)
+        found = positions < len(recipe_ids)
+        found[found] = recipe_ids[positions[found]] == ids[found]
+        return positions, found
+
+    def positions(self, recipe_ids, ids):
+        """Позиции существующих рецептов ids, по возрастанию."""
+        positions, found = self.locate(recipe_ids, list(ids))
+        return np.unique(positions[found])
+
+    def affected(self, matrix, keys, recipe_ids, changed, options):
+        """
+        Кроме измененных рецептов пересчитываются те, у кого измененный
+        рецепт уже в соседях или теперь попадает в top-k, и те, из чьих
+        списков каскадно удалены соседи (пропуски в rank): близость
+        симметрична, поэтому достаточно строк измененных рецептов.
+        """
+        lists = np.array(
+            list(SimilarRecipe.objects.values('recipe_id').annotate(
+                lowest=Min('score'), total=Count('id'), last=Max('rank')
+            ).order_by().values_list('recipe_id', 'lowest', 'total', 'last')),
+            dtype=np.float64
+        ).reshape(-1, 4)
+        positions, found = self.locate(recipe_ids, lists[:, 0])
+        lists, positions = lists[found], positions[found]
+        # Рецепт затронут, если близость к измененному не ниже порога:
+        # худшего соседя в полном списке, иначе любая
+        threshold = np.full(len(recipe_ids), -np.inf)
+        full = lists[:, 2] >= options['top_k']
+        threshold[positions[full]] = lists[full, 1]
+        affected = [
+            changed,
+            positions[lists[:, 3] != lists[:, 2]],
+            self.positions(recipe_ids, SimilarRecipe.objects.filter(
+                similar_id__in=recipe_ids[changed].tolist()
+            ).values_list('recipe_id', flat=True)),
+        ]
+        for batch in self.batches(changed, options['batch_size']):
+            scores = similarities(matrix, keys, batch).tocoo()
+            affected.append(
+                scores.col[scores.data >= threshold[scores.col]]
+            )
+        return np.unique(np.concatenate(affected)).astype(np.int64)
+
+    def handle(self, *args, **options):
+        started, now = time.perf_counter(), timezone.now()
+        recipe_ids, matrix, keys = build_matrix(options['tag_weight'])
+        if options['full']:
+            positions = np.arange(len(recipe_ids))
+        else:
+            stale = Recipe.objects.filter(
+                Q(similar_updated__isnull=True)
+                | Q(updated__gt=F('similar_updated'))
+            ).values_list('pk', flat=True)
+            changed = self.positions(recipe_ids, stale)
+            positions = self.affected(
+                matrix, keys, recipe_ids, changed, options
+            )
+        for batch in self.batches(positions, options['batch_size']):
+            neighbors = [
+                SimilarRecipe(
+                    recipe_id=int(recipe_ids[position]),
+                    similar_id=int(recipe_ids[column]),
+                    rank=rank,
+                    score=score
+                )
+                for position, columns, scores in top_neighbors(
+                    matrix, keys, batch, options['top_k']
+                )
+                for rank, (column, score) in enumerate(
+                    zip(columns.tolist(), scores.tolist()), start=1
+                )
+            ]
+            batch_ids = recipe_ids[batch].tolist()
+            with transaction.atomic():
+                SimilarRecipe.objects.filter(recipe_id__in=batch_ids).delete()
+                SimilarRecipe.objects.bulk_create(neighbors)
+                Recipe.objects.filter(pk__in=batch_ids).update(
+                    similar_updated=now
+                )
+        bump_version(RECIPES_VERSION)
+        self.stdout.write(self.style.SUCCESS(
+            f'Пересчитаны соседи {len(positions)} из {len(recipe_ids)} '
+            f'рецептов за {time.perf_counter() - started:.1f} с'
+        ))
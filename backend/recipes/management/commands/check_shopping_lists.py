@@ -0,0 +1,63 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from recipes.models import ShoppingListItem
+from recipes.shopping_list import source_amounts
+
+BATCH_SIZE = 1000
+
+
+class Command(BaseCommand):
+    help = (
+        'Сверяет материализованные списки покупок с корзинами и составом '
+        'рецептов, сообщает о расхождениях и перестраивает таблицу'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Только показать расхождения'
+        )
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            expected = source_amounts()
+            actual = {
+                (user_id, ingredient_id): amount
+                for user_id, ingredient_id, amount in
+                ShoppingListItem.objects.select_for_update().values_list(
+                    'user_id', 'ingredient_id', 'amount'
+                )
+            }
+            missing = expected.keys() - actual.keys()
+            extra = actual.keys() - expected.keys()
+            wrong = [
+                key for key in expected.keys() & actual.keys()
+                if expected[key] != actual[key]
+            ]
+            self.stdout.write(
+                f'Позиций: {len(expected)}, отсутствует {len(missing)}, '
+                f'лишних {len(extra)}, с неверным количеством {len(wrong)}'
+            )
+            for user_id, ingredient_id in sorted(wrong)[:20]:
+                self.stdout.write(
+                    f'  пользователь {user_id}, ингредиент {ingredient_id}: '
+                    f'{actual[user_id, ingredient_id]} вместо '
+                    f'{expected[user_id, ingredient_id]}'
+                )
+            if options['dry_run'] or not (missing or extra or wrong):
+                return
+            ShoppingListItem.objects.all().delete()
+            ShoppingListItem.objects.bulk_create(
+                [
+                    ShoppingListItem(
+                        user_id=user_id,
+                        ingredient_id=ingredient_id,
+                        amount=amount
+                    )
+                    for (user_id, ingredient_id), amount in expected.items()
+                ],
+                batch_size=BATCH_SIZE
+            )
+        self.stdout.write(self.style.SUCCESS('Списки покупок перестроены.'))
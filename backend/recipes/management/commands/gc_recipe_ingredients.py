@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+from recipes.models import RecipeIngredient
+
+
+class Command(BaseCommand):
+    help = 'Удаляет строки RecipeIngredient, не связанные ни с одним рецептом'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Только посчитать строки без удаления'
+        )
+
+    def handle(self, *args, **options):
+        orphans = RecipeIngredient.objects.filter(
+            recipe_ingredients__isnull=True
+        )
+        if options['dry_run']:
+            self.stdout.write(f'Найдено осиротевших строк: {orphans.count()}')
+            return
+        deleted, _ = orphans.delete()
+        self.stdout.write(self.style.SUCCESS(f'Удалено строк: {deleted}'))
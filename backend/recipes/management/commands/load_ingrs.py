@@ -1,26 +1,135 @@
 import csv
+import io
+import json
+import os
+import time
 
 from django.conf import settings
-from django.core.management.base import BaseCommand
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
 from recipes.models import Ingredient
+from recipes.versions import INGREDIENTS_VERSION, bump_version
+
+DEFAULT_PATH = os.path.join(settings.BASE_DIR, 'data', 'ingredients.csv')
+STAGING_TABLE = 'ingredients_staging'
 
 
 class Command(BaseCommand):
-    help = 'Загрузка ингредиентов в БД из .csv'
-
-    def handle(self, **kwargs):
-        data_path = settings.BASE_DIR
-        with open(
-            f'{data_path}/data/ingredients.csv',
-            'r',
-            encoding='UTF-8'
-        ) as file:
-            reader = csv.reader(file, delimiter=',')
-            for row in reader:
-                Ingredient.objects.get_or_create(
-                    name=row[0],
-                    measurement_unit=row[1]
-                )
+    help = 'Загрузка ингредиентов в БД из .csv или .json'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--path',
+            default=DEFAULT_PATH,
+            help='Путь к файлу .csv (name,measurement_unit) или .json'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Размер пачки для bulk_create'
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Только посчитать новые ингредиенты, ничего не записывая'
+        )
+
+    def read_rows(self, path):
+        """Построчно читает файл, отдает пары (name, measurement_unit)."""
+        if path.endswith('.json'):
+            with open(path, 'r', encoding='UTF-8') as file:
+                for item in json.load(file):
+                    yield (
+                        item['name'].strip(),
+                        item['measurement_unit'].strip()
+                    )
+            return
+        with open(path, 'r', encoding='UTF-8') as file:
+            for row in csv.reader(file, delimiter=','):
+                if len(row) >= 2:
+                    yield row[0].strip(), row[1].strip()
+
+    def new_rows(self, path):
+        """Отбрасывает дубли внутри файла и уже существующие в БД пары."""
+        seen = set(Ingredient.objects.values_list('name', 'measurement_unit'))
+        for row in self.read_rows(path):
+            if row not in seen:
+                seen.add(row)
+                yield row
+
+    def report(self, done, started):
+        elapsed = time.perf_counter() - started
+        self.stdout.write(
+            f'Обработано {done} строк, {done / max(elapsed, 1e-6):.0f} стр/с'
+        )
+
+    def bulk_insert(self, rows, batch_size):
+        started = time.perf_counter()
+        done = 0
+        batch = []
+        for name, measurement_unit in rows:
+            batch.append(
+                Ingredient(name=name, measurement_unit=measurement_unit)
+            )
+            if len(batch) >= batch_size:
+                Ingredient.objects.bulk_create(batch)
+                done += len(batch)
+                batch = []
+                self.report(done, started)
+        if batch:
+            Ingredient.objects.bulk_create(batch)
+            done += len(batch)
+            self.report(done, started)
+        return done
+
+    def copy_insert(self, rows):
+        """PostgreSQL: COPY во временную таблицу и один INSERT ... SELECT."""
+        started = time.perf_counter()
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        total = 0
+        for row in rows:
+            writer.writerow(row)
+            total += 1
+        buffer.seek(0)
+        table = Ingredient._meta.db_table
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'CREATE TEMP TABLE {STAGING_TABLE} '
+                '(name varchar(200), measurement_unit varchar(200)) '
+                'ON COMMIT DROP'
+            )
+            cursor.cursor.copy_expert(
+                f'COPY {STAGING_TABLE} (name, measurement_unit) '
+                'FROM STDIN WITH CSV',
+                buffer
+            )
+            cursor.execute(
+                f'INSERT INTO {table} (name, measurement_unit) '
+                f'SELECT DISTINCT s.name, s.measurement_unit '
+                f'FROM {STAGING_TABLE} s WHERE NOT EXISTS ('
+                f'SELECT 1 FROM {table} i WHERE i.name = s.name '
+                'AND i.measurement_unit = s.measurement_unit)'
+            )
+            self.report(total, started)
+            return cursor.rowcount
+
+    def handle(self, **options):
+        path = options['path']
+        if not os.path.exists(path):
+            raise CommandError(f'Файл {path} не найден')
+        rows = self.new_rows(path)
+        if options['dry_run']:
+            total = sum(1 for _ in rows)
+            self.stdout.write(f'Будет добавлено ингредиентов: {total}')
+            return
+        with transaction.atomic():
+            if connection.vendor == 'postgresql':
+                total = self.copy_insert(rows)
+            else:
+                total = self.bulk_insert(rows, options['batch_size'])
+            transaction.on_commit(lambda: bump_version(INGREDIENTS_VERSION))
         self.stdout.write(self.style.SUCCESS(
-                          'Ингредиенты успешно загружены в БД.'
+                          f'Ингредиенты успешно загружены в БД: {total}.'
                           ))
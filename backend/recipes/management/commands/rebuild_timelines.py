@@ -0,0 +1,22 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from recipes.models import TimelineEntry
+from recipes.timeline import rebuild
+
+
+class Command(BaseCommand):
+    help = (
+        'Заново строит ленты подписок: последние рецепты авторов '
+        'ниже порога TIMELINE_FANOUT_LIMIT копируются в ленты подписчиков'
+    )
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        with transaction.atomic():
+            rebuild()
+        self.stdout.write(self.style.SUCCESS(
+            f'Записей в лентах: {TimelineEntry.objects.count()} '
+            f'за {time.perf_counter() - started:.1f} с'
+        ))
@@ -0,0 +1,53 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count, F, OuterRef, Q, Subquery
+from django.db.models.functions import Coalesce
+from recipes.models import FavoriteRecipe, Recipe, ShoppingCart
+from users.models import Subscribe
+
+User = get_user_model()
+
+
+def count_subquery(model, field):
+    return Coalesce(Subquery(
+        model.objects.filter(
+            **{field: OuterRef('pk')}
+        ).order_by().values(field).annotate(total=Count('id')).values('total')
+    ), 0)
+
+
+class Command(BaseCommand):
+    help = (
+        'Пересчитывает денормализованные счетчики favorites_count, '
+        'in_carts_count, recipes_count и followers_count '
+        'и сообщает о расхождениях'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Только показать расхождения'
+        )
+
+    def handle(self, *args, **options):
+        counters = (
+            (Recipe, 'favorites_count', FavoriteRecipe, 'recipe'),
+            (Recipe, 'in_carts_count', ShoppingCart, 'recipe'),
+            (User, 'recipes_count', Recipe, 'author'),
+            (User, 'followers_count', Subscribe, 'author'),
+        )
+        with transaction.atomic():
+            for model, field, source, source_field in counters:
+                actual = count_subquery(source, source_field)
+                drift = model.objects.annotate(actual=actual).filter(
+                    ~Q(**{field: F('actual')})
+                ).count()
+                self.stdout.write(
+                    f'{model.__name__}.{field}: расхождений {drift}'
+                )
+                if drift and not options['dry_run']:
+                    model.objects.update(**{field: actual})
+        if not options['dry_run']:
+            self.stdout.write(self.style.SUCCESS('Счетчики пересчитаны.'))
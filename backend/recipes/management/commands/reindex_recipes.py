@@ -0,0 +1,42 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from recipes.models import Recipe
+from recipes.search import (
+    BATCH_SIZE,
+    clear_index,
+    create_search_schema,
+    index_recipes
+)
+
+
+class Command(BaseCommand):
+    help = (
+        'Создает таблицу полнотекстового поиска и пересобирает '
+        'поисковые документы всех рецептов'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=BATCH_SIZE * 10,
+            help='Число рецептов на транзакцию'
+        )
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        create_search_schema()
+        ids = list(Recipe.objects.order_by('pk').values_list('pk', flat=True))
+        batch_size = options['batch_size']
+        with transaction.atomic():
+            clear_index()
+            index_recipes(ids[:batch_size])
+        for start in range(batch_size, len(ids), batch_size):
+            with transaction.atomic():
+                index_recipes(ids[start:start + batch_size])
+        self.stdout.write(self.style.SUCCESS(
+            f'Проиндексировано рецептов: {len(ids)} '
+            f'за {time.perf_counter() - started:.1f} с'
+        ))
@@ -0,0 +1,200 @@
+import random
+import time
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from recipes.models import (
+    FavoriteRecipe,
+    Ingredient,
+    Recipe,
+    RecipeIngredient,
+    ShoppingCart,
+    Tag
+)
+from recipes.versions import (
+    INGREDIENTS_VERSION,
+    RECIPES_VERSION,
+    TAGS_VERSION,
+    bump_version
+)
+from users.models import Subscribe
+
+User = get_user_model()
+
+BENCH_PREFIX = 'bench'
+BENCH_PASSWORD = 'bench-password'
+AMOUNTS = (1, 2, 3, 5, 10, 50, 100, 150, 200, 250, 300, 500)
+WORDS = (
+    'Суп', 'Салат', 'Пирог', 'Рагу', 'Каша', 'Запеканка', 'Омлет',
+    'Паста', 'Плов', 'Блины', 'Котлеты', 'Жаркое', 'Соус', 'Десерт',
+)
+ADJECTIVES = (
+    'домашний', 'быстрый', 'острый', 'летний', 'сытный', 'легкий',
+    'праздничный', 'постный', 'бабушкин', 'итальянский',
+)
+
+
+class Command(BaseCommand):
+    help = (
+        'Генерирует синтетический набор данных для нагрузочных тестов: '
+        'пользователей, рецепты, избранное, списки покупок и подписки'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=100_000)
+        parser.add_argument('--recipes', type=int, default=1_000_000)
+        parser.add_argument('--min-ingredients', type=int, default=3)
+        parser.add_argument('--max-ingredients', type=int, default=12)
+        parser.add_argument('--max-tags', type=int, default=2)
+        parser.add_argument('--favorites-per-user', type=int, default=10)
+        parser.add_argument('--cart-per-user', type=int, default=3)
+        parser.add_argument('--subscriptions-per-user', type=int, default=5)
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument('--seed', type=int, default=42)
+
+    def log(self, message):
+        elapsed = time.perf_counter() - self.started
+        self.stdout.write(f'[{elapsed:8.1f} с] {message}')
+
+    def new_ids(self, model, last_id):
+        return list(
+            model.objects.filter(id__gt=last_id).order_by('id').values_list(
+                'id', flat=True
+            )
+        )
+
+    def last_id(self, model):
+        return model.objects.order_by('-id').values_list(
+            'id', flat=True
+        ).first() or 0
+
+    def bulk(self, model, objects, **kwargs):
+        """Вставляет объекты пачками по batch_size."""
+        batch = []
+        for obj in objects:
+            batch.append(obj)
+            if len(batch) >= self.batch_size:
+                model.objects.bulk_create(batch, **kwargs)
+                batch = []
+        if batch:
+            model.objects.bulk_create(batch, **kwargs)
+
+    def ensure_reference_data(self):
+        if not Tag.objects.exists():
+            call_command('load_tags')
+        if not Ingredient.objects.exists():
+            call_command('load_ingrs')
+        last_id = self.last_id(RecipeIngredient)
+        ingredient_ids = list(Ingredient.objects.values_list('id', flat=True))
+        self.bulk(RecipeIngredient, (
+            RecipeIngredient(ingredients_id=ingredient_id, amount=amount)
+            for ingredient_id in ingredient_ids for amount in AMOUNTS
+        ))
+        return (
+            list(Tag.objects.values_list('id', flat=True)),
+            self.new_ids(RecipeIngredient, last_id)
+        )
+
+    def create_users(self, total):
+        last_id = self.last_id(User)
+        password = make_password(BENCH_PASSWORD)
+        self.bulk(User, (
+            User(
+                username=f'{BENCH_PREFIX}_{last_id + number}',
+                email=f'{BENCH_PREFIX}_{last_id + number}@example.com',
+                first_name=self.random.choice(WORDS),
+                last_name=self.random.choice(ADJECTIVES),
+                password=password
+            ) for number in range(total)
+        ))
+        return self.new_ids(User, last_id)
+
+    def create_recipes(self, total, user_ids, tag_ids, pair_ids, options):
+        through_tags = Recipe.tags.through
+        through_ingredients = Recipe.ingredients.through
+        recipe_ids = []
+        for start in range(0, total, self.batch_size):
+            size = min(self.batch_size, total - start)
+            last_id = self.last_id(Recipe)
+            Recipe.objects.bulk_create([
+                Recipe(
+                    author_id=self.random.choice(user_ids),
+                    name=(f'{self.random.choice(WORDS)} '
+                          f'{self.random.choice(ADJECTIVES)}'),
+                    text='Сгенерированный рецепт для нагрузочного теста.',
+                    cooking_time=self.random.randint(5, 180)
+                ) for _ in range(size)
+            ])
+            ids = self.new_ids(Recipe, last_id)
+            self.bulk(through_tags, (
+                through_tags(recipe_id=recipe_id, tag_id=tag_id)
+                for recipe_id in ids
+                for tag_id in self.random.sample(
+                    tag_ids,
+                    self.random.randint(1, min(options['max_tags'],
+                                               len(tag_ids)))
+                )
+            ))
+            self.bulk(through_ingredients, (
+                through_ingredients(
+                    recipe_id=recipe_id, recipeingredient_id=pair_id
+                )
+                for recipe_id in ids
+                for pair_id in self.random.sample(
+                    pair_ids,
+                    self.random.randint(options['min_ingredients'],
+                                        options['max_ingredients'])
+                )
+            ))
+            recipe_ids.extend(ids)
+            self.log(f'Рецептов: {len(recipe_ids)}')
+        return recipe_ids
+
+    def create_links(self, model, user_ids, target_ids, per_user, field):
+        self.bulk(model, (
+            model(user_id=user_id, **{field: target_id})
+            for user_id in user_ids
+            for target_id in self.random.sample(
+                target_ids, min(per_user, len(target_ids))
+            )
+            if not (field == 'author_id' and target_id == user_id)
+        ), ignore_conflicts=True)
+
+    def handle(self, *args, **options):
+        self.random = random.Random(options['seed'])
+        self.batch_size = options['batch_size']
+        self.started = time.perf_counter()
+        with transaction.atomic():
+            tag_ids, pair_ids = self.ensure_reference_data()
+            self.log(f'Пар ингредиент-количество: {len(pair_ids)}')
+            user_ids = self.create_users(options['users'])
+            self.log(f'Пользователей: {len(user_ids)}')
+            recipe_ids = self.create_recipes(
+                options['recipes'], user_ids, tag_ids, pair_ids, options
+            )
+            self.create_links(
+                FavoriteRecipe, user_ids, recipe_ids,
+                options['favorites_per_user'], 'recipe_id'
+            )
+            self.log('Избранное создано')
+            self.create_links(
+                ShoppingCart, user_ids, recipe_ids,
+                options['cart_per_user'], 'recipe_id'
+            )
+            self.log('Списки покупок созданы')
+            self.create_links(
+                Subscribe, user_ids, user_ids,
+                options['subscriptions_per_user'], 'author_id'
+            )
+            self.log('Подписки созданы')
+            call_command('recount', stdout=self.stdout)
+            call_command('check_shopping_lists', stdout=self.stdout)
+            call_command('reindex_recipes', stdout=self.stdout)
+            call_command('build_similar_recipes', '--full', stdout=self.stdout)
+            call_command('rebuild_timelines', stdout=self.stdout)
+            for key in (INGREDIENTS_VERSION, RECIPES_VERSION, TAGS_VERSION):
+                transaction.on_commit(lambda key=key: bump_version(key))
+        self.log(self.style.SUCCESS('Набор данных готов.'))
@@ -1,7 +1,10 @@
 from django.contrib.auth import get_user_model
-from django.db import models
+from django.db import models, router, transaction
 from django.core import validators
 
+from foodgram.counters import CounterFieldsMixin
+from .storage import recipe_image_storage
+
 User = get_user_model()
 
 
@@ -74,10 +77,11 @@ class RecipeIngredient(models.Model):
         return f'{self.ingredients}'
 
 
-class Recipe(models.Model):
+class Recipe(CounterFieldsMixin, models.Model):
     """
     Модель рецепта.
     """
+    counter_fields = ('favorites_count', 'in_carts_count')
     author = models.ForeignKey(
         User,
         on_delete=models.CASCADE,
@@ -89,8 +93,13 @@ class Recipe(models.Model):
     image = models.ImageField(
         'Изображение рецепта',
         upload_to='static/recipe/',
+        storage=recipe_image_storage,
         blank=True,
         null=True)
+    image_variants = models.JSONField(
+        'Уменьшенные копии изображения',
+        default=dict,
+        blank=True)
     text = models.TextField(
         'Описание рецепта')
     cooking_time = models.BigIntegerField(
@@ -110,12 +119,35 @@ class Recipe(models.Model):
     pub_date = models.DateTimeField(
         'Дата публикации',
         auto_now_add=True)
+    updated = models.DateTimeField(
+        'Дата изменения',
+        auto_now=True)
+    similar_updated = models.DateTimeField(
+        'Дата расчета похожих рецептов',
+        null=True,
+        blank=True,
+        editable=False)
+    favorites_count = models.IntegerField(
+        'Добавлений в избранное',
+        default=0,
+        editable=False)
+    in_carts_count = models.IntegerField(
+        'Добавлений в список покупок',
+        default=0,
+        editable=False)
 
     class Meta:
         verbose_name = 'Рецепт'
         verbose_name_plural = 'Рецепты'
         ordering = ('-pub_date', )
         verbose_name = 'recipe'
+        indexes = [
+            models.Index(fields=['-pub_date', '-id'], name='recipe_feed_idx'),
+            models.Index(
+                fields=['author', '-pub_date', '-id'],
+                name='recipe_author_feed_idx'
+            ),
+        ]
 
     def __str__(self):
         return f'{self.name}'
@@ -173,3 +205,115 @@ class ShoppingCart(models.Model):
 
     def __str__(self):
         return f'{self.recipe.name}'
+
+    def save(self, *args, **kwargs):
+        """Запись в корзину и обновление списка покупок (post_save)
+        выполняются в одной транзакции при любом способе сохранения."""
+        using = kwargs.get('using') or router.db_for_write(
+            type(self), instance=self
+        )
+        with transaction.atomic(using=using):
+            super().save(*args, **kwargs)
+
+
+class ShoppingListItem(models.Model):
+    """
+    Материализованный список покупок: суммарное количество ингредиента
+    по всем рецептам в корзине пользователя. Поддерживается сигналами
+    в той же транзакции, что и изменения корзины и состава рецептов.
+    """
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='shopping_list',
+        verbose_name='Пользователь'
+    )
+    ingredient = models.ForeignKey(
+        Ingredient,
+        on_delete=models.CASCADE,
+        related_name='+',
+        verbose_name='Ингредиент'
+    )
+    amount = models.IntegerField('Количество', default=0)
+
+    class Meta:
+        verbose_name = 'Позиция списка покупок'
+        verbose_name_plural = 'Позиции списка покупок'
+        unique_together = [['user', 'ingredient']]
+
+    def __str__(self):
+        return f'{self.ingredient} - {self.amount}'
+
+
+class SimilarRecipe(models.Model):
+    """
+    Предрассчитанные похожие рецепты: top-k соседей рецепта по косинусной
+    близости TF-IDF векторов ингредиентов и тегов.
+    Заполняется командой build_similar_recipes.
+    """
+    recipe = models.ForeignKey(
+        Recipe,
+        on_delete=models.CASCADE,
+        related_name='similar_recipes',
+        verbose_name='Рецепт'
+    )
+    similar = models.ForeignKey(
+        Recipe,
+        on_delete=models.CASCADE,
+        related_name='similar_to',
+        verbose_name='Похожий рецепт'
+    )
+    rank = models.PositiveSmallIntegerField('Место')
+    score = models.FloatField('Близость')
+
+    class Meta:
+        verbose_name = 'Похожий рецепт'
+        verbose_name_plural = 'Похожие рецепты'
+        ordering = ['recipe', 'rank']
+        unique_together = [['recipe', 'rank']]
+
+    def __str__(self):
+        return f'{self.recipe} - {self.similar}'
+
+
+class TimelineEntry(models.Model):
+    """
+    Лента подписок (fan-out on write): новый рецепт записывается в ленты
+    подписчиков автора фоновой задачей. Рецепты авторов с очень большим
+    числом подписчиков в ленты не пишутся и подмешиваются при чтении.
+    pub_date копируется из рецепта для keyset-пагинации по индексу.
+    """
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='timeline',
+        verbose_name='Подписчик'
+    )
+    recipe = models.ForeignKey(
+        Recipe,
+        on_delete=models.CASCADE,
+        related_name='+',
+        verbose_name='Рецепт'
+    )
+    author = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='+',
+        verbose_name='Автор'
+    )
+    pub_date = models.DateTimeField('Дата публикации')
+
+    class Meta:
+        verbose_name = 'Запись ленты'
+        verbose_name_plural = 'Записи ленты'
+        unique_together = [['user', 'recipe']]
+        indexes = [
+            models.Index(
+                fields=['user', '-pub_date', '-recipe'],
+                name='timeline_page_idx'
+            ),
+            models.Index(fields=['user', 'author'], name='timeline_trim_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.user} - {self.recipe}'
@@ -0,0 +1,221 @@
+"""
+Полнотекстовый поиск рецептов по названию, ингредиентам и описанию.
+Поисковый документ хранится в отдельной таблице и обновляется сигналами
+при изменении рецепта, его состава или названия ингредиента:
+- PostgreSQL: столбец tsvector с весами A/B/C и GIN-индексом,
+  опечатки находит триграммный индекс pg_trgm (оператор <%);
+- SQLite: виртуальная таблица FTS5, ранжирование bm25 и поиск по префиксам.
+Таблица создается после migrate (сигнал post_migrate) и командой
+reindex_recipes, поскольку ее структура зависит от СУБД.
+"""
+import re
+
+from django.conf import settings
+from django.db import connection, connections
+from django.db.models import FloatField, Q, Value
+from django.db.models.expressions import RawSQL
+
+from .models import Ingredient, Recipe, RecipeIngredient
+
+SEARCH_TABLE = 'recipes_recipe_search'
+BATCH_SIZE = 500
+NO_RANK = Value(0.0, output_field=FloatField())
+RECIPE_TABLE = Recipe._meta.db_table
+THROUGH_TABLE = Recipe.ingredients.through._meta.db_table
+INGREDIENT_NAMES = (
+    'SELECT {aggregate} FROM ' + THROUGH_TABLE + ' t '
+    'JOIN ' + RecipeIngredient._meta.db_table + ' p '
+    'ON p.id = t.recipeingredient_id '
+    'JOIN ' + Ingredient._meta.db_table + ' i ON i.id = p.ingredients_id '
+    'WHERE t.recipe_id = r.id'
+)
+
+
+def fold(expression):
+    """Буква ё приравнивается к е: ни FTS5, ни словари PostgreSQL
+    не считают их одной буквой."""
+    return f"replace(replace({expression}, 'Ё', 'Е'), 'ё', 'е')"
+
+
+def fold_query(query):
+    return query.replace('Ё', 'Е').replace('ё', 'е')
+
+
+def documents(aggregate, ids):
+    """Подзапрос: id, название, описание и названия ингредиентов рецептов."""
+    names = INGREDIENT_NAMES.format(aggregate=aggregate)
+    return (
+        f'(SELECT r.id, {fold("r.name")} AS name, {fold("r.text")} AS text, '
+        f'{fold(f"({names})")} AS names '
+        f'FROM {RECIPE_TABLE} r '
+        f'WHERE r.id IN ({", ".join(["%s"] * len(ids))})) d'
+    )
+
+
+class PostgresSearch:
+    schema = (
+        'CREATE EXTENSION IF NOT EXISTS pg_trgm',
+        f'CREATE TABLE IF NOT EXISTS {SEARCH_TABLE} ('
+        'recipe_id bigint PRIMARY KEY, '
+        'content text NOT NULL, '
+        'document tsvector NOT NULL)',
+        f'CREATE INDEX IF NOT EXISTS {SEARCH_TABLE}_document_idx '
+        f'ON {SEARCH_TABLE} USING gin (document)',
+        f'CREATE INDEX IF NOT EXISTS {SEARCH_TABLE}_content_trgm_idx '
+        f'ON {SEARCH_TABLE} USING gin (content gin_trgm_ops)',
+    )
+    tsquery = 'websearch_to_tsquery(%s::regconfig, %s)'
+
+    def index(self, cursor, ids):
+        cursor.execute(
+            f'INSERT INTO {SEARCH_TABLE} (recipe_id, content, document) '
+            "SELECT d.id, concat_ws(' ', d.name, d.names), "
+            "setweight(to_tsvector(%s::regconfig, d.name), 'A') || "
+            "setweight(to_tsvector(%s::regconfig, "
+            "coalesce(d.names, '')), 'B') || "
+            "setweight(to_tsvector(%s::regconfig, d.text), 'C') "
+            f"FROM {documents('string_agg(i.name, %s)', ids)} "
+            'ON CONFLICT (recipe_id) DO UPDATE SET '
+            'content = EXCLUDED.content, document = EXCLUDED.document',
+            [settings.SEARCH_CONFIG] * 3 + [' '] + list(ids)
+        )
+
+    def remove(self, cursor, ids):
+        cursor.execute(
+            f'DELETE FROM {SEARCH_TABLE} '
+            f'WHERE recipe_id IN ({", ".join(["%s"] * len(ids))})',
+            list(ids)
+        )
+
+    def search(self, queryset, query):
+        query = fold_query(query)
+        params = [settings.SEARCH_CONFIG, query, query]
+        return queryset.filter(pk__in=RawSQL(
+            f'SELECT recipe_id FROM {SEARCH_TABLE} '
+            f'WHERE document @@ {self.tsquery} OR %s <%% content',
+            params
+        )).annotate(search_rank=RawSQL(
+            f'SELECT ts_rank(document, {self.tsquery}) '
+            '+ word_similarity(%s, content) '
+            f'FROM {SEARCH_TABLE} WHERE recipe_id = {RECIPE_TABLE}.id',
+            params,
+            output_field=FloatField()
+        ))
+
+
+class SqliteSearch:
+    schema = (
+        f'CREATE VIRTUAL TABLE IF NOT EXISTS {SEARCH_TABLE} '
+        'USING fts5(name, ingredients, text, '
+        "tokenize = 'unicode61 remove_diacritics 2')",
+    )
+    # Веса столбцов name, ingredients, text для bm25
+    weights = '10.0, 5.0, 1.0'
+
+    def index(self, cursor, ids):
+        self.remove(cursor, ids)
+        cursor.execute(
+            f'INSERT INTO {SEARCH_TABLE} (rowid, name, ingredients, text) '
+            "SELECT d.id, d.name, coalesce(d.names, ''), d.text "
+            f"FROM {documents('group_concat(i.name, %s)', ids)}",
+            [' '] + list(ids)
+        )
+
+    def remove(self, cursor, ids):
+        cursor.execute(
+            f'DELETE FROM {SEARCH_TABLE} '
+            f'WHERE rowid IN ({", ".join(["%s"] * len(ids))})',
+            list(ids)
+        )
+
+    def search(self, queryset, query):
+        """Слова запроса ищутся по префиксу, все должны присутствовать."""
+        words = re.findall(r'\w+', fold_query(query))
+        if not words:
+            return queryset.none().annotate(search_rank=NO_RANK)
+        match = ' '.join(f'"{word}"*' for word in words)
+        return queryset.filter(pk__in=RawSQL(
+            f'SELECT rowid FROM {SEARCH_TABLE} WHERE {SEARCH_TABLE} MATCH %s',
+            [match]
+        )).annotate(search_rank=RawSQL(
+            f'SELECT -bm25({SEARCH_TABLE}, {self.weights}) '
+            f'FROM {SEARCH_TABLE} WHERE {SEARCH_TABLE} MATCH %s '
+            f'AND rowid = {RECIPE_TABLE}.id',
+            [match],
+            output_field=FloatField()
+        ))
+
+
+class FallbackSearch:
+    """Прочие СУБД: поиск подстроки без индекса и ранжирования."""
+    schema = ()
+
+    def index(self, cursor, ids):
+        pass
+
+    def remove(self, cursor, ids):
+        pass
+
+    def search(self, queryset, query):
+        return queryset.filter(
+            Q(name__icontains=query) | Q(text__icontains=query)
+        ).annotate(search_rank=NO_RANK)
+
+
+BACKENDS = {
+    'postgresql': PostgresSearch(),
+    'sqlite': SqliteSearch(),
+}
+
+
+def get_backend(vendor=None):
+    return BACKENDS.get(vendor or connection.vendor, FallbackSearch())
+
+
+def create_search_schema(using='default', **kwargs):
+    """Обработчик post_migrate: создает таблицу и индексы поиска."""
+    db = connections[using]
+    with db.cursor() as cursor:
+        for statement in get_backend(db.vendor).schema:
+            cursor.execute(statement)
+
+
+def batches(ids):
+    ids = list(ids)
+    for start in range(0, len(ids), BATCH_SIZE):
+        yield ids[start:start + BATCH_SIZE]
+
+
+def index_recipes(ids):
+    """Пересобирает поисковые документы рецептов в текущей транзакции."""
+    backend = get_backend()
+    with connection.cursor() as cursor:
+        for batch in batches(ids):
+            backend.index(cursor, batch)
+
+
+def index_ingredient_recipes(ingredient_id):
+    """Пересобирает документы всех рецептов с ингредиентом."""
+    index_recipes(Recipe.objects.filter(
+        ingredients__ingredients_id=ingredient_id
+    ).values_list('pk', flat=True).distinct())
+
+
+def remove_recipes(ids):
+    backend = get_backend()
+    with connection.cursor() as cursor:
+        for batch in batches(ids):
+            backend.remove(cursor, batch)
+
+
+def clear_index():
+    if get_backend().schema:
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {SEARCH_TABLE}')
+
+
+def search_recipes(queryset, query):
+    """Рецепты, подходящие под запрос, по убыванию релевантности."""
+    return get_backend().search(queryset, query).order_by(
+        '-search_rank', *Recipe._meta.ordering
+    )
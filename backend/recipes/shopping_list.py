@@ -0,0 +1,89 @@
+"""
+Инкрементальное обновление материализованного списка покупок.
+Изменение описывается словарем {ingredient_id: delta} и применяется
+к набору пользователей тремя запросами независимо от их числа.
+"""
+from collections import defaultdict
+
+from django.db import transaction
+from django.db.models import Case, F, IntegerField, Sum, Value, When
+
+from .models import RecipeIngredient, ShoppingCart, ShoppingListItem
+
+
+def ingredient_amounts(queryset, sign=1):
+    """Суммирует количество по ингредиентам для набора RecipeIngredient."""
+    delta = defaultdict(int)
+    for ingredient_id, amount in queryset.values_list(
+        'ingredients_id', 'amount'
+    ):
+        delta[ingredient_id] += sign * amount
+    return delta
+
+
+def recipes_amounts(recipe_ids, sign=1):
+    """Ингредиенты рецептов; общие пары учитываются для каждого рецепта."""
+    return ingredient_amounts(
+        RecipeIngredient.objects.filter(recipe_ingredients__in=recipe_ids),
+        sign
+    )
+
+
+def apply_delta(user_ids, delta):
+    delta = {key: value for key, value in delta.items() if value}
+    if not user_ids or not delta:
+        return
+    with transaction.atomic(savepoint=False):
+        ShoppingListItem.objects.bulk_create(
+            [
+                ShoppingListItem(user_id=user_id, ingredient_id=ingredient_id)
+                for user_id in user_ids
+                for ingredient_id in delta
+            ],
+            ignore_conflicts=True
+        )
+        items = ShoppingListItem.objects.filter(
+            user__in=user_ids, ingredient__in=delta
+        )
+        items.update(amount=F('amount') + Case(
+            *(
+                When(ingredient_id=ingredient_id, then=Value(value))
+                for ingredient_id, value in delta.items()
+            ),
+            default=Value(0),
+            output_field=IntegerField()
+        ))
+        items.filter(amount__lte=0).delete()
+
+
+def change_cart(user_id, recipe_ids, sign):
+    """Рецепты добавлены в корзину (sign=1) или удалены из нее (-1)."""
+    if recipe_ids:
+        apply_delta([user_id], recipes_amounts(recipe_ids, sign))
+
+
+def change_recipe(recipe_id, ingredients, sign):
+    """
+    Изменился состав рецепта: ingredients - QuerySet добавленных (sign=1)
+    или отвязываемых (-1) RecipeIngredient. Применяется ко всем, у кого
+    рецепт в корзине; без таких пользователей - один запрос.
+    """
+    user_ids = list(ShoppingCart.objects.filter(
+        recipe_id=recipe_id
+    ).values_list('user_id', flat=True))
+    if user_ids:
+        apply_delta(user_ids, ingredient_amounts(ingredients, sign))
+
+
+def source_amounts():
+    """Эталонный список покупок всех пользователей из исходных таблиц."""
+    return {
+        (user_id, ingredient_id): total
+        for user_id, ingredient_id, total in ShoppingCart.objects.filter(
+            user__isnull=False, recipe__ingredients__isnull=False
+        ).values_list(
+            'user_id', 'recipe__ingredients__ingredients_id'
+        ).annotate(
+            total=Sum('recipe__ingredients__amount')
+        ).order_by()
+    }
@@ -0,0 +1,288 @@
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models import F
+from django.db.models.signals import (
+    m2m_changed,
+    post_delete,
+    post_save,
+    pre_delete
+)
+from django.dispatch import receiver
+
+from users.models import Subscribe
+from .models import (
+    FavoriteRecipe,
+    Ingredient,
+    Recipe,
+    RecipeIngredient,
+    ShoppingCart,
+    Tag
+)
+from .cook_index import record_change
+from .search import index_recipes, remove_recipes
+from .shopping_list import change_cart, change_recipe
+from .tasks import (
+    index_ingredient_recipes_task,
+    schedule_recipe_image,
+    timeline_backfill_followers_task,
+    timeline_backfill_task,
+    timeline_fan_out_task,
+    timeline_trim_author_task,
+    timeline_trim_task
+)
+from .timeline import fanout_limit
+from .versions import (
+    INGREDIENTS_VERSION,
+    RECIPES_VERSION,
+    TAGS_VERSION,
+    bump_version
+)
+
+User = get_user_model()
+
+batched_deletes = ContextVar('batched_deletes', default=None)
+
+
+def bump_on_commit(key):
+    transaction.on_commit(lambda: bump_version(key))
+
+
+@receiver([post_save, post_delete], sender=Ingredient)
+def ingredients_changed(**kwargs):
+    bump_on_commit(INGREDIENTS_VERSION)
+
+
+@receiver([post_save, post_delete], sender=Tag)
+def tags_changed(**kwargs):
+    bump_on_commit(TAGS_VERSION)
+
+
+@receiver([post_save, post_delete], sender=Ingredient)
+@receiver([post_save, post_delete], sender=Recipe)
+@receiver([post_save, post_delete], sender=RecipeIngredient)
+@receiver([post_save, post_delete], sender=Tag)
+@receiver(m2m_changed, sender=Recipe.tags.through)
+@receiver(m2m_changed, sender=Recipe.ingredients.through)
+def recipes_changed(**kwargs):
+    bump_on_commit(RECIPES_VERSION)
+
+
+@receiver(post_save, sender=User)
+def author_changed(update_fields=None, **kwargs):
+    """Данные автора входят в ответ по рецептам, кроме last_login."""
+    if update_fields is None or set(update_fields) != {'last_login'}:
+        bump_on_commit(RECIPES_VERSION)
+
+
+@receiver(post_save, sender=Recipe)
+def recipe_image_changed(instance, **kwargs):
+    """Новое изображение отправляется на обработку в фоне."""
+    if (instance.image
+            and instance.image_variants.get('source') != instance.image.name):
+        schedule_recipe_image(instance.pk)
+
+
+def change_counter(model, field, delta, **filters):
+    """Атомарно меняет денормализованный счетчик в текущей транзакции."""
+    model.objects.filter(**filters).update(**{field: F(field) + delta})
+
+
+COUNTERS = {
+    FavoriteRecipe: (Recipe, 'favorites_count', 'recipe_id'),
+    ShoppingCart: (Recipe, 'in_carts_count', 'recipe_id'),
+    Recipe: (User, 'recipes_count', 'author_id'),
+    Subscribe: (User, 'followers_count', 'author_id'),
+}
+
+
+def change_counters(sender, ids, delta):
+    """
+    Счетчики для пакетных операций: bulk_create не отправляет сигналы,
+    удаления собирает batch_deletes. Одно обновление на весь пакет.
+    """
+    if ids:
+        model, field, _ = COUNTERS[sender]
+        change_counter(model, field, delta, pk__in=ids)
+
+
+def bulk_changed(sender, user_id, recipe_ids, delta):
+    """
+    То, что сделали бы сигналы, для пакетного добавления (delta=1)
+    или удаления (-1) рецептов из корзины или избранного.
+    """
+    change_counters(sender, recipe_ids, delta)
+    if sender is ShoppingCart:
+        change_cart(user_id, recipe_ids, delta)
+
+
+@contextmanager
+def batch_deletes(sender, user_id):
+    """
+    Удаления записей sender пользователя внутри блока не меняют счетчики
+    и список покупок по одной: post_delete только собирает id рецептов
+    действительно удаленных строк, а после блока они учитываются разом.
+    """
+    recipe_ids = []
+    token = batched_deletes.set((sender, recipe_ids))
+    try:
+        yield recipe_ids
+    finally:
+        batched_deletes.reset(token)
+    bulk_changed(sender, user_id, recipe_ids, -1)
+
+
+def is_batched(sender):
+    batch = batched_deletes.get()
+    return batch is not None and batch[0] is sender
+
+
+@receiver(post_save, sender=FavoriteRecipe)
+@receiver(post_save, sender=ShoppingCart)
+@receiver(post_save, sender=Recipe)
+@receiver(post_save, sender=Subscribe)
+def counter_added(sender, instance, created, **kwargs):
+    if created:
+        model, field, key = COUNTERS[sender]
+        change_counter(model, field, 1, pk=getattr(instance, key))
+
+
+@receiver(post_delete, sender=FavoriteRecipe)
+@receiver(post_delete, sender=ShoppingCart)
+@receiver(post_delete, sender=Recipe)
+@receiver(post_delete, sender=Subscribe)
+def counter_deleted(sender, instance, **kwargs):
+    if is_batched(sender):
+        batched_deletes.get()[1].append(instance.recipe_id)
+        return
+    model, field, key = COUNTERS[sender]
+    change_counter(model, field, -1, pk=getattr(instance, key))
+
+
+@receiver(post_save, sender=ShoppingCart)
+def cart_added(instance, created, **kwargs):
+    if created:
+        change_cart(instance.user_id, [instance.recipe_id], 1)
+
+
+@receiver(pre_delete, sender=ShoppingCart)
+def cart_deleted(instance, **kwargs):
+    """
+    pre_delete: при каскадном удалении рецепта его ингредиенты
+    к post_delete уже отвязаны.
+    """
+    if is_batched(ShoppingCart):
+        return
+    change_cart(instance.user_id, [instance.recipe_id], -1)
+
+
+@receiver(m2m_changed, sender=Recipe.ingredients.through)
+def recipe_ingredients_changed(instance, action, reverse, pk_set, **kwargs):
+    """
+    Состав рецепта меняется через recipe.ingredients.add/remove/clear.
+    Удаление учитывается до выполнения и только для привязанных пар.
+    """
+    if reverse:
+        return
+    if action == 'post_add' and pk_set:
+        change_recipe(
+            instance.pk, RecipeIngredient.objects.filter(pk__in=pk_set), 1
+        )
+    elif action == 'pre_remove' and pk_set:
+        change_recipe(
+            instance.pk, instance.ingredients.filter(pk__in=pk_set), -1
+        )
+    elif action == 'pre_clear':
+        change_recipe(instance.pk, instance.ingredients.all(), -1)
+
+
+SEARCH_FIELDS = {'name', 'text'}
+
+
+@receiver(post_save, sender=Recipe)
+def recipe_search_changed(instance, update_fields=None, **kwargs):
+    if update_fields is None or SEARCH_FIELDS & set(update_fields):
+        index_recipes([instance.pk])
+
+
+@receiver(post_delete, sender=Recipe)
+def recipe_search_deleted(instance, **kwargs):
+    remove_recipes([instance.pk])
+
+
+@receiver(m2m_changed, sender=Recipe.ingredients.through)
+def recipe_search_ingredients_changed(instance, action, reverse, pk_set,
+                                      **kwargs):
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    if not reverse:
+        index_recipes([instance.pk])
+    elif pk_set:
+        index_recipes(pk_set)
+
+
+@receiver(post_save, sender=Ingredient)
+def ingredient_search_changed(instance, created, **kwargs):
+    """
+    Новое название ингредиента попадает в документы его рецептов.
+    Ингредиент может входить в тысячи рецептов, поэтому документы
+    пересобираются фоновой задачей после коммита.
+    """
+    if not created:
+        index_ingredient_recipes_task.delay(instance.pk)
+
+
+@receiver(m2m_changed, sender=Recipe.ingredients.through)
+def cook_index_ingredients_changed(instance, action, reverse, pk_set,
+                                   **kwargs):
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    recipe_ids = (pk_set or ()) if reverse else [instance.pk]
+    for recipe_id in recipe_ids:
+        record_change(recipe_id)
+
+
+@receiver(post_delete, sender=Recipe)
+def cook_index_recipe_deleted(instance, **kwargs):
+    record_change(instance.pk)
+
+
+@receiver(post_delete, sender=Ingredient)
+def cook_index_ingredient_deleted(**kwargs):
+    record_change(None)
+
+
+@receiver(post_save, sender=Recipe)
+def timeline_recipe_created(instance, created, **kwargs):
+    if created:
+        timeline_fan_out_task.delay(instance.pk)
+
+
+def crossed_fanout_limit(author_id, followers_count):
+    """
+    Счетчик подписчиков только что стал равен followers_count.
+    Проверка идет после обновления счетчика в той же транзакции:
+    строка автора заблокирована, и параллельные подписки видят
+    каждая свое значение.
+    """
+    return User.objects.filter(
+        pk=author_id, followers_count=followers_count
+    ).exists()
+
+
+@receiver(post_save, sender=Subscribe)
+def timeline_subscribed(instance, created, **kwargs):
+    if not created:
+        return
+    timeline_backfill_task.delay(instance.user_id, instance.author_id)
+    if crossed_fanout_limit(instance.author_id, fanout_limit()):
+        timeline_trim_author_task.delay(instance.author_id)
+
+
+@receiver(post_delete, sender=Subscribe)
+def timeline_unsubscribed(instance, **kwargs):
+    timeline_trim_task.delay(instance.user_id, instance.author_id)
+    if crossed_fanout_limit(instance.author_id, fanout_limit() - 1):
+        timeline_backfill_followers_task.delay(instance.author_id)
@@ -0,0 +1,103 @@
+"""
+Похожие рецепты по составу: каждый рецепт - разреженный вектор
+принадлежности ингредиентам и тегам с весами TF-IDF, нормированный
+по L2, так что скалярное произведение равно косинусной близости.
+Теги и частые ингредиенты (соль, вода) есть у большой доли рецептов,
+и произведение X[batch] @ X.T по всем столбцам почти плотное. Поэтому
+кандидаты в соседи - только рецепты с общим ключевым (не слишком
+частым) ингредиентом, а полная близость с учетом тегов считается
+лишь для пар кандидатов. Из каждой строки берутся k лучших соседей.
+"""
+import numpy as np
+from scipy import sparse
+
+from .cook_index import recipe_ingredients
+from .models import Recipe
+
+TOP_K = 10
+TAG_WEIGHT = 0.5
+# Ингредиент ключевой, если встречается не более чем в KEY_MAX_SHARE
+# рецептов; в небольших каталогах ключевые все ингредиенты
+KEY_MAX_SHARE = 0.05
+KEY_MIN_RECIPES = 1000
+
+
+def recipe_tags():
+    """Пары (рецепт, тег), без повторов."""
+    rows = np.array(
+        list(Recipe.tags.through.objects.values_list('recipe_id', 'tag_id')),
+        dtype=np.int64
+    ).reshape(-1, 2)
+    return np.unique(rows, axis=0)
+
+
+def build_matrix(tag_weight=TAG_WEIGHT):
+    """
+    Возвращает отсортированные id рецептов, матрицу их векторов
+    и бинарную матрицу ключевых ингредиентов для отбора кандидатов.
+    """
+    recipe_ids = np.array(
+        Recipe.objects.order_by('pk').values_list('pk', flat=True),
+        dtype=np.int64
+    )
+    ingredients = recipe_ingredients()
+    tags = recipe_tags()
+    _, ingredient_columns = np.unique(ingredients[:, 1], return_inverse=True)
+    _, tag_columns = np.unique(tags[:, 1], return_inverse=True)
+    offset = ingredient_columns.max(initial=-1) + 1
+    rows = np.searchsorted(
+        recipe_ids, np.concatenate((ingredients[:, 0], tags[:, 0]))
+    )
+    columns = np.concatenate((ingredient_columns, tag_columns + offset))
+    weights = np.concatenate((
+        np.ones(len(ingredients)), np.full(len(tags), tag_weight)
+    ))
+    shape = (len(recipe_ids), offset + tag_columns.max(initial=-1) + 1)
+    document_frequency = np.bincount(columns, minlength=shape[1])
+    idf = np.log((1 + shape[0]) / (1 + document_frequency)) + 1
+    matrix = sparse.csr_matrix(
+        (weights * idf[columns], (rows, columns)), shape=shape
+    )
+    norms = np.sqrt(np.asarray(matrix.multiply(matrix).sum(axis=1)).ravel())
+    norms[norms == 0] = 1
+    key_limit = max(KEY_MIN_RECIPES, KEY_MAX_SHARE * shape[0])
+    key = (columns < offset) & (document_frequency[columns] <= key_limit)
+    keys = sparse.csr_matrix(
+        (np.ones(key.sum(), dtype=np.float32), (rows[key], columns[key])),
+        shape=shape
+    )
+    return recipe_ids, (sparse.diags(1 / norms) @ matrix).tocsr(), keys
+
+
+def similarities(matrix, keys, positions):
+    """
+    Близость рецептов positions к рецептам с общим ключевым
+    ингредиентом, разреженная CSR. Остальные пары не считаются.
+    """
+    positions = np.asarray(positions, dtype=np.int64)
+    candidates = (keys[positions] @ keys.T).tocoo()
+    rows, columns = candidates.row, candidates.col
+    values = np.asarray(
+        matrix[positions[rows]].multiply(matrix[columns]).sum(axis=1)
+    ).ravel()
+    return sparse.csr_matrix(
+        (values, (rows, columns)), shape=candidates.shape
+    )
+
+
+def top_neighbors(matrix, keys, positions, k=TOP_K):
+    """
+    Для каждой позиции - (соседи, близость) по убыванию близости,
+    при равенстве выше более новый рецепт; сам рецепт исключается.
+    """
+    scores = similarities(matrix, keys, positions)
+    for index, position in enumerate(positions):
+        start, end = scores.indptr[index], scores.indptr[index + 1]
+        columns = scores.indices[start:end]
+        values = scores.data[start:end]
+        keep = (columns != position) & (values > 0)
+        columns, values = columns[keep], values[keep]
+        # Полная сортировка строки, а не argpartition: при равной близости
+        # выбор на границе top-k должен быть детерминированным
+        order = np.lexsort((-columns, -values))[:k]
+        yield position, columns[order], values[order]
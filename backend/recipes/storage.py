@@ -0,0 +1,23 @@
+from django.core.files.storage import FileSystemStorage
+
+
+class ContentHashStorage(FileSystemStorage):
+    """
+    Хранилище для файлов с именем по хэшу содержимого:
+    одинаковые загрузки сохраняются один раз, повторная запись
+    существующего файла пропускается.
+    """
+    def get_available_name(self, name, max_length=None):
+        return name
+
+    def _save(self, name, content):
+        try:
+            if self.exists(name):
+                return name
+            return super()._save(name, content)
+        finally:
+            if hasattr(content, 'temporary_file_path'):
+                content.close()
+
+
+recipe_image_storage = ContentHashStorage()
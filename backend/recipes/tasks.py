@@ -0,0 +1,45 @@
+from tasks.queue import task
+
+from . import timeline
+from .images import process_recipe_image
+from .search import index_ingredient_recipes
+
+
+@task(name='recipes.process_recipe_image')
+def process_recipe_image_task(recipe_id):
+    process_recipe_image(recipe_id)
+
+
+def schedule_recipe_image(recipe_id):
+    """Ставит обработку изображения в очередь после коммита."""
+    process_recipe_image_task.delay(recipe_id)
+
+
+@task(name='recipes.timeline_fan_out')
+def timeline_fan_out_task(recipe_id):
+    timeline.fan_out(recipe_id)
+
+
+@task(name='recipes.timeline_backfill')
+def timeline_backfill_task(user_id, author_id):
+    timeline.backfill(user_id, author_id)
+
+
+@task(name='recipes.timeline_trim')
+def timeline_trim_task(user_id, author_id):
+    timeline.trim(user_id, author_id)
+
+
+@task(name='recipes.timeline_backfill_followers')
+def timeline_backfill_followers_task(author_id):
+    timeline.backfill_followers(author_id)
+
+
+@task(name='recipes.timeline_trim_author')
+def timeline_trim_author_task(author_id):
+    timeline.trim_author(author_id)
+
+
+@task(name='recipes.index_ingredient_recipes')
+def index_ingredient_recipes_task(ingredient_id):
+    index_ingredient_recipes(ingredient_id)
@@ -0,0 +1,160 @@
+"""
+Лента подписок по схеме fan-out on write: новый рецепт фоновой задачей
+копируется в ленты подписчиков автора, и страница ленты читается
+по индексу (user, -pub_date, -recipe) без соединения Subscribe и Recipe.
+Авторы, у которых подписчиков не меньше TIMELINE['FANOUT_LIMIT'],
+в ленты не копируются: их рецепты подмешиваются при чтении.
+Оба источника читаются keyset-запросами не длиннее страницы, поэтому
+стоимость страницы не зависит от числа подписок.
+"""
+from django.conf import settings
+from django.db.models import Q
+
+from users.models import Subscribe, User
+from .models import Recipe, TimelineEntry
+
+BATCH_SIZE = 1000
+
+
+def fanout_limit():
+    return settings.TIMELINE['FANOUT_LIMIT']
+
+
+def is_fanned_out(author_id):
+    """Рецепты автора копируются в ленты подписчиков."""
+    return User.objects.filter(
+        pk=author_id, followers_count__lt=fanout_limit()
+    ).exists()
+
+
+def latest_recipes(author_id):
+    return list(Recipe.objects.filter(author_id=author_id).order_by(
+        '-pub_date', '-id'
+    ).values_list('id', 'pub_date')[:settings.TIMELINE['BACKFILL']])
+
+
+def add_entries(user_ids, author_id, recipes):
+    """Записывает рецепты автора в ленты пользователей пачками."""
+    entries = [
+        TimelineEntry(
+            user_id=user_id,
+            recipe_id=recipe_id,
+            author_id=author_id,
+            pub_date=pub_date
+        )
+        for user_id in user_ids
+        for recipe_id, pub_date in recipes
+    ]
+    TimelineEntry.objects.bulk_create(
+        entries, batch_size=BATCH_SIZE, ignore_conflicts=True
+    )
+
+
+def follower_batches(author_id):
+    followers = Subscribe.objects.filter(
+        author_id=author_id
+    ).values_list('user_id', flat=True).order_by('user_id')
+    batch = []
+    for user_id in followers.iterator(chunk_size=BATCH_SIZE):
+        batch.append(user_id)
+        if len(batch) == BATCH_SIZE:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def fan_out(recipe_id):
+    """Копирует новый рецепт в ленты подписчиков автора."""
+    recipe = Recipe.objects.filter(pk=recipe_id).values(
+        'id', 'author_id', 'pub_date'
+    ).first()
+    if recipe is None or not is_fanned_out(recipe['author_id']):
+        return
+    for user_ids in follower_batches(recipe['author_id']):
+        add_entries(
+            user_ids,
+            recipe['author_id'],
+            [(recipe['id'], recipe['pub_date'])]
+        )
+
+
+def backfill(user_id, author_id):
+    """После подписки в ленту попадают последние рецепты автора."""
+    subscribed = Subscribe.objects.filter(
+        user_id=user_id, author_id=author_id
+    ).exists()
+    if subscribed and is_fanned_out(author_id):
+        add_entries([user_id], author_id, latest_recipes(author_id))
+
+
+def trim(user_id, author_id):
+    """После отписки рецепты автора убираются из ленты."""
+    subscribed = Subscribe.objects.filter(
+        user_id=user_id, author_id=author_id
+    ).exists()
+    if not subscribed:
+        TimelineEntry.objects.filter(
+            user_id=user_id, author_id=author_id
+        ).delete()
+
+
+def fill_followers(author_id):
+    recipes = latest_recipes(author_id)
+    for user_ids in follower_batches(author_id):
+        add_entries(user_ids, author_id, recipes)
+
+
+def backfill_followers(author_id):
+    """Автор опустился ниже порога: его рецепты снова копируются в ленты."""
+    if is_fanned_out(author_id):
+        fill_followers(author_id)
+
+
+def trim_author(author_id):
+    """Автор достиг порога: его рецепты читаются мимо лент."""
+    if not is_fanned_out(author_id):
+        TimelineEntry.objects.filter(author_id=author_id).delete()
+
+
+def rebuild():
+    """Заново строит все ленты по текущим подпискам."""
+    TimelineEntry.objects.all().delete()
+    authors = User.objects.filter(
+        followers_count__gt=0, followers_count__lt=fanout_limit()
+    ).values_list('id', flat=True).order_by('id')
+    for author_id in authors.iterator(chunk_size=BATCH_SIZE):
+        fill_followers(author_id)
+
+
+def after(field, position):
+    """Условие keyset: записи строго после (pub_date, id) в порядке ленты."""
+    if position is None:
+        return Q()
+    pub_date, pk = position
+    return Q(pub_date__lt=pub_date) | Q(
+        pub_date=pub_date, **{f'{field}__lt': pk}
+    )
+
+
+def timeline_page(user_id, position, size):
+    """
+    До size записей ленты (pub_date, recipe_id) после позиции position.
+    Записи из ленты и рецепты крупных авторов читаются отдельно,
+    каждый источник - не больше size строк, и сливаются по дате.
+    """
+    rows = set(TimelineEntry.objects.filter(user_id=user_id).filter(
+        after('recipe_id', position)
+    ).order_by('-pub_date', '-recipe_id').values_list(
+        'pub_date', 'recipe_id'
+    )[:size])
+    authors = User.objects.filter(followers_count__gte=fanout_limit())
+    authors = list(Subscribe.objects.filter(
+        user_id=user_id,
+        author_id__in=list(authors.values_list('id', flat=True))
+    ).values_list('author_id', flat=True))
+    if authors:
+        rows.update(Recipe.objects.filter(author_id__in=authors).filter(
+            after('id', position)
+        ).order_by('-pub_date', '-id').values_list('pub_date', 'id')[:size])
+    return sorted(rows, reverse=True)[:size]
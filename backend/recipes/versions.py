@@ -0,0 +1,27 @@
+from django.core.cache import cache
+
+INGREDIENTS_VERSION = 'ingredients_version'
+RECIPES_VERSION = 'recipes_version'
+TAGS_VERSION = 'tags_version'
+COOK_INDEX_VERSION = 'cook_index_version'
+
+
+def get_version(key):
+    """Текущая версия набора данных из общего кэша."""
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, 1, timeout=None)
+        return cache.get(key, 1)
+    return version
+
+
+def bump_version(key):
+    """
+    Увеличивает версию набора данных.
+    Все процессы увидят новую версию и перестроят свои копии.
+    """
+    try:
+        return cache.incr(key)
+    except ValueError:
+        cache.add(key, 2, timeout=None)
+        return cache.get(key, 2)
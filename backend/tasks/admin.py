@@ -0,0 +1,12 @@
+from django.contrib import admin
+
+from .models import Task
+
+
+@admin.register(Task)
+class TaskAdmin(admin.ModelAdmin):
+    list_display = (
+        'id', 'name', 'status', 'attempts', 'run_at', 'locked_by',
+        'heartbeat_at',)
+    list_filter = ('status', 'name')
+    search_fields = ('name', 'last_error',)
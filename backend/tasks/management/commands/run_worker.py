@@ -0,0 +1,145 @@
+import threading
+import time
+from concurrent.futures import (
+    FIRST_COMPLETED,
+    ProcessPoolExecutor,
+    ThreadPoolExecutor,
+    wait
+)
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, connections
+
+from tasks.queue import (
+    claim,
+    discover,
+    execute,
+    heartbeat,
+    purge_done,
+    requeue_stale,
+    worker_name
+)
+
+PURGE_INTERVAL = 60 * 60
+
+
+class Command(BaseCommand):
+    help = 'Обработчик фоновых задач из таблицы Task'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--concurrency', type=int, default=4,
+            help='Число одновременно выполняемых задач'
+        )
+        parser.add_argument(
+            '--pool', choices=('thread', 'process'), default='thread',
+            help='Пул потоков или процессов'
+        )
+        parser.add_argument(
+            '--poll', type=float, default=1.0,
+            help='Пауза между опросами пустой очереди, сек.'
+        )
+        parser.add_argument(
+            '--stale-after', type=int, default=600,
+            help=(
+                'Через сколько секунд без сигнала от обработчика считать '
+                'задачу зависшей'
+            )
+        )
+        parser.add_argument(
+            '--heartbeat', type=float, default=30.0,
+            help='Как часто отмечать выполняемые задачи как живые, сек.'
+        )
+        parser.add_argument(
+            '--keep-days', type=int, default=7,
+            help='Сколько дней хранить выполненные задачи (0 - не удалять)'
+        )
+        parser.add_argument(
+            '--once', action='store_true',
+            help='Обработать текущую очередь и выйти'
+        )
+
+    def beat(self, worker, interval, stop):
+        """Сигналы живости из отдельного потока, пока идет обработка."""
+        try:
+            while not stop.wait(interval):
+                heartbeat(worker)
+        finally:
+            connection.close()
+
+    def requeue(self, stale_after, interval):
+        """Зависшие задачи проверяются не чаще раза в interval секунд."""
+        if time.monotonic() < self.next_requeue:
+            return
+        self.next_requeue = time.monotonic() + interval
+        requeued, failed = requeue_stale(stale_after)
+        if requeued or failed:
+            self.stdout.write(
+                f'Зависшие задачи: возвращено в очередь {requeued}, '
+                f'помечено упавшими {failed}'
+            )
+
+    def report(self, results):
+        if results:
+            self.stdout.write(
+                f'Выполнено: {sum(results)}, '
+                f'с ошибкой: {len(results) - sum(results)}'
+            )
+
+    def purge(self, keep_days):
+        if keep_days and time.monotonic() >= self.next_purge:
+            self.next_purge = time.monotonic() + PURGE_INTERVAL
+            deleted = purge_done(keep_days)
+            if deleted:
+                self.stdout.write(f'Удалено выполненных задач: {deleted}')
+
+    def handle(self, *args, **options):
+        if options['heartbeat'] >= options['stale_after']:
+            raise CommandError('--heartbeat должен быть меньше --stale-after')
+        discover()
+        concurrency = options['concurrency']
+        worker = worker_name()
+        connections.close_all()
+        pool_class = (
+            ProcessPoolExecutor if options['pool'] == 'process'
+            else ThreadPoolExecutor
+        )
+        stop = threading.Event()
+        beater = threading.Thread(
+            target=self.beat,
+            args=(worker, options['heartbeat'], stop),
+            daemon=True
+        )
+        beater.start()
+        self.next_purge = self.next_requeue = time.monotonic()
+        self.stdout.write(f'Обработчик {worker} запущен')
+        running = set()
+        with pool_class(max_workers=concurrency) as pool:
+            try:
+                while True:
+                    self.requeue(options['stale_after'], options['heartbeat'])
+                    self.purge(options['keep_days'])
+                    # Новые задачи забираются по мере освобождения мест,
+                    # а не после завершения самой долгой задачи пачки
+                    free = concurrency - len(running)
+                    if free:
+                        running |= {
+                            pool.submit(execute, task_id)
+                            for task_id in claim(worker, free)
+                        }
+                    if not running:
+                        if options['once']:
+                            break
+                        time.sleep(options['poll'])
+                        continue
+                    done, running = wait(
+                        running,
+                        timeout=options['poll'],
+                        return_when=FIRST_COMPLETED
+                    )
+                    self.report([future.result() for future in done])
+            except KeyboardInterrupt:
+                self.stdout.write('Обработчик остановлен')
+            finally:
+                stop.set()
+                beater.join()
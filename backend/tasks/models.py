@@ -0,0 +1,72 @@
+from django.db import models
+from django.utils import timezone
+
+
+class Task(models.Model):
+    """
+    Модель фоновой задачи.
+    """
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+    CHOICES = (
+        (QUEUED, 'В очереди'),
+        (RUNNING, 'Выполняется'),
+        (DONE, 'Выполнена'),
+        (FAILED, 'Ошибка'),
+    )
+    name = models.CharField(
+        'Имя задачи',
+        max_length=200)
+    args = models.JSONField(
+        'Позиционные аргументы',
+        default=list,
+        blank=True)
+    kwargs = models.JSONField(
+        'Именованные аргументы',
+        default=dict,
+        blank=True)
+    status = models.CharField(
+        'Статус',
+        max_length=20,
+        choices=CHOICES,
+        default=QUEUED)
+    attempts = models.PositiveSmallIntegerField(
+        'Попыток',
+        default=0)
+    max_attempts = models.PositiveSmallIntegerField(
+        'Максимум попыток',
+        default=5)
+    run_at = models.DateTimeField(
+        'Запустить не раньше',
+        default=timezone.now)
+    locked_by = models.CharField(
+        'Обработчик',
+        max_length=200,
+        blank=True)
+    locked_at = models.DateTimeField(
+        'Взята в работу',
+        blank=True,
+        null=True)
+    heartbeat_at = models.DateTimeField(
+        'Последний сигнал обработчика',
+        blank=True,
+        null=True)
+    last_error = models.TextField(
+        'Последняя ошибка',
+        blank=True)
+    created = models.DateTimeField(
+        'Дата создания',
+        auto_now_add=True)
+
+    class Meta:
+        verbose_name = 'Задача'
+        verbose_name_plural = 'Задачи'
+        ordering = ['run_at', 'id']
+        indexes = [
+            models.Index(fields=['status', 'run_at'], name='task_queue_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.name} #{self.id} ({self.status})'
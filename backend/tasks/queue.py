@@ -0,0 +1,176 @@
+import logging
+import os
+import socket
+import threading
+import traceback
+from datetime import timedelta
+
+from django.db import connection, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+from django.utils.module_loading import autodiscover_modules
+
+from .models import Task
+
+logger = logging.getLogger(__name__)
+
+REGISTRY = {}
+BACKOFF_BASE = 5
+BACKOFF_MAX = 60 * 60
+PURGE_BATCH = 10000
+STALE_ERROR = 'Обработчик перестал отвечать во время выполнения задачи'
+
+
+def task(name=None, max_attempts=5):
+    """
+    Регистрирует функцию как фоновую задачу.
+    func.delay(...) ставит ее в очередь после коммита текущей транзакции.
+    """
+    def decorator(func):
+        task_name = name or f'{func.__module__}.{func.__name__}'
+        REGISTRY[task_name] = func
+
+        def delay(*args, **kwargs):
+            transaction.on_commit(lambda: enqueue(
+                task_name, *args, max_attempts=max_attempts, **kwargs
+            ))
+
+        func.task_name = task_name
+        func.delay = delay
+        return func
+    return decorator
+
+
+def enqueue(task_name, *args, max_attempts=5, run_at=None, **kwargs):
+    """Сразу записывает задачу в очередь (в рамках текущей транзакции)."""
+    return Task.objects.create(
+        name=task_name,
+        args=list(args),
+        kwargs=kwargs,
+        max_attempts=max_attempts,
+        run_at=run_at or timezone.now()
+    )
+
+
+def discover():
+    """Импортирует модули tasks всех приложений, чтобы наполнить REGISTRY."""
+    autodiscover_modules('tasks')
+
+
+def worker_name():
+    return f'{socket.gethostname()}:{os.getpid()}:{threading.get_ident()}'
+
+
+def backoff(attempts):
+    return timedelta(seconds=min(BACKOFF_BASE * 2 ** attempts, BACKOFF_MAX))
+
+
+def claim(worker, limit):
+    """
+    Забирает до limit задач. На PostgreSQL кандидаты выбираются через
+    SELECT ... FOR UPDATE SKIP LOCKED, на остальных БД каждая строка
+    захватывается условным UPDATE по статусу.
+    """
+    now = timezone.now()
+    skip_locked = connection.features.has_select_for_update_skip_locked
+    with transaction.atomic():
+        queryset = Task.objects.filter(status=Task.QUEUED, run_at__lte=now)
+        if skip_locked:
+            queryset = queryset.select_for_update(skip_locked=True)
+        candidates = list(queryset.values_list('id', flat=True)[:limit])
+        claimed = []
+        for task_id in candidates:
+            if Task.objects.filter(id=task_id, status=Task.QUEUED).update(
+                status=Task.RUNNING,
+                locked_by=worker,
+                locked_at=now,
+                heartbeat_at=now,
+                attempts=F('attempts') + 1
+            ):
+                claimed.append(task_id)
+    return claimed
+
+
+def heartbeat(worker):
+    """Отмечает, что обработчик жив и его задачи еще выполняются."""
+    return Task.objects.filter(status=Task.RUNNING, locked_by=worker).update(
+        heartbeat_at=timezone.now()
+    )
+
+
+def requeue_stale(timeout):
+    """
+    Возвращает в очередь задачи, от обработчика которых timeout секунд
+    не было сигнала; долгие задачи живого обработчика не трогаются.
+    Попытка засчитывается еще при захвате, поэтому задача, которая
+    раз за разом роняет обработчик, после max_attempts помечается
+    упавшей, а не возвращается в очередь бесконечно.
+    Возвращает (возвращено в очередь, помечено упавшими).
+    """
+    deadline = timezone.now() - timedelta(seconds=timeout)
+    stale = Task.objects.filter(
+        Q(heartbeat_at__lt=deadline)
+        | Q(heartbeat_at__isnull=True, locked_at__lt=deadline),
+        status=Task.RUNNING
+    )
+    failed = stale.filter(attempts__gte=F('max_attempts')).update(
+        status=Task.FAILED,
+        locked_by='',
+        heartbeat_at=None,
+        last_error=STALE_ERROR
+    )
+    requeued = stale.update(
+        status=Task.QUEUED,
+        locked_by='',
+        locked_at=None,
+        heartbeat_at=None,
+        last_error=STALE_ERROR
+    )
+    return requeued, failed
+
+
+def purge_done(days):
+    """Удаляет выполненные задачи старше days дней, пачками."""
+    queryset = Task.objects.filter(
+        status=Task.DONE,
+        locked_at__lt=timezone.now() - timedelta(days=days)
+    )
+    deleted = 0
+    while True:
+        ids = list(queryset.values_list('id', flat=True)[:PURGE_BATCH])
+        if not ids:
+            return deleted
+        deleted += Task.objects.filter(id__in=ids).delete()[0]
+
+
+def execute(task_id):
+    """Выполняет задачу; при ошибке планирует повтор с экспоненциальной
+    задержкой или помечает задачу как упавшую."""
+    try:
+        current = Task.objects.get(id=task_id)
+        try:
+            func = REGISTRY[current.name]
+            func(*current.args, **current.kwargs)
+        except Exception:
+            error = traceback.format_exc()
+            logger.exception('Задача %s упала', current)
+            if current.attempts < current.max_attempts:
+                Task.objects.filter(id=task_id).update(
+                    status=Task.QUEUED,
+                    run_at=timezone.now() + backoff(current.attempts),
+                    locked_by='',
+                    locked_at=None,
+                    heartbeat_at=None,
+                    last_error=error
+                )
+            else:
+                Task.objects.filter(id=task_id).update(
+                    status=Task.FAILED, last_error=error
+                )
+            return False
+        Task.objects.filter(id=task_id).update(
+            status=Task.DONE, locked_by='', last_error=''
+        )
+        return True
+    finally:
+        connection.close()
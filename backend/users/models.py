@@ -1,11 +1,14 @@
 from django.contrib.auth.models import AbstractUser
 from django.db import models
 
+from foodgram.counters import CounterFieldsMixin
 
-class User(AbstractUser):
+
+class User(CounterFieldsMixin, AbstractUser):
     """
     Модель пользователей.
     """
+    counter_fields = ('recipes_count', 'followers_count')
     CHOICES = (
         ('user', 'user'), ('admin', 'admin')
     )
@@ -34,6 +37,17 @@ class User(AbstractUser):
         unique=True,
         verbose_name='Ник'
     )
+    recipes_count = models.IntegerField(
+        'Число рецептов',
+        default=0,
+        editable=False
+    )
+    followers_count = models.IntegerField(
+        'Число подписчиков',
+        default=0,
+        db_index=True,
+        editable=False
+    )
 
     USERNAME_FIELD = 'email'
     REQUIRED_FIELDS = ['username', 'first_name', 'last_name']